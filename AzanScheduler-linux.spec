@@ -5,6 +5,7 @@ from PyInstaller.utils.hooks import collect_all
 packages = [
     'bs4',
     'pyatv',
+    'aiohttp',
     'dateutil',
     'requests',
     'tenacity',
@@ -13,6 +14,10 @@ packages = [
     'pillow',
     'aiofiles',
     'python-multipart',
+    'miniaudio',
+    'websockets',
+    'orjson',
+    'brotli',
 ]
 
 all_datas = []
@@ -6,6 +6,7 @@ from PyInstaller.utils.hooks import collect_all
 packages = [
     'bs4',
     'pyatv',
+    'aiohttp',
     'dateutil',
     'requests',
     'tenacity',
@@ -15,6 +16,10 @@ packages = [
     'pillow',
     'aiofiles',
     'python-multipart',
+    'miniaudio',
+    'websockets',
+    'orjson',
+    'brotli',
 ]
 
 all_datas = []
@@ -1,26 +1,214 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+import os
+import json
+import time
+import socket
+import asyncio
+import functools
+import aiohttp
+import requests
+import uvicorn
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from AzanScheduler.scheduler_manager import start_scheduler, stop_scheduler, scheduler_status
-from AzanScheduler.apple_manager import AppleManager
-from AzanScheduler.config_manager import ConfigManager, SystemConfigManager
+from AzanScheduler.scheduler_manager import start_scheduler, stop_scheduler, scheduler_status, scheduler
+from AzanScheduler.config_manager import ConfigManager, SystemConfigManager, MediaFileTooLarge, ConfigVersionConflict
 from AzanScheduler.prayer_times_fetcher import PrayerTimesFetcher
+from AzanScheduler.prayer_times_cache import PrayerTimesCache
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.event_broadcaster import event_broadcaster
+from AzanScheduler.metrics import registry, MetricsMiddleware
+from AzanScheduler.http_encoding import CompressionMiddleware, response_settings
+from AzanScheduler.loop_watchdog import loop_watchdog
+from AzanScheduler.leader_election import leader_election
+from AzanScheduler.media_server import media_store, resolve_media_path
 from AzanScheduler.logging_config import get_logger
 
 
 # Get a logger for this module
 logger = get_logger(__name__)
 
-# Initialize the AppleManager,ConfigManager and AzanScheduler
-apple_manager = AppleManager()
+# Share the scheduler's AppleManager, so scans made for the UI also feed announcement device resolution
+apple_manager = scheduler.manager
 config = ConfigManager()
 sys_config = SystemConfigManager()
 cors_config = sys_config.load_sys_config("API_CORS") or {}
+workers_config = sys_config.load_sys_config("WORKERS") or {}
 prayer_fetcher = PrayerTimesFetcher()
+prayer_times_cache = PrayerTimesCache(prayer_fetcher)
+response_class, compression = response_settings()
+
+registry.gauge("azan_blocking_pool_active", "Blocking calls running in the thread pool.", lambda: blocking_pool.active)
+registry.gauge("azan_blocking_pool_queued", "Blocking calls waiting for a thread.", lambda: blocking_pool.queued)
+registry.gauge("azan_event_clients", "Connected event stream clients.", lambda: len(event_broadcaster.subscriptions))
+
+
+# Header marking a scheduler call forwarded by another worker, so it is never forwarded twice
+FORWARDED_HEADER = "x-azan-forwarded"
+
+# Loopback server the scheduler leader runs for the calls forwarded by the other workers
+control_server = None
+control_task = None
+
+# Config watcher and event relay of a worker that is not the scheduler leader
+follow_task = None
+
+
+async def _on_elected():
+    """
+    Runs in the worker elected scheduler leader: stops following the previous leader and starts
+    the device scanner, the health monitor, the scheduler and the control server.
+
+    Returns:
+        str: The control server URL the other workers forward their calls to.
+    """
+    global control_server, control_task
+    await _stop_following()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    control_server = uvicorn.Server(uvicorn.Config(app, log_level="warning", log_config=None, lifespan="off"))
+    control_task = asyncio.create_task(control_server.serve(sockets=[sock]))
+    apple_manager.scanner.start()
+    apple_manager.health.start()
+    await start_scheduler()
+    return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+async def _step_down():
+    """
+    Stops the scheduler and the control server before the leader lock is released, so two workers never run the scheduler at once.
+    """
+    global control_server, control_task
+    await stop_scheduler()
+    if control_server:
+        control_server.should_exit = True
+        await asyncio.gather(control_task, return_exceptions=True)
+        control_server = control_task = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs the background device scanner, health monitor, prayer times precomputation and,
+    if enabled, the event loop watchdog for as long as the API is up. With several workers,
+    the scanner and the health monitor only run in the elected scheduler leader, and the other
+    workers follow its config changes and events.
+    """
+    global follow_task
+    loop_watchdog.start()
+    if leader_election.enabled:
+        follow_task = asyncio.create_task(_follow())
+        leader_election.start(_on_elected)
+    else:
+        apple_manager.scanner.start()
+        apple_manager.health.start()
+    prayer_times_cache.start()
+    yield
+    await prayer_times_cache.stop()
+    await _stop_following()
+    if leader_election.is_leader:
+        await _step_down()
+    await leader_election.stop()
+    await apple_manager.health.stop()
+    await apple_manager.scanner.stop()
+    await loop_watchdog.stop()
+
+
+async def _on_leader(method, path, local, forwarded=False, raw=False, **request_args):
+    """
+    Runs a call in this worker if it runs the scheduler (always the case with a single worker),
+    otherwise forwards it to the elected leader.
+
+    Args:
+        method (str): The HTTP method of the call.
+        path (str): The API path of the call.
+        local (callable): Coroutine function answering the call in this worker.
+        forwarded (bool): The call was already forwarded by another worker.
+        raw (bool): Return the leader's answer as a Response instead of its decoded JSON.
+        request_args: Body and headers of the call (json, data, files, headers) and an optional timeout, passed to requests.
+    Returns:
+        JSON: The answer of this worker or of the leader.
+    """
+    if not leader_election.enabled or leader_election.is_leader:
+        return await local()
+    if forwarded:
+        raise HTTPException(status_code=503, detail="This worker is no longer the scheduler leader. Retry shortly.")
+    leader = await blocking_pool.run(leader_election.leader)
+    if not leader:
+        raise HTTPException(status_code=503, detail="No scheduler leader is elected yet. Retry shortly.")
+    request_args["headers"] = {**request_args.get("headers", {}), FORWARDED_HEADER: "1"}
+    request_args.setdefault("timeout", workers_config.get("proxy_timeout", 5))
+    try:
+        response = await blocking_pool.run(functools.partial(requests.request, method, f"{leader['control_url']}{path}", **request_args))
+    except requests.RequestException as e:
+        logger.error(f"❌ Failed to forward {path} to the scheduler leader: {e}")
+        raise HTTPException(status_code=503, detail="The scheduler leader is not reachable, a new one is being elected. Retry shortly.")
+    if response.status_code >= 400:
+        is_json = response.headers.get("content-type", "").startswith("application/json")
+        headers = {"etag": response.headers["etag"]} if "etag" in response.headers else None
+        raise HTTPException(status_code=response.status_code, detail=response.json().get("detail") if is_json else response.text, headers=headers)
+    if raw:
+        return Response(content=response.content, status_code=response.status_code, media_type=response.headers.get("content-type"))
+    return response.json()
+
+
+def _read_sse(line):
+    """
+    Returns the event carried by one line of an /api/events stream, or None for other lines.
+    """
+    if not line.startswith("data: "):
+        return None
+    return json.loads(line[len("data: "):])
+
+
+async def _relay_events():
+    """
+    Republishes the leader's scheduler events to the event clients of this worker, which is not
+    the scheduler leader, reconnecting to whichever worker leads after a failover.
+    """
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=workers_config.get("proxy_timeout", 5), sock_read=event_broadcaster.heartbeat * 2)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        while not leader_election.is_leader:
+            leader = await blocking_pool.run(leader_election.leader)
+            if leader and leader.get("pid") != os.getpid():
+                try:
+                    async with session.get(f"{leader['control_url']}/api/events", headers={FORWARDED_HEADER: "1"}) as response:
+                        response.raise_for_status()
+                        logger.info(f"📡 Relaying scheduler events from leader {leader['pid']}.")
+                        async for line in response.content:
+                            message = _read_sse(line.decode("utf-8").strip())
+                            # The snapshot only describes the leader's state when this relay connected
+                            if message and message.get("event") != "snapshot":
+                                event_broadcaster.relay(message)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    logger.warning(f"⚠️ Lost the scheduler leader's event stream, reconnecting: {e}")
+            await asyncio.sleep(leader_election.failover_interval)
+
+
+async def _follow():
+    """
+    Runs in the workers that are not the scheduler leader. The leader makes every config and media
+    update, so these workers pick the changes up from config.json and relay the leader's events.
+    """
+    event_broadcaster.relaying = True
+    try:
+        await asyncio.gather(_relay_events(), config.watch(leader_election.failover_interval))
+    finally:
+        event_broadcaster.relaying = False
+
+
+async def _stop_following():
+    global follow_task
+    if follow_task:
+        follow_task.cancel()
+        await asyncio.gather(follow_task, return_exceptions=True)
+        follow_task = None
 
 
 # Create a FastAPI app instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=response_class)
 
 # Enable CORS
 app.add_middleware(
@@ -31,6 +219,13 @@ app.add_middleware(
     allow_headers=cors_config.get("allow_headers", ["*"]),
 )
 
+# Compress large responses
+if compression:
+    app.add_middleware(CompressionMiddleware, **compression)
+
+# Record the latency of every request by route
+app.add_middleware(MetricsMiddleware)
+
 
 class ConfigManagerGetRequest(BaseModel):
     list: list  # A dictionary of keys and values to update in the .env file
@@ -40,20 +235,33 @@ class ConfigManagerUpdateRequest(BaseModel):
     updates: dict  # A dictionary of keys and values to update in the .env file
 
 
+class BatchQuery(BaseModel):
+    query: str  # One of BATCH_QUERIES, e.g. "prayer-times"
+    params: dict = {}  # The query's arguments, e.g. {"list": [...]} for get-config
+    id: Optional[str] = None  # Key of the answer in the response, defaults to the query name
+
+
+class BatchRequest(BaseModel):
+    queries: list[BatchQuery]
+
+
 @app.get("/api/prayer-times")
-async def prayer_times():
+async def prayer_times(request: Request):
     """
-    Fetches today's prayer times using PrayerTimesFetcher.
+    Returns today's prayer times, precomputed at each prayer boundary and served from memory.
+    The response carries an ETag and may be cached until the next prayer; a matching
+    If-None-Match gets a 304.
     Returns:
         JSon: A dictionary containing the prayer times for the day or an error message.
     """
-    logger.info("Received request to /prayer-times endpoint.")
     try:
-        # Call the scan_for_devices method
-        logger.info("Get today's prayer time.")
-        today_prayer_times = prayer_fetcher.fetch_prayer_times("today")
-        logger.info(f"Today's prayer times Results: {today_prayer_times}")
-        return {"status": "success", "data": today_prayer_times}
+        entry = await prayer_times_cache.get()
+        headers = {"etag": entry.etag, "cache-control": f"max-age={prayer_times_cache.max_age(entry)}, must-revalidate"}
+        if_none_match = request.headers.get("if-none-match")
+        # Compared weakly, since the compression middleware marks the ETag of compressed responses as weak
+        if if_none_match and entry.etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
 
     except Exception as e:
         logger.error(f"An error occurred while geting today's prayer times: {e}")
@@ -61,9 +269,12 @@ async def prayer_times():
 
 
 @app.get("/api/scan-devices")
-async def scan_devices():
+async def scan_devices(refresh: bool = False):
     """
     API endpoint to scan for Apple TV devices on the network.
+    Concurrent requests share one scan, and recent results are returned straight from the cache.
+    Args:
+        refresh (bool): Force a new scan instead of returning cached results.
     Returns:
         JSON: The result of the scan_for_devices method.
     """
@@ -71,7 +282,7 @@ async def scan_devices():
     try:
         # Call the scan_for_devices method
         logger.info("Starting device scan...")
-        devices_json = await apple_manager.scan_for_devices()
+        devices_json = await apple_manager.scan_for_devices(refresh=refresh)
         logger.info("Device scan completed successfully.")
         logger.info(f"Scan Results: {devices_json}")
         return {"status": "success", "data": devices_json}
@@ -80,51 +291,249 @@ async def scan_devices():
         return {"status": "error", "message": str(e)}
 
 
+def _sse_event(event, data, event_id=None):
+    """
+    Formats one Server-Sent Event.
+    """
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/scan-devices/stream")
+async def scan_devices_stream(timeout: Optional[float] = None):
+    """
+    API endpoint streaming a device scan as Server-Sent Events.
+    Sends a "device" event for every device as soon as it answers, then a "summary" event
+    (or an "error" event if the scan fails).
+    Args:
+        timeout (float): Seconds to listen for devices. Defaults to DEVICE_SCAN.timeout.
+    """
+    logger.info("Received request to /scan-devices/stream endpoint.")
+
+    async def events():
+        started = time.monotonic()
+        first_device_ms = None
+        count = 0
+        try:
+            async for device in apple_manager.stream_devices(timeout):
+                count += 1
+                if first_device_ms is None:
+                    first_device_ms = round((time.monotonic() - started) * 1000)
+                yield _sse_event("device", device)
+        except Exception as e:
+            logger.error(f"An error occurred while streaming the device scan: {e}")
+            yield _sse_event("error", {"message": str(e)})
+            return
+        yield _sse_event("summary", {
+            "count": count,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+            "first_device_ms": first_device_ms,
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"cache-control": "no-cache"})
+
+
+async def _events_snapshot(forwarded=False):
+    """
+    Returns the "snapshot" event sent first to every event client: the scheduler status and the
+    armed prayer, as known by the worker running the scheduler.
+    """
+    async def local():
+        status = await scheduler_status()
+        return {"event": "snapshot", "data": {**status["data"], "next_event": scheduler.next_event}}
+
+    return await _on_leader("GET", "/api/events/snapshot", local, forwarded)
+
+
+@app.get("/api/events/snapshot")
+async def events_snapshot(request: Request):
+    """
+    API endpoint returning the "snapshot" event /api/events starts with: the scheduler status and the armed prayer.
+    """
+    return await _events_snapshot(FORWARDED_HEADER in request.headers)
+
+
+@app.get("/api/events")
+async def events_stream():
+    """
+    API endpoint pushing scheduler events as Server-Sent Events: a "snapshot" event first, then
+    prayer_armed, announcement_started/finished, playback_started/finished (per device),
+    timetable_refresh, config_changed and scheduler_started/stopped as they happen.
+    A client that falls behind receives an "overflow" event with the number of events it lost.
+    """
+    logger.info("Received request to /events endpoint.")
+    subscription = event_broadcaster.subscribe()
+
+    async def events():
+        try:
+            snapshot = await _events_snapshot()
+            yield _sse_event(snapshot["event"], snapshot)
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), event_broadcaster.heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                yield _sse_event(message["event"], message, message.get("id"))
+        finally:
+            subscription.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"cache-control": "no-cache"})
+
+
+@app.websocket("/api/events/ws")
+async def events_websocket(websocket: WebSocket):
+    """
+    WebSocket variant of /api/events: every event is sent as one JSON message.
+    """
+    await websocket.accept()
+    subscription = event_broadcaster.subscribe()
+
+    async def send_events():
+        await websocket.send_json(await _events_snapshot())
+        while True:
+            await websocket.send_json(await subscription.get())
+
+    async def wait_for_close():
+        # Incoming messages are ignored; receiving only detects the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(wait_for_close())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        subscription.close()
+        # Not awaited: the connection is gone and the server may already be cancelling this handler
+        for task in tasks:
+            task.cancel()
+    for task in done:
+        error = task.exception()
+        if error and not isinstance(error, WebSocketDisconnect):
+            logger.error(f"❌ Event WebSocket failed: {error}")
+
+
+@app.get("/api/device-health")
+async def device_health(request: Request):
+    """
+    API endpoint returning the reachability of every configured device as last probed by the health monitor.
+    Returns:
+        JSON: One entry per device with its state, round-trip time and last probe times.
+    """
+    logger.info("Received request to /device-health endpoint.")
+
+    async def local():
+        return {"status": "success", "data": apple_manager.health.snapshot()}
+
+    return await _on_leader("GET", "/api/device-health", local, FORWARDED_HEADER in request.headers)
+
+
+@app.get("/api/blocking-pool")
+async def blocking_pool_stats():
+    """
+    API endpoint returning the size, queue depth and wait times of the thread pool that runs blocking work.
+    Returns:
+        JSON: The pool statistics.
+    """
+    return {"status": "success", "data": blocking_pool.stats()}
+
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """
+    Prometheus scrape endpoint: timetable, config, scheduler, device and API latency metrics.
+    With several workers, every worker answers with the metrics of the scheduler leader.
+    Returns:
+        Text: The metrics in the Prometheus text exposition format.
+    """
+    async def local():
+        return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return await _on_leader("GET", "/metrics", local, FORWARDED_HEADER in request.headers, raw=True)
+
+
 @app.post("/api/get-config")
-async def get_config(request: ConfigManagerGetRequest):
+async def get_config(request: ConfigManagerGetRequest, response: Response):
     """
     API endpoint to get configuration values from the .env file.
     Args:
         request (ConfigManagerGetRequest): The request object containing the keys to retrieve.
     Returns:
-        JSON: A dictionary containing the configuration values for the specified keys.
+        JSON: A dictionary containing the configuration values for the specified keys and the
+        version of config.json they were read from (also sent as the ETag), to pass as If-Match
+        to /api/update-config.
     """
     logger.info("Received request to api/get-config endpoint.")
     try:
         # Call the get_config_values method with the received keys
         logger.info(f"Received request to get config values for keys: {request.list}")
-        config_values = config.get_config_values(request.list)
+        # Values and version come from the same read of config.json
+        snapshot = await blocking_pool.run(config.load_config)
+        with config.snapshot(snapshot):
+            config_values = config.get_config_values(request.list)
+        version = config.version(snapshot)
         logger.info(f"Config values retrieved successfully: {config_values}")
-        return {"status": "success", "data": config_values}
+        response.headers["etag"] = f'"{version}"'
+        return {"status": "success", "data": config_values, "version": version}
 
     except Exception as e:
         logger.error(f"An error occurred while getting config values: {e}")
         return {"status": "error", "message": str(e)}
 
 
+def _parse_if_match(if_match):
+    """
+    Returns the config version in an If-Match header ("7", 7 or W/"7"), or None for a missing header or "*".
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a config version returned by /api/get-config.")
+
+
 @app.post("/api/update-config")
-async def update_config(request: ConfigManagerUpdateRequest):
+async def update_config(request: ConfigManagerUpdateRequest, response: Response, http_request: Request, if_match: Optional[str] = Header(None)):
     """
     API endpoint to update configuration keys in the .env file.
+    With an If-Match header holding the version returned by /api/get-config, the update is only
+    applied if nobody changed config.json since; otherwise it fails with 409 and the current version.
+    With several workers, the update is made by the scheduler leader so its scheduler applies it.
     """
     logger.info("Received request to /update-config endpoint.")
-    try:
-        # Call the update_env_keys method with the received updates
-        logger.info(f"Received update request: {request.updates}")
-        update_status = await config.update_env_keys(request.updates)
-
-        # Return the status of the updates
-        return {"status": "success", "update_status": update_status}
-    except Exception as e:
-        logger.error(f"❌ Failed to update configuration: {e}")
-        raise HTTPException(status_code=500, detail="Failed to update configuration.")
+    expected_version = _parse_if_match(if_match)
+
+    async def local():
+        try:
+            # Call the update_env_keys method with the received updates
+            logger.info(f"Received update request: {request.updates}")
+            update_status, version = await config.update_env_keys(request.updates, expected_version)
+
+            # Return the status of the updates and the new version
+            return {"status": "success", "update_status": update_status, "version": version}
+        except ConfigVersionConflict as e:
+            raise HTTPException(status_code=409, detail={"message": str(e), "version": e.current}, headers={"etag": f'"{e.current}"'})
+        except Exception as e:
+            logger.error(f"❌ Failed to update configuration: {e}")
+            raise HTTPException(status_code=500, detail="Failed to update configuration.")
+
+    result = await _on_leader(
+        "POST", "/api/update-config", local, FORWARDED_HEADER in http_request.headers,
+        json={"updates": request.updates}, headers={"if-match": if_match} if if_match else {},
+    )
+    if result.get("version") is not None:
+        response.headers["etag"] = f'"{result["version"]}"'
+    return result
 
 
 @app.post("/api/update-audio")
-async def update_audio(file: UploadFile = File(...), fileType: str = Form(...)):
+async def update_audio(request: Request, file: UploadFile = File(...), fileType: str = Form(...)):
     """
     API endpoint to update a media file.
     Expects a multipart/form-data request with an audio file and a fileType.
+    With several workers, the upload is handed to the scheduler leader, which prepares and plays it.
     """
     logger.info("Received request to /update-media-file endpoint.")
     try:
@@ -133,24 +542,37 @@ async def update_audio(file: UploadFile = File(...), fileType: str = Form(...)):
             logger.error(f"Uploaded file is not an audio file: {file.content_type}")
             raise HTTPException(status_code=400, detail="Uploaded file must be an audio file.")
 
-        file_bytes = await file.read()
         file_name = file.filename or ""
         if not file_name:
             logger.error(f"Uploaded file is missing a filename. fileType: {fileType}")
             raise HTTPException(status_code=400, detail="Uploaded file must have a filename.")
+        max_size, _ = config.upload_limits()
+        if file.size is not None and file.size > max_size:
+            logger.error(f"Uploaded file is too large: {file.size} bytes.")
+            raise HTTPException(status_code=413, detail=f"Uploaded file exceeds the maximum size of {max_size // (1024 * 1024)} MB.")
         logger.info(f"Updating media file: {file_name}, fileType: {fileType}")
 
-        # Pass the file name, fileType, and binary data to config_manager
-        update_status = await config.update_media_file(file_name, fileType, file_bytes)
-
-        return {"status": "success", "update_status": update_status}
+        async def local():
+            # Pass the file name, fileType, and the upload to config_manager, which streams it to disk in chunks
+            update_status = await config.update_media_file(file_name, fileType, file)
+            return {"status": "success", "update_status": update_status}
+
+        return await _on_leader(
+            "POST", "/api/update-audio", local, FORWARDED_HEADER in request.headers,
+            files={"file": (file_name, file.file, file.content_type)}, data={"fileType": fileType},
+            timeout=workers_config.get("upload_timeout", 120),
+        )
+    except HTTPException:
+        raise
+    except MediaFileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Failed to update media file: {e}")
         raise HTTPException(status_code=500, detail="Failed to update media file.")
 
 
 @app.get("/api/scheduler-status")
-async def api_scheduler_status():
+async def api_scheduler_status(request: Request):
     """
     API endpoint to get the Azan scheduler status.
     Args:
@@ -159,14 +581,16 @@ async def api_scheduler_status():
     logger.info("Received request to /scheduler-status endpoint.")
     try:
         # Call the scheduler_status method
-        return await scheduler_status()
+        return await _on_leader("GET", "/api/scheduler-status", scheduler_status, FORWARDED_HEADER in request.headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to get scheduler status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get scheduler status: {e}")
 
 
 @app.post("/api/start-scheduler")
-async def api_start_scheduler():
+async def api_start_scheduler(request: Request):
     """
     API endpoint to start the Azan scheduler.
     Args:
@@ -175,14 +599,16 @@ async def api_start_scheduler():
     logger.info("Received request to /start-scheduler endpoint.")
     try:
         # Call the start_scheduler method
-        return await start_scheduler()
+        return await _on_leader("POST", "/api/start-scheduler", start_scheduler, FORWARDED_HEADER in request.headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to start scheduler: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to start scheduler: {e}")
 
 
 @app.post("/api/stop-scheduler")
-async def api_stop_scheduler():
+async def api_stop_scheduler(request: Request):
     """
     API endpoint to stop the Azan scheduler.
     Args:
@@ -191,7 +617,84 @@ async def api_stop_scheduler():
     logger.info("Received request to /stop-scheduler endpoint.")
     try:
         # Call the stop_scheduler method
-        return await stop_scheduler()
+        return await _on_leader("POST", "/api/stop-scheduler", stop_scheduler, FORWARDED_HEADER in request.headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to stop scheduler: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to stop scheduler: {e}")
+
+
+async def _batch_get_config(params):
+    # Served from the batch's config snapshot, so no file is read
+    return {"status": "success", "data": config.get_config_values(params.get("list", [])), "version": config.version(config.load_config())}
+
+
+async def _batch_prayer_times(params):
+    return (await prayer_times_cache.get()).content
+
+
+async def _batch_scheduler_status(params):
+    return await _on_leader("GET", "/api/scheduler-status", scheduler_status)
+
+
+async def _batch_scan_devices(params):
+    return await scan_devices(refresh=bool(params.get("refresh", False)))
+
+
+# Queries /api/batch can answer, by name. Each answer is what the endpoint of the same name returns.
+BATCH_QUERIES = {
+    "get-config": _batch_get_config,
+    "prayer-times": _batch_prayer_times,
+    "scheduler-status": _batch_scheduler_status,
+    "scan-devices": _batch_scan_devices,
+}
+
+
+@app.post("/api/batch")
+async def batch(request: BatchRequest):
+    """
+    API endpoint answering several queries in one round trip, e.g. everything the UI needs on page load.
+    config.json is read once and every query is answered concurrently from that snapshot, so the
+    answers are consistent with each other.
+    Args:
+        request (BatchRequest): The queries, e.g. [{"query": "get-config", "params": {"list": ["TIMEZONE"]}}, {"query": "prayer-times"}].
+    Returns:
+        JSON: The answers keyed by query id (or name). A failed query gets an error answer without failing the others.
+    """
+    logger.info(f"Received request to /batch endpoint: {[query.query for query in request.queries]}")
+    try:
+        snapshot = await blocking_pool.run(config.load_config)
+    except Exception as e:
+        logger.error(f"❌ Failed to load the configuration for a batch request: {e}")
+        return {"status": "error", "message": str(e)}
+
+    async def answer(query):
+        handler = BATCH_QUERIES.get(query.query)
+        if handler is None:
+            return {"status": "error", "message": f"Unknown query: {query.query}"}
+        try:
+            return await handler(query.params)
+        except HTTPException as e:
+            return {"status": "error", "message": e.detail}
+        except Exception as e:
+            logger.error(f"❌ Batch query {query.query} failed: {e}")
+            return {"status": "error", "message": str(e)}
+
+    # The tasks gather creates inherit the snapshot
+    with config.snapshot(snapshot):
+        answers = await asyncio.gather(*(answer(query) for query in request.queries))
+    return {"status": "success", "data": {query.id or query.query: result for query, result in zip(request.queries, answers)}}
+
+
+@app.api_route("/media/{file_path:path}", methods=["GET", "HEAD"])
+async def media(file_path: str, request: Request):
+    """
+    Serves files from the media folder with Range support and strong ETags.
+    The prepared artifacts of the configured audio files are served from memory-mapped copies.
+    """
+    resolved_path = resolve_media_path(file_path)
+    if not resolved_path:
+        raise HTTPException(status_code=404, detail="Media file not found.")
+    # Hashing a file that is not mapped yet for its ETag is blocking work
+    return await blocking_pool.run(media_store.response, request, resolved_path)
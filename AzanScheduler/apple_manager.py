@@ -1,150 +1,463 @@
+import time
+import logging
 import pyatv
 import asyncio
 from tabulate import tabulate
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler.connection_pool import ConnectionPool
+from AzanScheduler.device_simulator import DeviceSimulator
+from AzanScheduler.device_scanner import DeviceScanner
+from AzanScheduler.fanout import FanoutEngine
+from AzanScheduler.health_monitor import HealthMonitor
+from AzanScheduler.media_server import stream_source
+from AzanScheduler.event_broadcaster import event_broadcaster
+from AzanScheduler import metrics
 from AzanScheduler.logging_config import get_logger
 
 
 # Get a logger for this module
 logger = get_logger(__name__)
 
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+# Weight of the newest sample in the per-device start latency estimate
+LATENCY_SMOOTHING = 0.3
+
+
+def get_device_backend():
+    """
+    Returns the device backend selected by DEVICE_BACKEND in system.json.
+
+    Returns:
+        The pyatv module, or a DeviceSimulator when the type is "simulator".
+    """
+    backend_config = sys_config.load_sys_config("DEVICE_BACKEND") or {}
+    if str(backend_config.get("type", "pyatv")).lower() == "simulator":
+        logger.warning("⚠️ Using the simulated device backend. No real devices will be reached.")
+        return DeviceSimulator(**backend_config.get("options", {}))
+    return pyatv
+
 
 class AppleManager:
+    def __init__(self, backend=None):
+        """
+        Initializes the AppleManager with a connection pool shared between announcements,
+        the scanner whose results are reused to resolve devices, the device health monitor
+        and the fan-out engine used to reach every device.
+
+        Args:
+            backend: An object exposing pyatv's scan() and connect(). Defaults to get_device_backend().
+        """
+        self.backend = backend or get_device_backend()
+        self.pool = ConnectionPool(backend=self.backend)
+        self.scanner = DeviceScanner(backend=self.backend)
+        self.fanout = FanoutEngine()
+        self.health = HealthMonitor(self)
+        self.start_latencies = {}  # identifier -> smoothed command round trip in seconds
+        sync_config = sys_config.load_sys_config("SYNC_PLAYBACK") or {}
+        self.sync_enabled = str(sync_config.get("enabled", "Off")).lower() == "on"
+        self.sync_margin = sync_config.get("margin_ms", 200) / 1000
+        self.sync_offsets = sync_config.get("offsets_ms", {})
+
     async def _discover_device(self, loop, identifier):
         """
         Discovers an Apple device on the network by its identifier.
         """
         logger.info(f"🔍 Discovering device with identifier: {identifier}")
-        atvs = await pyatv.scan(loop, identifier=identifier)
+        started = time.perf_counter()
+        atvs = await self.backend.scan(loop, identifier=identifier)
+        metrics.device_discovery.observe(time.perf_counter() - started, atvs[0].name if atvs else identifier)
         if not atvs:
             logger.error(f"❌ Device with identifier {identifier} not found on the network.")
             return None
         logger.info(f"✅ Device found - Name: {atvs[0].name} - IP: {atvs[0].address}")
         return atvs[0]
 
-    async def _play_file(self, loop, device, file_path, volume):
+    async def _discover_devices(self, loop, identifiers):
         """
-        Connects to the device and plays the specified file with the given volume.
+        Discovers several Apple devices with a single network scan.
 
         Args:
             loop (asyncio.AbstractEventLoop): The event loop.
-            device (pyatv.interface.AppleTV): The Apple TV device to play the file on.
-            file_path (str): The path of the file to play.
-            volume (float): The volume level (0.0 to 100.0).
+            identifiers (list): The identifiers of the devices to discover.
+
+        Returns:
+            dict: The discovered device configurations by identifier. Devices that did not answer are left out.
+        """
+        logger.info(f"🔍 Discovering {len(identifiers)} devices in one scan")
+        started = time.perf_counter()
+        try:
+            atvs = await self.backend.scan(loop, identifier=set(identifiers))
+        except Exception as e:
+            logger.warning(f"⚠️ Device discovery scan failed, devices will be discovered one by one: {e}")
+            return {}
+        metrics.device_discovery.observe(time.perf_counter() - started, "batch")
+        discovered = {}
+        for identifier in identifiers:
+            device = next((atv for atv in atvs if identifier in atv.all_identifiers), None)
+            if device:
+                discovered[identifier] = device
+        logger.info(f"✅ Found {len(discovered)}/{len(identifiers)} devices on the network.")
+        return discovered
+
+    async def _stream(self, atv, device, file_path):
         """
-        logger.info(f"🎵 Connecting to device: {device.name} - IP: {device.address}")
-        atv = None
+        Streams a file path or prepared media to a connected device and waits until it is done.
+        """
+        logger.info(f"🎵 Playing file: {file_path} on {device.name}")
+        playback = {"identifier": device.identifier, "name": device.name, "file": str(file_path)}
+        event_broadcaster.publish("playback_started", playback)
+        started = time.monotonic()
+        firing = metrics.firing.get()
+        if firing:
+            prayer_name, skew, fired_at = firing
+            metrics.playback_start_delay.observe(skew + started - fired_at, prayer_name, device.name)
+        source = stream_source(file_path, device.address)
         try:
-            atv = await pyatv.connect(device, loop)
+            await atv.stream.stream_file(source)
+        except BaseException as e:
+            status = "cancelled" if isinstance(e, asyncio.CancelledError) else "fail"
+            metrics.device_stream.observe(time.monotonic() - started, device.name, status)
+            event_broadcaster.publish("playback_finished", {
+                **playback,
+                "status": status,
+                "message": str(e) or type(e).__name__,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+            })
+            raise
+        finally:
+            if hasattr(source, "close"):
+                source.close()
+        metrics.device_stream.observe(time.monotonic() - started, device.name, "success")
+        event_broadcaster.publish("playback_finished", {**playback, "status": "success", "elapsed_ms": round((time.monotonic() - started) * 1000)})
+        logger.info(f"✅ File is done playing on {device.name} - IP: {device.address}")
+
+    async def _resolve_device(self, loop, identifier):
+        """
+        Returns the device for an identifier, raising if it cannot be found.
+        """
+        # Devices with a live pooled session or seen by a recent scan don't need to be rediscovered
+        device = self.pool.get_device(identifier) or self.scanner.lookup(identifier) or await self._discover_device(loop, identifier)
+        if not device:
+            raise LookupError(f"Device with identifier {identifier} not found on the network.")
+        return device
+
+    def _record_latency(self, identifier, sample):
+        """
+        Folds a measured command round trip into the device's start latency estimate.
+        """
+        previous = self.start_latencies.get(identifier)
+        if previous is None:
+            self.start_latencies[identifier] = sample
+        else:
+            self.start_latencies[identifier] = LATENCY_SMOOTHING * sample + (1 - LATENCY_SMOOTHING) * previous
+
+    async def _prepare_device(self, loop, identifier, volume, device=None):
+        """
+        Discovers and connects to a device and sets its volume, without starting playback.
+        The pooled session stays held until _stream_prepared releases it.
+
+        Args:
+            device (pyatv.interface.BaseConfig): The device if already discovered, otherwise it is resolved.
 
-            # Set the volume on the device
+        Returns:
+            tuple: The device configuration and its connection.
+        """
+        device = device or await self._resolve_device(loop, identifier)
+        try:
+            atv = await self.pool.acquire(loop, device, identifier)
             if volume is not None:
+                # The volume command doubles as the start latency probe
+                started = time.monotonic()
                 await atv.audio.set_volume(volume)
+                self._record_latency(identifier, time.monotonic() - started)
                 logger.info(f"🔊 Volume set to {volume}% on {device.name}")
+            return device, atv
+        except BaseException as e:
+            self.pool.discard(identifier)
+            if isinstance(e, Exception):
+                # The scanned address may be stale; let a retry discover the device again
+                self.scanner.forget(identifier)
+            raise
+
+    async def _prepare_all(self, loop, device_identifiers, volume):
+        """
+        Prepares every device through the fan-out engine, so only discovery, connect and volume
+        setup are subject to its concurrency cap, FANOUT.setup_timeout and retries. Devices that
+        need discovering are found with one scan up front rather than one multicast scan each.
 
-            # Play the file
-            logger.info(f"🎵 Playing file: {file_path} on {device.name}")
-            await atv.stream.stream_file(file_path)
-            logger.info(f"✅ File is done playing on {device.name} - IP: {device.address}")
+        Returns:
+            tuple: One result dict per device, and the prepared (device, connection) pairs by identifier.
+        """
+        ready = {}
+        # Devices without a pooled session or a recent scan result are discovered together
+        missing = [
+            identifier for identifier in device_identifiers
+            if not (self.pool.get_device(identifier) or self.scanner.lookup(identifier))
+        ]
+        discovered = await self._discover_devices(loop, missing) if len(missing) > 1 else {}
+
+        async def prepare(identifier):
+            # Only the first attempt uses the shared scan; a retry resolves the device again
+            device = discovered.pop(identifier, None)
+            ready[identifier] = await self._prepare_device(loop, identifier, volume, device)
+
+        try:
+            results = await self.fanout.run(device_identifiers, prepare)
+        except BaseException:
+            for identifier, (_, atv) in ready.items():
+                self.pool.release(identifier, atv)
+            raise
+        prepared = {result["identifier"] for result in results if result["status"] == "success"}
+        return results, {identifier: ready[identifier] for identifier in device_identifiers if identifier in prepared}
+
+    async def _stream_prepared(self, identifier, device, atv, file_path, result):
+        """
+        Streams the file on a prepared device within FANOUT.device_timeout, records the
+        outcome in its result dict and releases the pooled session.
+        """
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._stream(atv, device, file_path), self.fanout.device_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Playback on {device.name} timed out after {self.fanout.device_timeout} seconds.")
+            self.pool.discard(identifier)
+            result["status"] = "timeout"
+            result["message"] = f"Timed out after {self.fanout.device_timeout} seconds."
+        except asyncio.CancelledError:
+            # A cancelled stream leaves the session in an unknown state
+            self.pool.discard(identifier)
+            raise
         except Exception as e:
             logger.error(f"❌ Error while playing file on {device.name}: {e}")
+            self.pool.discard(identifier)
+            result["status"] = "fail"
+            result["message"] = str(e)
         finally:
-            if atv:
-                atv.close()
+            self.pool.release(identifier, atv)
+        result["elapsed_ms"] = round(result["elapsed_ms"] + (time.monotonic() - started) * 1000, 1)
+
+    async def _stream_at(self, loop, when, identifier, device, atv, file_path, result):
+        """
+        Waits until the given loop time and then starts streaming the file on the device.
+        """
+        try:
+            await asyncio.sleep(max(0.0, when - loop.time()))
+        except asyncio.CancelledError:
+            self.pool.release(identifier, atv)
+            raise
+        result["issue_skew_ms"] = round((loop.time() - when) * 1000, 1)
+        await self._stream_prepared(identifier, device, atv, file_path, result)
+
+    async def _announce_together(self, file_path, device_identifiers, volume):
+        """
+        Prepares every device first, then starts streaming on all prepared devices at once.
+
+        Streaming stays outside the fan-out engine: under its concurrency cap the devices beyond
+        the first concurrency ones would only start once earlier ones finished the whole file,
+        and its retries would restart a stream that failed partway from the beginning.
+
+        Returns:
+            list: One result dict per device.
+        """
+        loop = asyncio.get_event_loop()
+        results, ready = await self._prepare_all(loop, device_identifiers, volume)
+        results_by_id = {result["identifier"]: result for result in results}
+        await asyncio.gather(*(
+            self._stream_prepared(identifier, device, atv, file_path, results_by_id[identifier])
+            for identifier, (device, atv) in ready.items()
+        ))
+        return results
+
+    async def _announce_synchronized(self, file_path, device_identifiers, volume):
+        """
+        Prepares every device first, then issues the play commands so that they land at a shared
+        target instant, each one sent early by the device's measured start latency plus its
+        manual offset from SYNC_PLAYBACK.offsets_ms.
+
+        The preparation goes through the fan-out engine; the play commands are issued to every
+        prepared device at once since a concurrency cap would defeat the shared start.
+
+        Returns:
+            list: One result dict per device, including the offsets used for prepared devices.
+        """
+        loop = asyncio.get_event_loop()
+        results, ready = await self._prepare_all(loop, device_identifiers, volume)
+        results_by_id = {result["identifier"]: result for result in results}
+        if not ready:
+            return results
 
-    async def announce(self, file_path, device_identifiers, volume):
+        leads = {
+            identifier: self.start_latencies.get(identifier, 0.0) + self.sync_offsets.get(identifier, 0) / 1000
+            for identifier in ready
+        }
+        target = loop.time() + self.sync_margin + max(0.0, max(leads.values()))
+        for identifier in ready:
+            results_by_id[identifier].update({
+                "name": ready[identifier][0].name,
+                "latency_ms": round(self.start_latencies.get(identifier, 0.0) * 1000, 1),
+                "manual_offset_ms": self.sync_offsets.get(identifier, 0),
+                "lead_ms": round(leads[identifier] * 1000, 1),
+            })
+        logger.info(f"⏱️ Synchronized start in {round((target - loop.time()) * 1000)} ms on {len(ready)} device(s).")
+
+        await asyncio.gather(*(
+            self._stream_at(loop, target - leads[identifier], identifier, device, atv, file_path, results_by_id[identifier])
+            for identifier, (device, atv) in ready.items()
+        ))
+        logger.info(f"⏱️ Synchronized start offsets: {[results_by_id[identifier] for identifier in ready]}")
+        return results
+
+    async def announce(self, file_path, device_identifiers, volume, synchronized=None):
         """
         Announces a file on the specified devices.
 
         Args:
-            file_path (str): The path of the file to play.
+            file_path: The path of the file to play, or a PreparedMedia from the media registry.
             device_identifiers (list): A list of device identifiers to announce on.
             volume (float): The volume level (0.0 to 100.0).
+            synchronized (bool): Start all devices at a shared instant. Defaults to SYNC_PLAYBACK.enabled.
+
+        Returns:
+            list: One result dict per device with its status, attempts, elapsed time and error message.
         """
-        tasks = []
-        for identifier in device_identifiers:
-            loop = asyncio.get_event_loop()
-            device = await self._discover_device(loop, identifier)
-            if device:
-                tasks.append(self._play_file(loop, device, file_path, volume))
+        if synchronized is None:
+            synchronized = self.sync_enabled
+
+        skipped = []
+        if self.health.skip_dead:
+            skipped = [identifier for identifier in device_identifiers if self.health.is_dead(identifier)]
+            if skipped:
+                logger.warning(f"⚠️ Skipping unreachable device(s) reported by the health monitor: {', '.join(skipped)}")
+                device_identifiers = [identifier for identifier in device_identifiers if identifier not in skipped]
+                # Recheck them in the background so a device that is back is used next time
+                for identifier in skipped:
+                    self.health.recheck(identifier)
 
-        if tasks:
-            await asyncio.gather(*tasks)
+        if synchronized:
+            results = await self._announce_synchronized(file_path, device_identifiers, volume)
         else:
+            results = await self._announce_together(file_path, device_identifiers, volume)
+        results += [
+            {"identifier": identifier, "status": "skipped", "attempts": 0, "elapsed_ms": 0.0, "message": "Device is unreachable according to the health monitor."}
+            for identifier in skipped
+        ]
+
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        if not results:
             logger.error("❌ No devices were found to announce on.")
+        elif succeeded == 0:
+            logger.error("❌ Announcement failed on all devices.")
+        else:
+            logger.info(f"📢 Announcement finished on {succeeded}/{len(results)} device(s).")
+        return results
+
+    @staticmethod
+    def _device_info(atv):
+        """
+        Converts a discovered device configuration to the dictionary returned by the API.
+        """
+        services = []
+        for service in atv.services:
+            # Convert each service to a dictionary
+            service_info = {
+                "protocol": str(service.protocol).replace("Protocol.", ""),  # Remove "Protocol."
+                "port": service.port,
+                "credentials": service.credentials,
+                "requires_password": service.requires_password,
+                "password": service.password,
+                "pairing": str(service.pairing).replace("PairingRequirement.", ""),  # Remove "PairingRequirement."
+            }
+            services.append(service_info)
+        return {
+            "name": atv.name,
+            "address": str(atv.address),
+            "mac": atv.identifier,
+            "identifier": atv.all_identifiers[1] if len(atv.all_identifiers) > 1 else atv.all_identifiers[0],
+            "deep_sleep": atv.deep_sleep,
+            "device_info": str(atv.device_info),
+            "ready": atv.ready,
+            "services": services
+        }
+
+    @staticmethod
+    def _log_device_table(devices):
+        """
+        Logs the discovered devices as a table. Only rendered when debug logging is enabled.
+        """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
 
-    async def scan_for_devices(self):
+        # Define table headers
+        table_headers = [
+            "#", "Device Name", "IP Address", "MAC Identifier", "Identifier", "Deep Sleep",
+            "Device Info", "Ready", "Services"
+        ]
+
+        # Prepare table data
+        table_data = [
+            [
+                idx + 1,
+                device["name"],
+                device["address"],
+                device["mac"],
+                device["identifier"],
+                device["deep_sleep"],
+                device["device_info"],
+                device["ready"],
+                device["services"],
+            ]
+            for idx, device in enumerate(devices)
+        ]
+
+        # Log the table
+        logger.debug("\n" + tabulate(table_data, headers=table_headers, tablefmt="grid"))
+
+    async def scan_for_devices(self, refresh=False):
         """
         Scans for Apple TV devices on the network and returns the results.
+        Concurrent calls share one scan and recent results are served from the scanner's cache.
+
+        Args:
+            refresh (bool): Force a new scan instead of using cached results.
 
         Returns:
             str: A Dict containing the list of discovered devices.
         """
-        # Get the current event loop
-        loop = asyncio.get_event_loop()
-
         # Discover Apple TV devices on the network
-        atvs = await pyatv.scan(loop)
+        atvs = await self.scanner.scan(refresh=refresh)
 
         # Extract attributes for each discovered device
-        devices = []
-        for atv in atvs:
-            services = []
-            for service in atv.services:
-                # Convert each service to a dictionary
-                service_info = {
-                    "protocol": str(service.protocol).replace("Protocol.", ""),  # Remove "Protocol."
-                    "port": service.port,
-                    "credentials": service.credentials,
-                    "requires_password": service.requires_password,
-                    "password": service.password,
-                    "pairing": str(service.pairing).replace("PairingRequirement.", ""),  # Remove "PairingRequirement."
-                }
-                services.append(service_info)
-            device_info = {
-                "name": atv.name,
-                "address": str(atv.address),
-                "mac": atv.identifier,
-                "identifier": atv.all_identifiers[1] if len(atv.all_identifiers) > 1 else atv.all_identifiers[0],
-                "deep_sleep": atv.deep_sleep,
-                "device_info": str(atv.device_info),
-                "ready": atv.ready,
-                "services": services
-            }
-            devices.append(device_info)
+        devices = [self._device_info(atv) for atv in atvs]
 
         if not devices:
             logger.error("❌ No Apple devices found on the network.")
             return {"status": "error", "message": "No Apple devices found on the network."}
         else:
-            logger.info("✅ Found the following Apple devices:")
+            logger.info(f"✅ Found {len(devices)} Apple device(s): {', '.join(device['name'] for device in devices)}")
+            self._log_device_table(devices)
 
-            # Define table headers
-            table_headers = [
-                "#", "Device Name", "IP Address", "MAC Identifier", "Identifier", "Deep Sleep",
-                "Device Info", "Ready", "Services"
-            ]
+            # Return the devices as dict
+            return {"status": "success", "devices": devices, "age_seconds": round(self.scanner.age or 0, 1)}
 
-            # Prepare table data
-            table_data = [
-                [
-                    idx + 1,
-                    device["name"],
-                    device["address"],
-                    device["mac"],
-                    device["identifier"],
-                    device["deep_sleep"],
-                    device["device_info"],
-                    device["ready"],
-                    device["services"],
-                ]
-                for idx, device in enumerate(devices)
-            ]
+    async def stream_devices(self, timeout=None):
+        """
+        Scans for Apple TV devices and yields each one as soon as it answers.
 
-            # Log the table
-            logger.info("\n" + tabulate(table_data, headers=table_headers, tablefmt="grid"))
+        Args:
+            timeout (float): Seconds to listen for devices. Defaults to DEVICE_SCAN.timeout.
 
-            # Return the devices as dict
-            return {"status": "success", "devices": devices}
+        Yields:
+            dict: The details of a discovered device, as returned by scan_for_devices.
+        """
+        devices = []
+        async for atv in self.scanner.stream(timeout):
+            device = self._device_info(atv)
+            devices.append(device)
+            logger.info(f"✅ Found Apple device: {device['name']} - IP: {device['address']}")
+            yield device
+        self._log_device_table(devices)
 
 
 # Example usage:
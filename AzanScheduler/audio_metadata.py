@@ -0,0 +1,316 @@
+import os
+import json
+import wave
+import struct
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Suffix of the metadata file persisted next to each media file
+METADATA_SUFFIX = ".meta.json"
+
+# MPEG audio bitrates in kbps, keyed by (MPEG version 1 or 2, layer)
+MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# MPEG audio sample rates, keyed by the version bits of the frame header
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+# AAC sample rates, indexed by the ADTS sampling frequency index
+ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+
+# How far into a file to look for the first MPEG frame after the ID3 tag
+MP3_SYNC_SEARCH = 64 * 1024
+
+
+def _parse_mp3_header(header):
+    """
+    Decodes a 4-byte MPEG audio frame header.
+
+    Returns:
+        dict: The frame properties, or None if the bytes are not a valid header.
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    version = 1 if version_bits == 3 else 2
+    layer = 4 - layer_bits
+    bitrate = MP3_BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    channels = 1 if header[3] >> 6 == 3 else 2
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version == 2:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+    else:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    return {
+        "version": version,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "samples_per_frame": samples_per_frame,
+        "frame_length": frame_length,
+    }
+
+
+def _id3v2_size(data):
+    """
+    Returns the total size of a leading ID3v2 tag, or 0 if there is none.
+    """
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_mp3(f, file_size):
+    """
+    Reads duration, bitrate and sample rate from an MP3 file, using the Xing/Info or VBRI
+    header for VBR files and the first frame's bitrate for CBR files.
+    """
+    f.seek(0)
+    head = f.read(10)
+    audio_start = _id3v2_size(head)
+    f.seek(audio_start)
+    window = f.read(MP3_SYNC_SEARCH)
+    frame = None
+    for offset in range(len(window) - 4):
+        frame = _parse_mp3_header(window[offset:offset + 4])
+        if frame is None:
+            continue
+        # Guard against false syncs by checking that the next frame also starts with a header
+        next_offset = offset + frame["frame_length"]
+        if next_offset + 4 <= len(window) and _parse_mp3_header(window[next_offset:next_offset + 4]) is None:
+            frame = None
+            continue
+        audio_start += offset
+        window = window[offset:]
+        break
+    if frame is None:
+        return None
+
+    f.seek(max(0, file_size - 128))
+    audio_end = file_size - 128 if f.read(3) == b"TAG" else file_size
+    audio_bytes = audio_end - audio_start
+
+    frame_count = None
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["version"] == 1 else (17 if frame["channels"] == 2 else 9)
+    xing = window[4 + side_info:4 + side_info + 12]
+    if xing[:4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", xing[4:8])[0]
+        if flags & 0x01:
+            frame_count = struct.unpack(">I", xing[8:12])[0]
+    elif window[36:40] == b"VBRI":
+        frame_count = struct.unpack(">I", window[50:54])[0]
+
+    if frame_count:
+        duration = frame_count * frame["samples_per_frame"] / frame["sample_rate"]
+        bitrate = int(audio_bytes * 8 / duration) if duration else frame["bitrate"]
+    else:
+        bitrate = frame["bitrate"]
+        duration = audio_bytes * 8 / bitrate
+    return {"format": "mp3", "duration": duration, "bitrate": bitrate, "sample_rate": frame["sample_rate"], "channels": frame["channels"]}
+
+
+def parse_adts(f, file_size):
+    """
+    Reads duration, bitrate and sample rate from a raw AAC (ADTS) file by walking its frame headers.
+    """
+    f.seek(0)
+    frames = 0
+    sample_rate = channels = None
+    position = 0
+    while position + 7 <= file_size:
+        f.seek(position)
+        header = f.read(7)
+        if header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+            break
+        sample_rate_index = (header[2] >> 2) & 0x0F
+        if sample_rate_index >= len(ADTS_SAMPLE_RATES):
+            break
+        frame_length = ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+        if frame_length < 7:
+            break
+        sample_rate = ADTS_SAMPLE_RATES[sample_rate_index]
+        channels = ((header[2] & 0x01) << 2) | (header[3] >> 6)
+        frames += (header[6] & 0x03) + 1
+        position += frame_length
+    if not frames or not sample_rate:
+        return None
+    duration = frames * 1024 / sample_rate
+    return {"format": "aac", "duration": duration, "bitrate": int(position * 8 / duration), "sample_rate": sample_rate, "channels": channels}
+
+
+def _iter_boxes(f, start, end):
+    """
+    Yields (type, payload start, box end) for the MP4 boxes between two offsets.
+    """
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+        yield box_type, position + header_size, position + size
+        position += size
+
+
+def parse_mp4(f, file_size):
+    """
+    Reads duration and sample rate from an MP4/M4A file's mvhd and first mdhd boxes.
+    """
+    duration = sample_rate = None
+    for box_type, payload, end in _iter_boxes(f, 0, file_size):
+        if box_type != b"moov":
+            continue
+        for child_type, child_payload, child_end in _iter_boxes(f, payload, end):
+            if child_type == b"mvhd":
+                f.seek(child_payload)
+                version = f.read(4)[0]
+                if version == 1:
+                    timescale, length = struct.unpack(">IQ", f.read(28)[16:28])
+                else:
+                    timescale, length = struct.unpack(">II", f.read(16)[8:16])
+                duration = length / timescale if timescale else None
+            elif child_type == b"trak" and sample_rate is None:
+                for trak_type, trak_payload, trak_end in _iter_boxes(f, child_payload, child_end):
+                    if trak_type != b"mdia":
+                        continue
+                    for mdia_type, mdia_payload, _ in _iter_boxes(f, trak_payload, trak_end):
+                        if mdia_type == b"mdhd":
+                            f.seek(mdia_payload)
+                            version = f.read(4)[0]
+                            f.seek(mdia_payload + (20 if version == 1 else 12))
+                            sample_rate = struct.unpack(">I", f.read(4))[0]
+    if not duration:
+        return None
+    return {"format": "mp4", "duration": duration, "bitrate": int(file_size * 8 / duration), "sample_rate": sample_rate, "channels": None}
+
+
+def parse_wav(path):
+    """
+    Reads duration, bitrate and sample rate from a PCM WAV file.
+    """
+    with wave.open(path, "rb") as f:
+        sample_rate = f.getframerate()
+        channels = f.getnchannels()
+        duration = f.getnframes() / sample_rate
+        bitrate = sample_rate * channels * f.getsampwidth() * 8
+    return {"format": "wav", "duration": duration, "bitrate": bitrate, "sample_rate": sample_rate, "channels": channels}
+
+
+def read_audio_metadata(path):
+    """
+    Detects the format of an audio file from its content and reads its metadata.
+
+    Returns:
+        dict: format, duration (seconds), bitrate (bits per second), sample_rate and channels,
+        or None if the format is not recognised.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return parse_wav(path)
+        if head[4:8] == b"ftyp":
+            return parse_mp4(f, file_size)
+        if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+            return parse_adts(f, file_size)
+        return parse_mp3(f, file_size)
+
+
+class AudioMetadataIndex:
+    """
+    Indexes audio metadata per media file and persists it next to the file as <file>.meta.json.
+    Entries are reused as long as the file size and mtime are unchanged.
+    """
+
+    def __init__(self):
+        self._entries = {}  # path -> metadata dict
+
+    @staticmethod
+    def _is_current(entry, stat):
+        return entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+    def index(self, path):
+        """
+        Returns the metadata of a file, parsing and persisting it if it is not indexed yet.
+        Blocking: run it in a thread from async code.
+
+        Returns:
+            dict: The metadata, or None if the file could not be parsed.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logger.error(f"❌ Cannot index audio file {path}: {e}")
+            return None
+
+        entry = self._entries.get(path)
+        if self._is_current(entry, stat):
+            return entry
+        metadata_path = path + METADATA_SUFFIX
+        try:
+            with open(metadata_path, "r") as f:
+                entry = json.load(f)
+            if self._is_current(entry, stat):
+                self._entries[path] = entry
+                return entry
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        try:
+            entry = read_audio_metadata(path)
+        except (OSError, EOFError, wave.Error, struct.error, IndexError) as e:
+            logger.warning(f"⚠️ Failed to read audio metadata from {path}: {e}")
+            entry = None
+        if entry is None:
+            logger.warning(f"⚠️ Unrecognised audio format: {path}")
+            return None
+        entry.update({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+        self._entries[path] = entry
+        try:
+            with open(metadata_path, "w") as f:
+                json.dump(entry, f, indent=4)
+        except OSError as e:
+            # The bundled media folder may be read-only; keep the entry in memory only
+            logger.warning(f"⚠️ Failed to persist audio metadata for {path}: {e}")
+        logger.info(f"🎼 Indexed {os.path.basename(path)}: {entry['format']}, {entry['duration']:.1f}s, {entry['bitrate'] // 1000} kbps, {entry['sample_rate']} Hz")
+        return entry
+
+    def duration(self, path):
+        """
+        Returns the indexed duration of a file in seconds, or None if unknown.
+        """
+        entry = self.index(path)
+        return entry["duration"] if entry else None
+
+
+# Shared index used by the media registry and the config manager
+audio_metadata = AudioMetadataIndex()
@@ -3,9 +3,11 @@ import os
 import asyncio
 import uvicorn
 import threading
+import multiprocessing
 import webbrowser
 import subprocess
 import platform
+from uvicorn.supervisors import Multiprocess
 from AzanScheduler.api import app
 from AzanScheduler.scheduler_manager import start_scheduler
 from AzanScheduler.logging_config import get_logger
@@ -100,6 +102,25 @@ async def start_api():
         return None, None
 
 
+async def start_api_workers(workers):
+    """
+    Starts the API in several worker processes sharing one listening socket. uvicorn supervises
+    them and replaces a worker that dies; the workers elect the scheduler leader among themselves.
+    """
+    logger.info(f"Starting the API in {workers} worker processes...")
+    config = uvicorn.Config("AzanScheduler.api:app", host=sys_config.load_sys_config("API_HOST"), port=sys_config.load_sys_config("API_PORT"),
+                            workers=workers, log_level="info", log_config=None, lifespan="on")
+    try:
+        supervisor = Multiprocess(config, sockets=[config.bind_socket()])
+        supervisor_task = asyncio.create_task(asyncio.to_thread(supervisor.run))
+        logger.info("✅ API workers started.")
+        return supervisor, supervisor_task
+    except Exception as e:
+        logger.error("❌ Failed to start API workers.")
+        logger.error(f"Exception: {e}")
+        return None, None
+
+
 # Ensure event loop runs properly
 
 async def start_web():
@@ -155,9 +176,14 @@ async def main():
     logger.info("Starting the API, AzanUI, and AzanScheduler sequentially...")
 
     azanui_server = None
+    api_server = None
+    workers = (sys_config.load_sys_config("WORKERS") or {}).get("count", 1)
     try:
         # Start the API and wait for it to be ready
-        api_server, api_task = await start_api()
+        if workers > 1:
+            api_server, api_task = await start_api_workers(workers)
+        else:
+            api_server, api_task = await start_api()
         if api_task is None:
             logger.error("❌ API start error, Exiting...")
         else:
@@ -171,8 +197,9 @@ async def main():
                 else:
                     logger.info("✅ AzanUI started successfully.")
 
-                # Start the AzanScheduler and wait for it
-                await start_scheduler()
+                # Start the AzanScheduler and wait for it. With several workers, the elected worker runs it.
+                if workers == 1:
+                    await start_scheduler()
 
                 # Open the UI in the default web browser
                 ui_host = sys_config.load_sys_config("UI_HOST")
@@ -191,7 +218,7 @@ async def main():
                 else:
                     logger.warning("AzanUI not available or UI_HOST/UI_PORT missing.")
 
-                while not shutdown_trigger:
+                while not shutdown_trigger and not api_task.done():
                     await asyncio.sleep(2)
 
     except Exception as e:
@@ -201,7 +228,10 @@ async def main():
         # Gracefully shutdown Uvicorn
         if api_server:
             logger.info("Signaling Uvicorn server to shut down gracefully...")
-            api_server.should_exit = True
+            if isinstance(api_server, Multiprocess):
+                api_server.should_exit.set()
+            else:
+                api_server.should_exit = True
             await api_task  # Wait for Uvicorn to finish gracefully
         # Terminate AzanUI process if running
         if azanui_server and azanui_server.returncode is None:
@@ -314,6 +344,8 @@ def setup_tray_icon():
 
 
 if __name__ == "__main__":
+    # API worker processes are spawned from this executable when it is frozen
+    multiprocessing.freeze_support()
     # Start tray icon on;ly on Windows and start it in a separate thread so it doesn't block your main app
     if platform.system() == "Windows":
         tray_thread = threading.Thread(target=setup_tray_icon, daemon=True)
@@ -0,0 +1,180 @@
+"""
+Headless entry point for servers: runs the API and the scheduler without the tray icon or the
+AzanUI, reports readiness and watchdog keepalives to systemd (Type=notify) and shuts down
+within DAEMON.shutdown_timeout seconds.
+
+Usage:
+    python -m AzanScheduler.azan_daemon [--host HOST] [--port PORT]
+"""
+import time
+
+# Cold start is measured from here, before the application modules are imported
+STARTED = time.monotonic()
+
+import sys  # noqa: E402
+import signal  # noqa: E402
+import asyncio  # noqa: E402
+import argparse  # noqa: E402
+import uvicorn  # noqa: E402
+from AzanScheduler import systemd  # noqa: E402
+from AzanScheduler.api import app  # noqa: E402
+from AzanScheduler.leader_election import leader_election  # noqa: E402
+from AzanScheduler.scheduler_manager import start_scheduler, stop_scheduler  # noqa: E402
+from AzanScheduler.config_manager import SystemConfigManager  # noqa: E402
+from AzanScheduler.logging_config import get_logger  # noqa: E402
+
+IMPORTED = time.monotonic()
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+
+class DaemonServer(uvicorn.Server):
+    """
+    uvicorn server that signals an event once it accepts connections, instead of being polled,
+    and hands SIGTERM and SIGINT to the daemon instead of shutting itself down first.
+    """
+
+    def __init__(self, config, on_exit):
+        """
+        Args:
+            config (uvicorn.Config): The server configuration.
+            on_exit (callable): Signal handler called with (signum, frame) while the server runs.
+        """
+        super().__init__(config)
+        self.ready = asyncio.Event()
+        self.on_exit = on_exit
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets)
+        if self.started:
+            self.ready.set()
+
+    def handle_exit(self, sig, frame):
+        # The daemon stops the scheduler and the server together, under one deadline
+        self.on_exit(sig, frame)
+
+
+def _address(sock):
+    host, port = sock.getsockname()[:2]
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+
+async def _watchdog(interval):
+    """
+    Sends systemd watchdog keepalives from the event loop, so a stuck loop gets the service restarted.
+    """
+    while True:
+        systemd.notify("WATCHDOG=1")
+        await asyncio.sleep(interval)
+
+
+async def _shutdown(server, serve_task, timeout, started):
+    """
+    Stops the scheduler and the API together. Whatever is still running after timeout seconds is cancelled.
+
+    Args:
+        started (float): time.monotonic() when the shutdown was requested.
+    Returns:
+        bool: True if everything stopped within the timeout.
+    """
+    logger.info(f"Shutting down (deadline {timeout}s)...")
+    server.should_exit = True
+    try:
+        await asyncio.wait_for(asyncio.gather(stop_scheduler(), asyncio.shield(serve_task)), timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"❌ Shutdown did not finish within {timeout}s, forcing exit.")
+        server.force_exit = True
+        serve_task.cancel()
+        await asyncio.gather(serve_task, return_exceptions=True)
+        return False
+    logger.info(f"✅ Shut down in {(time.monotonic() - started) * 1000:.0f} ms.")
+    return True
+
+
+async def run(host=None, port=None):
+    """
+    Starts the API and the scheduler concurrently, notifies systemd when both run and serves
+    until SIGTERM or SIGINT.
+
+    Returns:
+        int: The process exit code.
+    """
+    daemon_config = sys_config.load_sys_config("DAEMON") or {}
+    shutdown_timeout = daemon_config.get("shutdown_timeout", 10)
+    if (sys_config.load_sys_config("WORKERS") or {}).get("count", 1) > 1:
+        logger.warning("⚠️ WORKERS.count is ignored in daemon mode, which runs a single API process. Use azan_app.py for several workers.")
+        # This process runs the scheduler itself, so there is no leader to elect
+        leader_election.enabled = False
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    stop_requested = None
+
+    def request_stop(signum, frame):
+        nonlocal stop_requested
+        if stop_requested is not None:
+            # A second signal skips the graceful shutdown
+            server.force_exit = True
+            return
+        stop_requested = time.monotonic()
+        systemd.notify("STOPPING=1")
+        loop.call_soon_threadsafe(stop.set)
+
+    config = uvicorn.Config(
+        app, host=host or sys_config.load_sys_config("API_HOST"), port=port if port is not None else sys_config.load_sys_config("API_PORT"),
+        log_level="info", log_config=None, lifespan="on", timeout_graceful_shutdown=shutdown_timeout,
+    )
+    server = DaemonServer(config, request_stop)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # Also covers the moments before uvicorn installs DaemonServer.handle_exit and after it restores these
+        signal.signal(sig, request_stop)
+    serve_task = asyncio.create_task(server.serve())
+    # The scheduler loads its media and timetable while the API starts up
+    scheduler_result = await start_scheduler()
+    ready_task = asyncio.create_task(server.ready.wait())
+    await asyncio.wait({ready_task, serve_task}, return_when=asyncio.FIRST_COMPLETED)
+    if not server.started:
+        ready_task.cancel()
+        logger.error("❌ The API failed to start.")
+        await stop_scheduler()
+        await asyncio.gather(serve_task, return_exceptions=True)
+        return 1
+
+    now = time.monotonic()
+    bound = ", ".join(_address(sock) for api_server in server.servers for sock in api_server.sockets)
+    logger.info(f"✅ Daemon ready in {(now - STARTED) * 1000:.0f} ms (imports {(IMPORTED - STARTED) * 1000:.0f} ms, "
+                f"startup {(now - IMPORTED) * 1000:.0f} ms). API on {bound}, scheduler {scheduler_result['status']}.")
+    systemd.notify(f"READY=1\nSTATUS=Serving the API on {bound}")
+
+    watchdog_task = None
+    interval = systemd.watchdog_interval()
+    if interval:
+        logger.info(f"🐶 Sending systemd watchdog keepalives every {interval:.1f}s.")
+        watchdog_task = asyncio.create_task(_watchdog(interval))
+
+    stop_task = asyncio.create_task(stop.wait())
+    await asyncio.wait({stop_task, serve_task}, return_when=asyncio.FIRST_COMPLETED)
+    stop_task.cancel()
+    if watchdog_task:
+        watchdog_task.cancel()
+    if stop_requested is None:
+        # The server stopped on its own
+        stop_requested = time.monotonic()
+        systemd.notify("STOPPING=1")
+    return 0 if await _shutdown(server, serve_task, shutdown_timeout, stop_requested) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", help="Defaults to API_HOST in system.json")
+    parser.add_argument("--port", type=int, help="Defaults to API_PORT in system.json")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.host, args.port)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
-import sys
-import os
+import time
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 from AzanScheduler.config_manager import ConfigManager
 from AzanScheduler.prayer_times_fetcher import PrayerTimesFetcher
 from AzanScheduler.apple_manager import AppleManager
+from AzanScheduler.media_cache import media_cache
+from AzanScheduler.media_registry import media_registry
+from AzanScheduler.media_server import media_file_path
+from AzanScheduler.scheduler_journal import SchedulerJournal
+from AzanScheduler.clock import system_clock
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.event_broadcaster import event_broadcaster
+from AzanScheduler import metrics
 from AzanScheduler.logging_config import get_logger
 
 
@@ -14,22 +21,114 @@ logger = get_logger(__name__)
 # Get the configuration manager instances
 config = ConfigManager()
 
-media_dir = os.path.join(os.getcwd(), 'media')
-
-if hasattr(sys, '_MEIPASS'):
-    # Running in a PyInstaller bundle
-    default_media_dir = os.path.join(sys._MEIPASS, 'media')
-else:
-    default_media_dir = media_dir  # fallback to media_dir if not running in PyInstaller
+# Config keys that change which prayer is next or when it is; everything else is read when a prayer fires
+TIMING_KEYS = {"SOURCES", "DEFAULT_TIMETABLE", "TIMEZONE", "AZAN_SWITCHES", "ISHA_GAMA_SWITCH"}
 
 
 class AzanScheduler:
-    def __init__(self):
+    def __init__(self, clock=None):
         """
         Initializes the AzanScheduler with prayer times fetcher and AppleManager.
+
+        Args:
+            clock (Clock): The clock the scheduler reads and sleeps on. Defaults to the wall clock;
+                simulations pass a VirtualClock.
         """
-        self.fetcher = PrayerTimesFetcher()
+        self.clock = clock or system_clock
+        self.fetcher = PrayerTimesFetcher(clock=self.clock)
         self.manager = AppleManager()
+        self.journal = SchedulerJournal(clock=self.clock)
+        self.announcement = None  # Plan of the announcement in progress, reported by the scheduler status
+        self.next_event = None  # The prayer the scheduler is sleeping until, pushed to UI clients
+        self.following_prayer = None  # The prayer after the one being fired, looked up when it was armed
+        self._replan = asyncio.Event()  # Set when a timing change requires picking the next prayer again
+
+    def _on_config_changed(self, changed_keys):
+        """
+        Applies config changes in place. Timing changes wake the scheduler up to pick the next prayer
+        again; other changes are read when the next prayer fires. Playback in progress is never interrupted.
+        """
+        timing_keys = changed_keys & TIMING_KEYS
+        if timing_keys:
+            logger.info(f"🔄 Timing settings changed ({', '.join(sorted(timing_keys))}). Re-planning the next prayer.")
+            self._replan.set()
+        else:
+            logger.info(f"🔄 Settings changed ({', '.join(sorted(changed_keys))}). They apply from the next prayer.")
+
+    def _media(self, key):
+        """
+        Returns the ready-to-stream media for an audio config key from the media registry, held
+        until media_registry.release(), falling back to resolving the file now if the registry has
+        no entry for it.
+        """
+        media = media_registry.hold(key)
+        if media:
+            return media
+        logger.warning(f"⚠️ {key} is not in the media registry. Resolving the file at play time.")
+        return media_cache.resolve(media_file_path(config.load_config(key)))
+
+    @staticmethod
+    def _duration(media):
+        """
+        Returns the indexed playback duration of a registry entry in seconds, or None if it is unknown.
+        A file resolved at play time has no registry entry and is not indexed on the event loop.
+        """
+        return getattr(media, "duration", None)
+
+    async def _following_prayer(self, prayer_time):
+        """
+        Returns the prayer after the one being armed, or None if it cannot be determined.
+        Looked up while arming so the announcement never waits on a timetable refresh.
+        """
+        try:
+            return await blocking_pool.run(self.fetcher.find_following_prayer, prayer_time)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not determine the following prayer: {e}")
+            return None
+
+    def _plan_announcement(self, prayer_name, azan_file, duaa_file, following_prayer):
+        """
+        Plans the Azan -> Duaa chain from the indexed durations, logs when playback is expected
+        to end and checks it against the following prayer.
+
+        Args:
+            prayer_name (str): The prayer being announced.
+            azan_file: The Azan media.
+            duaa_file: The Duaa media, or None if the Duaa is disabled.
+            following_prayer (dict): The following prayer as returned by find_following_prayer().
+
+        Returns:
+            The Duaa media to play after the Azan, or None if it is disabled or would collide
+            with the following prayer.
+        """
+        started = self.clock.now().astimezone()
+        azan_duration = self._duration(azan_file)
+        duaa_duration = self._duration(duaa_file) if duaa_file else 0
+        if azan_duration is None or duaa_duration is None:
+            logger.info(f"⏱️ Duration of the {prayer_name} announcement is unknown, skipping the collision check.")
+            self.announcement = {"prayer": prayer_name, "started": started.isoformat(), "expected_end": None}
+            return duaa_file
+
+        azan_end = started + timedelta(seconds=azan_duration)
+        expected_end = azan_end + timedelta(seconds=duaa_duration)
+        following_time = None
+        if following_prayer and "error" not in following_prayer:
+            following_time = datetime.strptime(following_prayer["prayer_time"], "%Y-%m-%d %H:%M:%S %z")
+
+        if following_time and duaa_file and azan_end <= following_time < expected_end:
+            logger.warning(
+                f"⚠️ Duaa for {prayer_name} would still be playing at {following_prayer['prayer']} ({following_time:%H:%M:%S}). Skipping the Duaa."
+            )
+            duaa_file, expected_end = None, azan_end
+        elif following_time and following_time < expected_end:
+            logger.warning(
+                f"⚠️ Azan for {prayer_name} is expected to end at {expected_end:%H:%M:%S}, after {following_prayer['prayer']} at {following_time:%H:%M:%S}."
+            )
+
+        chain = f"Azan {azan_duration:.0f}s" + (f" -> Duaa {duaa_duration:.0f}s" if duaa_file else "")
+        logger.info(f"⏱️ {prayer_name} announcement: {chain}, expected to end at {expected_end:%H:%M:%S}.")
+        self.announcement = {"prayer": prayer_name, "started": started.isoformat(), "expected_end": expected_end.isoformat()}
+        return duaa_file
 
     async def _play_azan(self, prayer_name):
         """
@@ -41,18 +140,6 @@ class AzanScheduler:
         short_azan_switch = config.load_config("SHORT_AZAN_SWITCHES")  # Short Azan switches
         duaa_switch = config.load_config("DUAA_SWITCHES")  # Short Azan switches
         isha_gama_switch = config.load_config("ISHA_GAMA_SWITCH")  # Isha Gama switch
-        azan_file_short = os.path.join(media_dir, config.load_config('SHORT_AZAN_FILE'))
-        if not os.path.exists(azan_file_short):
-            azan_file_short = os.path.join(default_media_dir, config.load_config('SHORT_AZAN_FILE'))
-        azan_file_fajr = os.path.join(media_dir, config.load_config('FAJR_AZAN_FILE'))
-        if not os.path.exists(azan_file_fajr):
-            azan_file_fajr = os.path.join(default_media_dir, config.load_config('FAJR_AZAN_FILE'))
-        azan_file_regular = os.path.join(media_dir, config.load_config('REGULAR_AZAN_FILE'))
-        if not os.path.exists(azan_file_regular):
-            azan_file_regular = os.path.join(default_media_dir, config.load_config('REGULAR_AZAN_FILE'))
-        duaa_file = os.path.join(media_dir, config.load_config('DUAA_FILE'))
-        if not os.path.exists(duaa_file):
-            duaa_file = os.path.join(default_media_dir, config.load_config('DUAA_FILE'))
         audio_volume = config.load_config("AUDIO_VOLUME")  # Default audio volume level (0.0 to 100.0)
 
         if prayer_name.lower() == "isha" and isha_gama_switch == "On":
@@ -64,32 +151,91 @@ class AzanScheduler:
                 logger.info(f"📢 Azan for {prayer_name} is enabled in the configuration.")
                 short_azan_enabled = short_azan_switch.get(prayer_name)
                 if short_azan_enabled == "On":
-                    azan_file = azan_file_short
+                    azan_file = self._media("SHORT_AZAN_FILE")
                     logger.info(f"📢 Playing Short Azan for {prayer_name} using file: {azan_file}")
                 else:
-                    azan_file = azan_file_fajr if prayer_name.lower() == "fajr" else azan_file_regular
+                    azan_file = self._media("FAJR_AZAN_FILE" if prayer_name.lower() == "fajr" else "REGULAR_AZAN_FILE")
                     logger.info(f"📢 Playing Azan for {prayer_name} using file: {azan_file}")
 
-                await self.manager.announce(azan_file, devices, audio_volume)
-                duaa_enabled = duaa_switch.get(prayer_name)
-                if duaa_enabled == "On":
-                    logger.info(f"📢 Playing Duaa for {prayer_name} using file: {duaa_file}")
-                    await self.manager.announce(duaa_file, devices, audio_volume)
+                duaa_file = None
+                if duaa_switch.get(prayer_name) == "On":
+                    duaa_file = self._media("DUAA_FILE")
                 else:
                     logger.info(f"🔕 Duaa for {prayer_name} is disabled in the configuration.")
+
+                # Held until the announcement ends, so a media upload meanwhile cannot pull them away
+                held = [azan_file, duaa_file]
+                # Start the Azan right away; the plan only decides whether the Duaa follows it
+                azan_task = asyncio.create_task(self.manager.announce(azan_file, devices, audio_volume))
+                results = []
+                try:
+                    duaa_file = self._plan_announcement(prayer_name, azan_file, duaa_file, self.following_prayer)
+                    event_broadcaster.publish("announcement_started", self.announcement)
+                    results = await azan_task
+                    if duaa_file:
+                        logger.info(f"📢 Playing Duaa for {prayer_name} using file: {duaa_file}")
+                        results = results + await self.manager.announce(duaa_file, devices, audio_volume)
+                finally:
+                    azan_task.cancel()
+                    for media in held:
+                        media_registry.release(media)
+                    self.announcement = None
+                    event_broadcaster.publish("announcement_finished", {
+                        "prayer": prayer_name,
+                        "succeeded": sum(1 for result in results if result["status"] == "success"),
+                        "results": results,
+                    })
             else:
                 logger.info(f"🔕 Azan for {prayer_name} is disabled in the configuration.")
 
+    async def _fire(self, prayer_name, prayer_time):
+        """
+        Plays the Azan for a prayer event at most once, as recorded in the journal.
+        """
+        if not await self.journal.claim(prayer_name, prayer_time):
+            logger.warning(f"⚠️ {prayer_name} at {prayer_time} was already played. Skipping it.")
+            return
+        skew = (self.clock.now(prayer_time.tzinfo) - prayer_time).total_seconds()
+        metrics.fire_skew.observe(skew, prayer_name)
+        # Lets the device code report how late each device started after the prayer time
+        token = metrics.firing.set((prayer_name, skew, time.monotonic()))
+        try:
+            await self._play_azan(prayer_name)
+        finally:
+            metrics.firing.reset(token)
+            self.following_prayer = None
+            await self.journal.complete(prayer_name, prayer_time)
+
+    async def _catch_up(self):
+        """
+        Handles prayers that were armed before the scheduler stopped and whose time has passed:
+        the latest one is played if it is still within the grace period, the others are recorded as missed.
+        """
+        now = self.clock.now().astimezone()
+        catch_up, missed = self.journal.overdue(now)
+        for prayer_name, prayer_time in missed:
+            logger.warning(f"⚠️ Missed {prayer_name} at {prayer_time} while the scheduler was not running.")
+            await self.journal.miss(prayer_name, prayer_time)
+            event_broadcaster.publish("prayer_missed", {"prayer": prayer_name, "prayer_time": prayer_time.isoformat()})
+        if catch_up:
+            prayer_name, prayer_time = catch_up
+            late = int((now - prayer_time).total_seconds())
+            logger.info(f"⏪ {prayer_name} at {prayer_time} was missed {late}s ago, within the grace period. Playing it now.")
+            await self._fire(prayer_name, prayer_time)
+
     async def _schedule_next_prayer(self):
         """
         Fetches the next prayer time and schedules the Azan.
         """
         while True:
-            # Fetch the next prayer
-            next_prayer = self.fetcher.fetch_prayer_times("next")
+            # Changes made while the previous prayer was playing are covered by this fetch
+            self._replan.clear()
+
+            # Fetch the next prayer; it may refresh the timetable over the network
+            next_prayer = await blocking_pool.run(self.fetcher.fetch_prayer_times, "next")
             if "error" in next_prayer:
                 logger.error(f"❌ Error fetching prayer times: {next_prayer['error']}")
-                await asyncio.sleep(60)  # Retry after 1 minute
+                await self.clock.sleep(60)  # Retry after 1 minute
                 continue
 
             prayer_name = next_prayer["prayer"]
@@ -97,7 +243,7 @@ class AzanScheduler:
             prayer_time = datetime.strptime(prayer_time_str, "%Y-%m-%d %H:%M:%S %z")
 
             # Calculate the sleep duration
-            now = datetime.now(prayer_time.tzinfo)
+            now = self.clock.now(prayer_time.tzinfo)
             sleep_duration = (prayer_time - now).total_seconds()
 
             if sleep_duration <= 0:
@@ -110,17 +256,39 @@ class AzanScheduler:
 
             # Log the next prayer time with sleep duration in hours:minutes:seconds format
             logger.info(f"🕒 Next prayer: {prayer_name} at {prayer_time}. Sleeping for {int(hours):02}:{int(minutes):02}:{int(seconds):02}.")
-            await asyncio.sleep(sleep_duration)
+            await self.journal.schedule(prayer_name, prayer_time)
+            self.following_prayer = await self._following_prayer(prayer_time)
+            self.next_event = {"prayer": prayer_name, "prayer_time": prayer_time.isoformat()}
+            event_broadcaster.publish("prayer_armed", {**self.next_event, "sleep_seconds": round(sleep_duration)})
+            try:
+                await self.clock.wait_for(self._replan, sleep_duration)
+                # A timing setting changed while sleeping: pick the next prayer again
+                await self.journal.unschedule(prayer_name, prayer_time)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.next_event = None
 
             # Play the Azan
-            await self._play_azan(prayer_name)
+            await self._fire(prayer_name, prayer_time)
 
     async def run(self):
         """
-        Starts the Azan scheduler.
+        Starts the Azan scheduler. Config changes are applied while it runs; a stopped scheduler
+        stays stopped when the config changes.
         """
         logger.info("📅 Starting Azan Scheduler...")
-        await self._schedule_next_prayer()
+        # Subscribed only while running, so a stopped or replaced scheduler is not kept alive by the config
+        config.subscribe(self._on_config_changed)
+        try:
+            await media_registry.refresh_async()
+            # Another worker may have been the scheduler leader since the journal was loaded
+            await blocking_pool.run(self.journal.reload)
+            await self._catch_up()
+            await self._schedule_next_prayer()
+        finally:
+            config.unsubscribe(self._on_config_changed)
 
 
 if __name__ == "__main__":
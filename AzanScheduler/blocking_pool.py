@@ -0,0 +1,109 @@
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+
+class BlockingPool:
+    """
+    A dedicated, bounded thread pool for the blocking work left on async paths: config file
+    reads and writes, timetable parsing and refreshes, audio indexing and media hashing.
+
+    At most max_workers calls run at once and at most max_queue more wait for a thread; further
+    callers wait on the event loop before anything is submitted, so a burst of slow work cannot
+    pile up unbounded. Queue depth and wait times are kept for stats().
+    """
+
+    def __init__(self, max_workers=None, max_queue=None):
+        """
+        Args:
+            max_workers (int): Threads running blocking calls.
+            max_queue (int): Calls allowed to wait for a free thread.
+        """
+        pool_config = sys_config.load_sys_config("BLOCKING_POOL") or {}
+        self.max_workers = max_workers or pool_config.get("max_workers", 4)
+        self.max_queue = max_queue if max_queue is not None else pool_config.get("max_queue", 32)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="azan-blocking")
+        self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _call(self, enqueued, func, args, kwargs):
+        waited = time.monotonic() - enqueued
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking function in the pool and returns its result, like asyncio.to_thread.
+        """
+        async with self._slots:
+            with self._lock:
+                self.submitted += 1
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, self._call, time.monotonic(), func, args, kwargs)
+            try:
+                result = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # Never started, so _call did not take it off the queue
+                    with self._lock:
+                        self.queued -= 1
+                raise
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.completed += 1
+            return result
+
+    def stats(self):
+        """
+        Returns the pool size, current queue depth and wait times.
+        """
+        with self._lock:
+            started = self.submitted - self.queued
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+            }
+
+
+# Shared pool used by the API handlers, the scheduler and the config manager
+blocking_pool = BlockingPool()
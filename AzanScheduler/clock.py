@@ -0,0 +1,108 @@
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+
+class Clock:
+    """
+    The wall clock used by the scheduler and the prayer times fetcher. Every "what time is it"
+    and "wait until then" goes through a clock so a simulation can swap in a VirtualClock.
+    """
+
+    def now(self, tz=None):
+        """
+        Returns the current time, like datetime.now(tz).
+        """
+        return datetime.now(tz)
+
+    async def sleep(self, seconds):
+        """
+        Waits for the given number of seconds.
+        """
+        await asyncio.sleep(seconds)
+
+    def sleep_blocking(self, seconds):
+        """
+        Blocks the calling thread for the given number of seconds.
+        """
+        time.sleep(seconds)
+
+    async def wait_for(self, event, timeout):
+        """
+        Waits for an asyncio.Event to be set.
+
+        Raises:
+            asyncio.TimeoutError: If the event is not set within the timeout.
+        """
+        await asyncio.wait_for(event.wait(), timeout)
+
+
+class VirtualClock(Clock):
+    """
+    A clock whose time only moves when someone sleeps on it: sleep() and an expiring wait_for()
+    jump straight to their deadline. It lets a simulation replay months of schedule in seconds.
+
+    Meant for a single sleeper (the scheduler loop); other tasks may read it and wait on until().
+    """
+
+    def __init__(self, start):
+        """
+        Args:
+            start (datetime): The timezone-aware time the clock starts at.
+        """
+        if start.tzinfo is None:
+            raise ValueError("VirtualClock needs a timezone-aware start time")
+        self._now = start.astimezone(timezone.utc)
+        self._alarms = []  # (moment, future) pairs waiting in until()
+
+    def now(self, tz=None):
+        if tz is None:
+            # Naive local time, like datetime.now()
+            return self._now.astimezone().replace(tzinfo=None)
+        return self._now.astimezone(tz)
+
+    def advance(self, seconds):
+        """
+        Moves the clock forward and wakes up the until() callers whose moment has come.
+        """
+        if seconds > 0:
+            self._now += timedelta(seconds=seconds)
+        pending = []
+        for moment, future in self._alarms:
+            if moment <= self._now:
+                if not future.done():
+                    future.set_result(None)
+            else:
+                pending.append((moment, future))
+        self._alarms = pending
+
+    async def sleep(self, seconds):
+        self.advance(seconds)
+        # Still yield to the event loop like a real sleep
+        await asyncio.sleep(0)
+
+    def sleep_blocking(self, seconds):
+        self.advance(seconds)
+
+    async def wait_for(self, event, timeout):
+        # Give tasks that may set the event a chance to run before the time jumps
+        await asyncio.sleep(0)
+        if event.is_set():
+            return
+        self.advance(timeout)
+        await asyncio.sleep(0)
+        raise asyncio.TimeoutError()
+
+    async def until(self, moment):
+        """
+        Waits until the clock reaches the given timezone-aware time.
+        """
+        if moment <= self._now:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._alarms.append((moment, future))
+        await future
+
+
+# Shared wall clock used unless a clock is injected
+system_clock = Clock()
@@ -3,13 +3,44 @@ import os
 import shutil
 import json
 import re
+import hashlib
+import uuid
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
 from dateutil import tz
 import aiofiles
+from AzanScheduler import metrics, file_lock
 from AzanScheduler.logging_config import get_logger
 
 # Get a logger for this module
 logger = get_logger(__name__)
 
+# Defaults for MEDIA_UPLOAD in system.json
+DEFAULT_MAX_UPLOAD_MB = 50
+DEFAULT_UPLOAD_CHUNK_KB = 256
+
+# Key of config.json holding its version, incremented by every update through ConfigManager
+VERSION_KEY = "CONFIG_VERSION"
+
+
+class MediaFileTooLarge(Exception):
+    """
+    Raised when an uploaded media file exceeds MEDIA_UPLOAD.max_size_mb.
+    """
+
+
+class ConfigVersionConflict(Exception):
+    """
+    Raised when an update expects a version of config.json that is no longer the current one.
+    """
+
+    def __init__(self, expected, current):
+        super().__init__(f"config.json is at version {current}, not {expected}. Reload the configuration and retry.")
+        self.expected = expected
+        self.current = current
+
 
 class SystemConfigManager:
     def __init__(self):
@@ -56,6 +87,7 @@ class SystemConfigManager:
         """
         Loads the configuration from the system.json file.
         """
+        metrics.config_loads.inc("system.json")
         with open(self.system_file_path, "r") as f:
             system_config = json.load(f)
         return system_config
@@ -68,9 +100,19 @@ class SystemConfigManager:
 
 
 class ConfigManager:
+    # Callbacks notified with the set of changed keys after config.json is updated.
+    # Shared by every instance, since each module creates its own ConfigManager.
+    _subscribers: list = []
+    # The config.json contents served by load_config() inside snapshot(), per task and thread
+    _snapshot: contextvars.ContextVar = contextvars.ContextVar("config_snapshot", default=None)
+    # Makes load, change and save of config.json one step across instances and threads; the
+    # config.lock file does the same across processes (API workers)
+    _write_lock = threading.Lock()
+
     def __init__(self):
         self.config_dir_path = os.path.join(os.getcwd(), 'config')
         self.config_file_path = os.path.join(self.config_dir_path, 'config.json')
+        self.lock_file_path = os.path.join(self.config_dir_path, 'config.lock')
         self.default_timetable_file_path = os.path.join(self.config_dir_path, 'default_formatted_timetable.json')
         self.media_folder = os.path.join(os.getcwd(), 'media')
         self.ensure_config_folder()
@@ -123,15 +165,139 @@ class ConfigManager:
         If a key is provided, returns the value for that key.
         If no key is provided, returns the entire config dictionary.
         """
-        with open(self.config_file_path, "r") as f:
-            config = json.load(f)
+        config = self._snapshot.get()
+        if config is None:
+            metrics.config_loads.inc("config.json")
+            with open(self.config_file_path, "r") as f:
+                config = json.load(f)
         if key:
             return config.get(key)
         return config
 
+    @contextmanager
+    def snapshot(self, config):
+        """
+        Serves every load_config() call made inside the with block from the given config instead
+        of re-reading config.json, so several reads see one consistent version. Tasks created and
+        blocking_pool calls made inside the block inherit it. For read-only work.
+
+        Args:
+            config (dict): The config.json contents, as returned by load_config().
+        """
+        token = self._snapshot.set(config)
+        try:
+            yield config
+        finally:
+            self._snapshot.reset(token)
+
     def save_config(self, config):
-        with open(self.config_file_path, "w") as f:
-            json.dump(config, f, indent=4)
+        """
+        Writes config.json to a temporary file and renames it into place, so a concurrent
+        load_config() reads either the old or the new file, never a partly written one.
+        """
+        temp_path = f"{self.config_file_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(config, f, indent=4)
+            os.replace(temp_path, self.config_file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def version(config):
+        """
+        Returns the version of the given config.json contents (0 if it was never updated).
+        """
+        return config.get(VERSION_KEY) or 0
+
+    def _begin_update(self, expected_version=None):
+        """
+        Loads config.json for an update and bumps its version, which is written by the next save.
+        Call it inside _update_lock().
+
+        Raises:
+            ConfigVersionConflict: If expected_version is given and is not the current version.
+        """
+        config = self.load_config()
+        current = self.version(config)
+        if expected_version is not None and expected_version != current:
+            logger.warning(f"⚠️ Config update expected version {expected_version}, but config.json is at version {current}.")
+            raise ConfigVersionConflict(expected_version, current)
+        config[VERSION_KEY] = current + 1
+        return config
+
+    @contextmanager
+    def _update_lock(self):
+        """
+        Holds the config.json write lock of this process and of every other process, so no
+        update can happen between an update's load and its save. Blocking.
+        """
+        with self._write_lock, file_lock.locked(self.lock_file_path):
+            yield
+
+    @classmethod
+    def subscribe(cls, callback):
+        """
+        Registers a callback called with the set of changed keys whenever config.json is updated
+        through update_env_keys or update_media_file. Callbacks run on the event loop and must not block.
+        """
+        if callback not in cls._subscribers:
+            cls._subscribers.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback):
+        """
+        Removes a callback registered with subscribe().
+        """
+        if callback in cls._subscribers:
+            cls._subscribers.remove(callback)
+
+    def _notify(self, changed_keys):
+        for callback in list(self._subscribers):
+            try:
+                callback(set(changed_keys))
+            except Exception as e:
+                logger.error(f"❌ Config change subscriber failed: {e}")
+
+    def _check_for_changes(self, seen):
+        """
+        Loads config.json if its file changed since seen, a (stat signature, config) pair.
+
+        Returns:
+            tuple: The new (stat signature, config) pair and the keys whose value changed.
+        """
+        stat = os.stat(self.config_file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if seen and seen[0] == signature:
+            return seen, set()
+        config = self.load_config()
+        if not seen:
+            return (signature, config), set()
+        previous = seen[1]
+        changed = {key for key in set(previous) | set(config) if key != VERSION_KEY and previous.get(key) != config.get(key)}
+        return (signature, config), changed
+
+    async def watch(self, interval):
+        """
+        Notifies the subscribers of changes another process makes to config.json, checking every
+        interval seconds. Runs until cancelled.
+
+        Args:
+            interval (float): Seconds between checks.
+        """
+        # Move import here to avoid circular import
+        from AzanScheduler.blocking_pool import blocking_pool
+        seen = None
+        while True:
+            try:
+                seen, changed = await blocking_pool.run(self._check_for_changes, seen)
+                if changed:
+                    logger.info(f"🔄 config.json was changed by another process: {', '.join(sorted(changed))}")
+                    self._notify(changed)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Failed to check config.json for changes: {e}")
+            await asyncio.sleep(interval)
 
     def _validate_url(self, value):
         """
@@ -208,18 +374,78 @@ class ConfigManager:
             allowed_keys = ["SOURCES", "DEFAULT_TIMETABLE", "TIMEZONE", "AZAN_SWITCHES", "SHORT_AZAN_SWITCHES", "DUAA_SWITCHES", "ISHA_GAMA_SWITCH", "AUDIO_VOLUME", "DEVICES"]
         return key in allowed_keys
 
-    async def update_env_keys(self, updates: dict) -> dict:
+    async def update_env_keys(self, updates: dict, expected_version=None) -> tuple[dict, int]:
         """
         Updates multiple keys in the config.json file with the given values and returns a status for each key.
+        The update is a compare-and-swap: config.json is loaded, checked against expected_version,
+        changed and saved under a lock, so concurrent updates never overwrite each other.
+
+        Args:
+            updates (dict): The keys and values to update.
+            expected_version (int): The version the caller read, or None to update whatever the current version is.
+
+        Returns:
+            tuple: A status for each key, and the version of config.json after the update.
+
+        Raises:
+            ConfigVersionConflict: If config.json is no longer at expected_version. Nothing is written.
         """
-        status = {}
+        # Move import here to avoid circular import
+        from AzanScheduler.blocking_pool import blocking_pool
+        status: dict = {}
         required_prayer_keys = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]
-        config = self.load_config()
+        changed: set = set()
+        try:
+            # Validation and the config.json writes are blocking file I/O
+            return await blocking_pool.run(self._update_env_keys_locked, updates, expected_version, status, changed, required_prayer_keys)
+        finally:
+            # Subscribers such as the scheduler apply the changes in place, once per batch
+            if changed:
+                self._notify(changed)
+
+    def _update_env_keys_locked(self, updates, expected_version, status, changed, required_prayer_keys):
+        with self._update_lock():
+            config = self._begin_update(expected_version)
+            # Nothing is written until config.json holds the version _begin_update bumped to
+            unchanged_version = self.version(config) - 1
+            accepted, error = self._validate_env_updates(updates, config, status, required_prayer_keys)
+            if error:
+                # An invalid key stops the whole update before anything is written
+                return {"status": "fail", "message": error}, unchanged_version
+            if not accepted:
+                return status, unchanged_version
+
+            previous = dict(config)
+            config.update(accepted)
+            try:
+                # The whole batch is written at once, with one new version
+                self.save_config(config)
+            except Exception as e:
+                logger.error(f"❌ Failed to save config.json: {e}")
+                for key in accepted:
+                    status[key] = {"status": "fail", "message": f"Failed to update key '{key}': {e}"}
+                return status, unchanged_version
 
+            for key, value in accepted.items():
+                logger.info(f"✅ Updated {key} in config.json file to: {value}")
+                if previous.get(key) != value:
+                    changed.add(key)
+                status[key] = {"status": "updated", "message": f"Key '{key}' updated successfully."}
+            return status, self.version(config)
+
+    def _validate_env_updates(self, updates, config, status, required_prayer_keys):
+        """
+        Validates each key of update_env_keys, recording a failure status for every rejected value.
+
+        Returns:
+            tuple: The accepted keys with their normalized values, and an error message if a key
+            is not a valid config key, in which case nothing may be written.
+        """
+        accepted = {}
         for key, value in updates.items():
             if not self._is_validate_key(key):
                 logger.error(f"❌ '{key}' is not a valid config key.")
-                return {"status": "fail", "message": f"'{key}' is not a valid config key."}
+                return {}, f"'{key}' is not a valid config key."
 
             # Validate SOURCES as a dictionary
             if key == "SOURCES":
@@ -289,29 +515,86 @@ class ConfigManager:
                 if not isinstance(value, list):
                     value = [value]
 
-            try:
-                config[key] = value
-                self.save_config(config)
-                logger.info(f"✅ Updated {key} in config.json file to: {value}")
-                # Move import here to avoid circular import
-                from AzanScheduler.scheduler_manager import restart_scheduler
-                await restart_scheduler()
-                status[key] = {"status": "updated", "message": f"Key '{key}' updated successfully."}
-            except Exception as e:
-                logger.error(f"❌ Failed to update key '{key}': {e}")
-                status[key] = {"status": "fail", "message": f"Failed to update key '{key}': {e}"}
+            accepted[key] = value
+
+        return accepted, None
+
+    @staticmethod
+    def upload_limits():
+        """
+        Returns the maximum upload size and the chunk size, in bytes, from MEDIA_UPLOAD in system.json.
+        """
+        upload_config = SystemConfigManager().load_sys_config("MEDIA_UPLOAD") or {}
+        max_size = int(upload_config.get("max_size_mb", DEFAULT_MAX_UPLOAD_MB) * 1024 * 1024)
+        chunk_size = int(upload_config.get("chunk_size_kb", DEFAULT_UPLOAD_CHUNK_KB) * 1024)
+        return max_size, chunk_size
+
+    @staticmethod
+    async def _iter_chunks(source, chunk_size):
+        """
+        Yields chunks from raw bytes or from a file-like object with an async read(size), such as an UploadFile.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size]
+            return
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    async def _write_media_file(self, file_path, source):
+        """
+        Streams an upload to a temporary file next to its destination, hashing it on the way,
+        then renames it into place. The media registry only maps prepared artifacts, never the
+        files in the media folder, so the rename also works on Windows, where a mapped file
+        cannot be replaced.
 
-        return status
+        Returns:
+            tuple: The SHA-256 hex digest and the size of the file.
 
-    async def update_media_file(self, file_name: str, audio_file: str, file_bytes):
+        Raises:
+            MediaFileTooLarge: If the upload exceeds the configured maximum size.
+        """
+        max_size, chunk_size = self.upload_limits()
+        temp_path = f"{file_path}.{uuid.uuid4().hex}.upload"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as out_file:
+                async for chunk in self._iter_chunks(source, chunk_size):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise MediaFileTooLarge(f"File exceeds the maximum upload size of {max_size // (1024 * 1024)} MB.")
+                    digest.update(chunk)
+                    await out_file.write(chunk)
+            if size == 0:
+                raise ValueError("Uploaded file is empty.")
+            os.replace(temp_path, file_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return digest.hexdigest(), size
+
+    async def update_media_file(self, file_name: str, audio_file: str, source):
         """
         Updates a file in the media folder and updates the config.json with the new file name.
 
         Args:
             file_name (str): The name of the file to save in the media folder.
             audio_file (str): The config key to update (e.g., FAJR_AZAN_FILE).
-            file_bytes (bytes): The binary content of the file.
+            source: The content of the file, as bytes or as a file-like object with an async read(size).
+
+        Raises:
+            MediaFileTooLarge: If the file exceeds MEDIA_UPLOAD.max_size_mb.
         """
+        # Move import here to avoid circular import
+        from AzanScheduler.blocking_pool import blocking_pool
         try:
             if not self._is_validate_key(audio_file, "audio"):
                 logger.error(f"❌ '{audio_file}' is not a valid audio file key.")
@@ -321,7 +604,7 @@ class ConfigManager:
             file_name = file_name.replace(" ", "_")
 
             # Check for duplicate file name in other audio keys
-            config = self.load_config()
+            config = await blocking_pool.run(self.load_config)
             audio_keys = ["REGULAR_AZAN_FILE", "FAJR_AZAN_FILE", "SHORT_AZAN_FILE", "DUAA_FILE"]
             for key in audio_keys:
                 if key != audio_file and config.get(key) == file_name:
@@ -337,21 +620,44 @@ class ConfigManager:
 
             # Save the file
             file_path = os.path.join(self.media_folder, file_name)
-            async with aiofiles.open(file_path, "wb") as out_file:
-                await out_file.write(file_bytes)
-            logger.info(f"✅ Saved media file: {file_name}")
+            content_hash, size = await self._write_media_file(file_path, source)
+            logger.info(f"✅ Saved media file: {file_name} ({size} bytes, sha256 {content_hash[:12]})")
+
+            # Move imports here to avoid circular import
+            from AzanScheduler.audio_metadata import audio_metadata
+            from AzanScheduler.media_cache import media_cache
+            # Index duration, bitrate and sample rate next to the file while it is being uploaded
+            if await blocking_pool.run(audio_metadata.index, file_path) is None:
+                logger.warning(f"⚠️ Could not read audio metadata from {file_name}. Announcement timing will be unknown.")
+            # Prepare it with the hash computed while streaming, so it is not read again to hash it
+            await blocking_pool.run(media_cache.prepare, file_path, content_hash)
 
             # Update config.json directly
-            config = self.load_config()
-            config[audio_file] = file_name
-            self.save_config(config)
+            await blocking_pool.run(self._set_config_key, audio_file, file_name)
             logger.info(f"✅ Updated {audio_file} in config.json file to: {file_name}")
-            return {"status": "success", "message": f"{audio_file} updated to {file_name}"}
 
+            # Validate and load the new file now rather than at prayer time
+            from AzanScheduler.media_registry import media_registry
+            await media_registry.refresh_async()
+            self._notify({audio_file})
+            return {"status": "success", "message": f"{audio_file} updated to {file_name}", "sha256": content_hash, "size": size}
+
+        except MediaFileTooLarge as e:
+            logger.error(f"❌ Rejected media file {file_name}: {e}")
+            raise
         except Exception as e:
             logger.error(f"❌ Failed to update media file {file_name}: {e}")
             return {"status": "fail", "message": str(e)}
 
+    def _set_config_key(self, key, value):
+        """
+        Sets one key of config.json and bumps its version.
+        """
+        with self._update_lock():
+            config = self._begin_update()
+            config[key] = value
+            self.save_config(config)
+
     def get_config_values(self, keys: list) -> dict:
         """
         Retrieves the values for the specified keys from the config.json file.
@@ -381,6 +687,7 @@ class ConfigManager:
         """
         Loads the Timtable from the default_formatted_timetable.json file.
         """
+        metrics.config_loads.inc("default_formatted_timetable.json")
         with open(self.default_timetable_file_path, "r") as f:
             data = json.load(f)
         return data
@@ -0,0 +1,314 @@
+import time
+import asyncio
+import pyatv
+from pyatv.interface import DeviceListener
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler import metrics
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+# Port probed when a device advertises no services (AirPlay)
+DEFAULT_PROBE_PORT = 7000
+
+
+async def tcp_probe(device, timeout):
+    """
+    Opens and immediately closes a TCP connection to the first advertised service port.
+
+    Args:
+        device (pyatv.interface.BaseConfig): The device to probe.
+        timeout (float): Seconds to wait for the device to accept the connection.
+    """
+    port = next((service.port for service in device.services if service.port), DEFAULT_PROBE_PORT)
+    _, writer = await asyncio.wait_for(asyncio.open_connection(str(device.address), port), timeout)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+class _PoolListener(DeviceListener):
+    """
+    Forwards pyatv connection events for one device back to the pool.
+    """
+
+    def __init__(self, pool, identifier):
+        self.pool = pool
+        self.identifier = identifier
+
+    def connection_lost(self, exception):
+        self.pool._on_connection_lost(self.identifier, exception)
+
+    def connection_closed(self):
+        self.pool._on_connection_closed(self.identifier)
+
+
+class ConnectionPool:
+    """
+    Keeps one live pyatv session per device so consecutive announcements
+    (e.g. Azan followed by Duaa) reuse the same connection.
+
+    A heartbeat task runs in the background: it probes the device of every live
+    session, reconnects sessions whose device stopped answering or that pyatv
+    reported as lost, and closes sessions that have been idle for too long unless
+    they were acquired to be kept warm.
+
+    Every acquire() holds the session until the matching release(). A session that
+    is held, e.g. while it streams an announcement, is never closed or reconnected
+    by the heartbeat: a failed probe only marks it suspect and the reconnect is
+    deferred until the last holder releases it.
+    """
+
+    def __init__(self, heartbeat_interval=None, idle_timeout=None, reconnect_attempts=None, backend=None, probe_timeout=None):
+        self.backend = backend or pyatv
+        pool_config = sys_config.load_sys_config("CONNECTION_POOL") or {}
+        self.heartbeat_interval = heartbeat_interval or pool_config.get("heartbeat_interval", 30)
+        self.idle_timeout = idle_timeout or pool_config.get("idle_timeout", 900)
+        self.reconnect_attempts = reconnect_attempts or pool_config.get("reconnect_attempts", 3)
+        self.probe_timeout = probe_timeout or pool_config.get("probe_timeout", 2)
+        self._sessions = {}  # identifier -> {"device", "atv", "loop", "last_used", "lost", "warm", "in_use", "suspect"}
+        self._locks = {}  # identifier -> asyncio.Lock serialising connects per device
+        self._reconnect_tasks = {}
+        self._heartbeat_task = None
+
+    def _lock_for(self, identifier):
+        if identifier not in self._locks:
+            self._locks[identifier] = asyncio.Lock()
+        return self._locks[identifier]
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    def get_device(self, identifier):
+        """
+        Returns the device configuration of a pooled session, if any.
+
+        Args:
+            identifier (str): The configured device identifier.
+
+        Returns:
+            pyatv.interface.BaseConfig: The device configuration or None.
+        """
+        session = self._sessions.get(identifier)
+        return session["device"] if session else None
+
+    def is_connected(self, identifier):
+        """
+        Returns True if the device has a pooled session that has not been reported lost.
+        """
+        session = self._sessions.get(identifier)
+        return bool(session) and not session["lost"]
+
+    def in_use(self, identifier):
+        """
+        Returns True if the device's pooled session is held by an acquire() not yet released.
+        """
+        session = self._sessions.get(identifier)
+        return bool(session) and session["in_use"] > 0
+
+    async def _connect(self, loop, identifier, device, keep_warm):
+        logger.info(f"🔌 Opening pooled connection to {device.name} - IP: {device.address}")
+        with metrics.device_connect.time(device.name):
+            atv = await self.backend.connect(device, loop)
+        atv.listener = _PoolListener(self, identifier)
+        self._sessions[identifier] = {
+            "device": device,
+            "atv": atv,
+            "loop": loop,
+            "last_used": time.monotonic(),
+            "lost": False,
+            "warm": keep_warm,
+            "in_use": 0,
+            "suspect": False,
+        }
+        return atv
+
+    async def acquire(self, loop, device, identifier=None, keep_warm=False):
+        """
+        Returns a live connection to the device, opening one if needed.
+        The session is held until release() is called with the returned connection.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The event loop.
+            device (pyatv.interface.BaseConfig): The device to connect to.
+            identifier (str): The key to pool the session under. Defaults to the device identifier.
+            keep_warm (bool): Keep the session open even when it stays idle longer than idle_timeout.
+
+        Returns:
+            pyatv.interface.AppleTV: The connected device.
+        """
+        identifier = identifier or device.identifier
+        self._ensure_heartbeat()
+        async with self._lock_for(identifier):
+            session = self._sessions.get(identifier)
+            if session and not session["lost"]:
+                session["last_used"] = time.monotonic()
+                session["warm"] = session["warm"] or keep_warm
+                session["in_use"] += 1
+                logger.info(f"♻️ Reusing pooled connection to {device.name}")
+                return session["atv"]
+            if session:
+                keep_warm = keep_warm or session["warm"]
+                self._close_session(identifier)
+            atv = await self._connect(loop, identifier, device, keep_warm)
+            self._sessions[identifier]["in_use"] = 1
+            return atv
+
+    def release(self, identifier, atv):
+        """
+        Releases a session held by acquire(). Once the last holder releases a session that
+        was lost or failed a probe while it was held, it is reconnected in the background.
+
+        Args:
+            identifier (str): The identifier the session was acquired under.
+            atv (pyatv.interface.AppleTV): The connection returned by acquire().
+        """
+        session = self._sessions.get(identifier)
+        # The session may have been discarded or replaced since it was acquired
+        if not session or session["atv"] is not atv or session["in_use"] == 0:
+            return
+        session["in_use"] -= 1
+        session["last_used"] = time.monotonic()
+        if session["in_use"] == 0 and (session["lost"] or session["suspect"]):
+            session["lost"] = True
+            self._schedule_reconnect(identifier)
+
+    def discard(self, identifier):
+        """
+        Closes and forgets the session of a device, e.g. after a playback error.
+        """
+        if identifier in self._sessions:
+            logger.info(f"🔌 Discarding pooled connection for {identifier}")
+            self._close_session(identifier)
+
+    def _close_session(self, identifier):
+        session = self._sessions.pop(identifier, None)
+        if session:
+            # Detach the listener first so the intentional close is not reported back
+            session["atv"].listener = None
+            try:
+                session["atv"].close()
+            except Exception as e:
+                logger.warning(f"⚠️ Error while closing connection for {identifier}: {e}")
+
+    def _on_connection_lost(self, identifier, exception):
+        session = self._sessions.get(identifier)
+        if not session:
+            return
+        session["lost"] = True
+        if session["in_use"]:
+            logger.warning(f"⚠️ Connection to {session['device'].name} lost: {exception}. Reconnecting once it is released.")
+            return
+        logger.warning(f"⚠️ Connection to {session['device'].name} lost: {exception}. Reconnecting in background.")
+        self._schedule_reconnect(identifier)
+
+    def _on_connection_closed(self, identifier):
+        session = self._sessions.get(identifier)
+        if session:
+            session["lost"] = True
+
+    def _schedule_reconnect(self, identifier):
+        task = self._reconnect_tasks.get(identifier)
+        if task and not task.done():
+            return
+        self._reconnect_tasks[identifier] = asyncio.create_task(self._reconnect(identifier))
+
+    async def _reconnect(self, identifier):
+        """
+        Re-establishes a lost session in the background with exponential backoff.
+        """
+        session = self._sessions.get(identifier)
+        if not session:
+            return
+        device, loop, keep_warm = session["device"], session["loop"], session["warm"]
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.reconnect_attempts),
+                wait=wait_exponential(multiplier=1, max=30),
+                reraise=True,
+            ):
+                with attempt:
+                    async with self._lock_for(identifier):
+                        current = self._sessions.get(identifier)
+                        if current and not current["lost"]:
+                            return  # Someone else reconnected in the meantime
+                        if current:
+                            self._close_session(identifier)
+                        await self._connect(loop, identifier, device, keep_warm)
+            logger.info(f"✅ Reconnected to {device.name} - IP: {device.address}")
+        except Exception as e:
+            logger.error(f"❌ Failed to reconnect to {device.name}: {e}")
+            self._sessions.pop(identifier, None)
+
+    async def _check_alive(self, identifier, session):
+        """
+        Probes the device of a live session and reconnects it if the device does not answer.
+        A held session is only marked suspect, so a single lost probe cannot cut off a stream.
+        """
+        probe = getattr(self.backend, "probe", None) or tcp_probe
+        try:
+            await probe(session["device"], self.probe_timeout)
+        except Exception as e:
+            # The session may have been replaced or discarded while the probe was running
+            if self._sessions.get(identifier) is not session or session["lost"]:
+                return
+            if session["in_use"]:
+                logger.warning(f"⚠️ Probe of {session['device'].name} failed while it is in use: {str(e) or type(e).__name__}. Deferring the reconnect.")
+                session["suspect"] = True
+            else:
+                self._on_connection_lost(identifier, str(e) or type(e).__name__)
+        else:
+            session["suspect"] = False
+
+    async def _check_sessions(self):
+        """
+        Runs one heartbeat round: reconnects lost sessions, closes idle ones and probes the rest.
+        Held sessions are only probed.
+        """
+        now = time.monotonic()
+        live = []
+        for identifier, session in list(self._sessions.items()):
+            if session["in_use"]:
+                if not session["lost"]:
+                    live.append((identifier, session))
+            elif session["lost"]:
+                self._schedule_reconnect(identifier)
+            elif not session["warm"] and now - session["last_used"] > self.idle_timeout:
+                logger.info(f"💤 Closing idle connection to {session['device'].name}")
+                self._close_session(identifier)
+            else:
+                live.append((identifier, session))
+        await asyncio.gather(*(self._check_alive(identifier, session) for identifier, session in live))
+        self._reconnect_tasks = {k: t for k, t in self._reconnect_tasks.items() if not t.done()}
+
+    async def _heartbeat(self):
+        """
+        Periodically probes, reconnects and closes the pooled sessions.
+        """
+        while self._sessions or self._reconnect_tasks:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self._check_sessions()
+
+    async def close(self):
+        """
+        Closes every pooled session and stops the background tasks.
+        """
+        tasks = list(self._reconnect_tasks.values())
+        if self._heartbeat_task:
+            tasks.append(self._heartbeat_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._reconnect_tasks = {}
+        self._heartbeat_task = None
+        for identifier in list(self._sessions):
+            self._close_session(identifier)
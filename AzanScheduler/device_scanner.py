@@ -0,0 +1,215 @@
+import time
+import asyncio
+import pyatv
+from zeroconf import IPVersion, ServiceStateChange
+from zeroconf.asyncio import AsyncZeroconf, AsyncServiceBrowser, AsyncServiceInfo
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+# mDNS service types browsed by pyatv for every supported protocol
+SERVICE_TYPES = [
+    "_airplay._tcp.local.",
+    "_raop._tcp.local.",
+    "_airport._tcp.local.",
+    "_mediaremotetv._tcp.local.",
+    "_companion-link._tcp.local.",
+    "_appletv-v2._tcp.local.",
+    "_touch-able._tcp.local.",
+    "_hscp._tcp.local.",
+]
+
+# Milliseconds to wait for the SRV/A records of a browsed service
+SERVICE_INFO_TIMEOUT_MS = 3000
+
+
+class DeviceScanner:
+    """
+    Runs network-wide device scans on behalf of the API and the announcement path.
+
+    Concurrent callers share a single in-flight scan, results are served from a short
+    cache unless a refresh is requested, and an optional background task rescans
+    periodically so the last result is always at hand. stream() yields devices as
+    they answer, for clients that want the first results right away.
+    """
+
+    def __init__(self, backend=None, cache_ttl=None, interval=None, timeout=None):
+        """
+        Args:
+            backend: An object exposing pyatv's scan(). Defaults to pyatv.
+            cache_ttl (float): Seconds a scan result is served without rescanning.
+            interval (float): Seconds between background scans. 0 disables them.
+            timeout (float): Seconds a streaming scan listens for devices.
+        """
+        self.backend = backend or pyatv
+        scan_config = sys_config.load_sys_config("DEVICE_SCAN") or {}
+        self.cache_ttl = cache_ttl if cache_ttl is not None else scan_config.get("cache_ttl", 30)
+        self.interval = interval if interval is not None else scan_config.get("interval", 300)
+        self.timeout = timeout or scan_config.get("timeout", 5)
+        self.devices = []  # pyatv configurations from the last completed scan
+        self.scanned_at = None  # time.time() of the last completed scan
+        self._completed = None  # time.monotonic() of the last completed scan
+        self._inflight = None
+        self._background_task = None
+
+    @property
+    def age(self):
+        """
+        Seconds since the last completed scan, or None if no scan has completed yet.
+        """
+        return None if self._completed is None else time.monotonic() - self._completed
+
+    async def _run_scan(self):
+        started = time.monotonic()
+        try:
+            devices = await self.backend.scan(asyncio.get_running_loop())
+        finally:
+            self._inflight = None
+        self.devices = list(devices)
+        self.scanned_at = time.time()
+        self._completed = time.monotonic()
+        logger.info(f"📡 Device scan found {len(self.devices)} device(s) in {self._completed - started:.1f}s.")
+        return self.devices
+
+    async def scan(self, refresh=False):
+        """
+        Returns the devices on the network, from the cache when it is fresh enough.
+
+        Args:
+            refresh (bool): Ignore the cache and join or start a new scan.
+
+        Returns:
+            list: The pyatv configurations of the discovered devices.
+        """
+        if not refresh and self.age is not None and self.age < self.cache_ttl:
+            return self.devices
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._run_scan())
+        else:
+            logger.info("📡 Joining the device scan already in progress.")
+        # Shielded so a caller that goes away does not cancel the scan for everyone else
+        return await asyncio.shield(self._inflight)
+
+    async def _mdns_scan_iter(self, loop, timeout):
+        """
+        Browses for Apple services with zeroconf and runs a unicast pyatv scan against each
+        host as soon as it answers, yielding its configuration without waiting for the others.
+        """
+        found = asyncio.Queue()
+        hosts = set()
+        lookups = set()
+        aiozc = AsyncZeroconf(ip_version=IPVersion.V4Only)
+
+        async def lookup(service_type, name):
+            try:
+                info = AsyncServiceInfo(service_type, name)
+                if not await info.async_request(aiozc.zeroconf, SERVICE_INFO_TIMEOUT_MS):
+                    return
+                for address in info.parsed_addresses(IPVersion.V4Only):
+                    if address in hosts:
+                        continue
+                    hosts.add(address)
+                    for device in await self.backend.scan(loop, timeout=timeout, hosts=[address]):
+                        found.put_nowait(device)
+            except Exception as e:
+                logger.debug(f"Lookup of {name} failed: {e}")
+
+        def start_lookup(service_type, name):
+            task = asyncio.create_task(lookup(service_type, name))
+            lookups.add(task)
+            task.add_done_callback(lookups.discard)
+
+        def on_service_state_change(zeroconf, service_type, name, state_change):
+            if state_change is ServiceStateChange.Added:
+                loop.call_soon_threadsafe(start_lookup, service_type, name)
+
+        browser = AsyncServiceBrowser(aiozc.zeroconf, SERVICE_TYPES, handlers=[on_service_state_change])
+        deadline = loop.time() + timeout
+        try:
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    yield await asyncio.wait_for(found.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            await browser.async_cancel()
+            for task in list(lookups):
+                task.cancel()
+            await asyncio.gather(*lookups, return_exceptions=True)
+            await aiozc.async_close()
+
+    async def stream(self, timeout=None):
+        """
+        Yields devices one by one as they are discovered, then stores them as the latest scan result.
+
+        Args:
+            timeout (float): Seconds to listen for devices. Defaults to DEVICE_SCAN.timeout.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        # Backends such as the simulator provide their own incremental scan
+        scan_iter = getattr(self.backend, "scan_iter", None) or self._mdns_scan_iter
+        devices = {}
+        async for device in scan_iter(loop, timeout or self.timeout):
+            if device.identifier in devices:
+                continue
+            devices[device.identifier] = device
+            yield device
+        self.devices = list(devices.values())
+        self.scanned_at = time.time()
+        self._completed = time.monotonic()
+        logger.info(f"📡 Streaming device scan found {len(self.devices)} device(s) in {self._completed - started:.1f}s.")
+
+    def lookup(self, identifier):
+        """
+        Returns a device from the last scan by any of its identifiers, if the scan is recent.
+        Results are trusted for two background intervals, or for the cache TTL if background
+        scanning is disabled.
+
+        Returns:
+            pyatv.interface.BaseConfig: The device configuration or None.
+        """
+        max_age = 2 * self.interval if self.interval else self.cache_ttl
+        if self.age is None or self.age > max_age:
+            return None
+        for device in self.devices:
+            if identifier in device.all_identifiers:
+                return device
+        return None
+
+    def forget(self, identifier):
+        """
+        Drops a device from the last scan, e.g. after it could not be reached at its scanned address.
+        """
+        self.devices = [device for device in self.devices if identifier not in device.all_identifiers]
+
+    async def _background(self):
+        while True:
+            try:
+                await self.scan(refresh=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Background device scan failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """
+        Starts the background scanner if an interval is configured.
+        """
+        if self.interval and (self._background_task is None or self._background_task.done()):
+            logger.info(f"📡 Starting background device scans every {self.interval}s.")
+            self._background_task = asyncio.create_task(self._background())
+
+    async def stop(self):
+        """
+        Stops the background scanner.
+        """
+        if self._background_task:
+            self._background_task.cancel()
+            await asyncio.gather(self._background_task, return_exceptions=True)
+            self._background_task = None
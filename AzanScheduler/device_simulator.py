@@ -0,0 +1,198 @@
+import random
+import asyncio
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+
+class SimulatedService:
+    """
+    Mimics pyatv.interface.BaseService for a simulated device.
+    """
+
+    def __init__(self, protocol="Protocol.RAOP", port=7000):
+        self.protocol = protocol
+        self.port = port
+        self.credentials = None
+        self.requires_password = False
+        self.password = None
+        self.pairing = "PairingRequirement.NotNeeded"
+
+
+class SimulatedDeviceConfig:
+    """
+    Mimics pyatv.interface.BaseConfig as returned by pyatv.scan.
+    """
+
+    def __init__(self, identifier, index):
+        self.identifier = identifier
+        self.all_identifiers = [identifier]
+        self.name = f"Simulated Speaker {index + 1}"
+        self.address = f"127.0.{index // 250}.{index % 250 + 1}"
+        self.services = [SimulatedService()]
+        self.deep_sleep = False
+        self.device_info = "Simulated HomePod"
+        self.ready = True
+
+
+class SimulatedAudio:
+    def __init__(self, device):
+        self.device = device
+        self.volume = 0.0
+
+    async def set_volume(self, level):
+        await self.device.simulator._delay(self.device.simulator.command_latency)
+        self.volume = level
+
+
+class SimulatedStream:
+    def __init__(self, device):
+        self.device = device
+
+    async def stream_file(self, file, /, metadata=None, override_missing_metadata=False, **kwargs):
+        simulator = self.device.simulator
+        loop = asyncio.get_running_loop()
+        playback = {"identifier": self.device.config.identifier, "file": file, "started": loop.time(), "finished": None}
+        simulator.playbacks.append(playback)
+        await simulator._delay(simulator.stream_duration)
+        if simulator._should_fail():
+            simulator.failures += 1
+            raise ConnectionError(f"Simulated stream failure on {self.device.config.name}")
+        playback["finished"] = loop.time()
+
+
+class SimulatedAppleTV:
+    """
+    Mimics the connected pyatv.interface.AppleTV facade for the calls AzanScheduler makes.
+    """
+
+    def __init__(self, simulator, config):
+        self.simulator = simulator
+        self.config = config
+        self.audio = SimulatedAudio(self)
+        self.stream = SimulatedStream(self)
+        self.listener = None
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        if self.listener:
+            self.listener.connection_closed()
+
+
+class DeviceSimulator:
+    """
+    In-process stand-in for the pyatv module, exposing scan() and connect() with
+    configurable discovery delay, connect latency, stream duration and failure rate.
+    """
+
+    def __init__(self, devices=5, discovery_delay=0.5, connect_latency=0.1, command_latency=0.01,
+                 stream_duration=1.0, failure_rate=0.0, jitter=0.1, accept_unknown=True, seed=None):
+        """
+        Args:
+            devices (int): The number of devices returned by a full scan.
+            discovery_delay (float): Seconds a scan takes.
+            connect_latency (float): Seconds a connect takes.
+            command_latency (float): Seconds a device command such as set_volume takes.
+            stream_duration (float): Seconds a stream_file call takes.
+            failure_rate (float): Probability (0.0 to 1.0) that a connect or stream fails.
+            jitter (float): Random +/- fraction applied to every delay.
+            accept_unknown (bool): Answer scans for identifiers outside the simulated fleet.
+            seed (int): Seed for reproducible runs.
+        """
+        self.discovery_delay = discovery_delay
+        self.connect_latency = connect_latency
+        self.command_latency = command_latency
+        self.stream_duration = stream_duration
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self.accept_unknown = accept_unknown
+        self.random = random.Random(seed)
+        self.devices = {}
+        for index in range(devices):
+            self._add_device(f"sim-{index:04d}")
+        self.offline = set()  # identifiers of devices that no longer answer
+        self.scans = 0
+        self.connects = 0
+        self.failures = 0
+        self.playbacks = []
+
+    @classmethod
+    def instant(cls, devices=3, seed=1, **options):
+        """
+        Returns a reproducible simulator whose devices answer without delay or jitter.
+
+        Args:
+            devices (int): The number of devices returned by a full scan.
+            seed (int): Seed for reproducible runs.
+            **options: Any other constructor argument, e.g. discovery_delay, overriding the instant default.
+
+        Returns:
+            DeviceSimulator: The simulator.
+        """
+        defaults = dict(discovery_delay=0, connect_latency=0, command_latency=0, stream_duration=0, jitter=0)
+        return cls(devices=devices, seed=seed, **{**defaults, **options})
+
+    @property
+    def identifiers(self):
+        return list(self.devices)
+
+    def _add_device(self, identifier):
+        config = SimulatedDeviceConfig(identifier, len(self.devices))
+        self.devices[identifier] = config
+        return config
+
+    async def _delay(self, seconds):
+        if seconds > 0:
+            await asyncio.sleep(seconds * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def _should_fail(self):
+        return self.failure_rate > 0 and self.random.random() < self.failure_rate
+
+    async def scan(self, loop, timeout=5, identifier=None, protocol=None, hosts=None, aiozc=None, storage=None):
+        """
+        Mimics pyatv.scan.
+        """
+        self.scans += 1
+        await self._delay(self.discovery_delay)
+        if identifier is None:
+            return list(self.devices.values())
+        wanted = identifier if isinstance(identifier, set) else {identifier}
+        found = [config for key, config in self.devices.items() if key in wanted]
+        if not found and self.accept_unknown:
+            found = [self._add_device(key) for key in sorted(wanted)]
+        return found
+
+    async def scan_iter(self, loop, timeout=5):
+        """
+        Yields the simulated devices one by one, spread over the discovery delay, the way
+        they would arrive from mDNS responses.
+        """
+        self.scans += 1
+        devices = list(self.devices.values())
+        for config in devices:
+            await self._delay(self.discovery_delay / max(len(devices), 1))
+            yield config
+
+    async def probe(self, config, timeout):
+        """
+        Mimics a TCP reachability probe of a device, used by the health monitor.
+        """
+        await self._delay(self.command_latency)
+        if config.identifier in self.offline or self._should_fail():
+            raise ConnectionError(f"Simulated device {config.name} did not answer")
+
+    async def connect(self, config, loop, protocol=None, session=None, storage=None):
+        """
+        Mimics pyatv.connect.
+        """
+        self.connects += 1
+        await self._delay(self.connect_latency)
+        if config.identifier in self.offline:
+            raise ConnectionError(f"Simulated device {config.name} is offline")
+        if self._should_fail():
+            self.failures += 1
+            raise ConnectionError(f"Simulated connect failure on {config.name}")
+        return SimulatedAppleTV(self, config)
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from datetime import datetime
+from AzanScheduler.config_manager import ConfigManager, SystemConfigManager
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+
+class Subscription:
+    """
+    One client's view of the broadcast: a bounded queue of events. When the client falls behind,
+    the oldest events are dropped and counted instead of slowing down the publisher.
+    """
+
+    def __init__(self, broadcaster, queue_size):
+        self.broadcaster = broadcaster
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._reported = 0
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        """
+        Returns the next event. If events were dropped since the last call, an "overflow" event
+        with the number of dropped events is returned first.
+        """
+        if self.dropped > self._reported:
+            lost, self._reported = self.dropped - self._reported, self.dropped
+            return {"event": "overflow", "data": {"dropped": lost}}
+        return await self.queue.get()
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class EventBroadcaster:
+    """
+    Fans scheduler lifecycle events out to every connected UI client (SSE or WebSocket).
+
+    publish() never blocks and never fails: every client has its own bounded queue, so a slow
+    browser tab only loses its own oldest events and cannot hold up the scheduler. publish() may
+    be called from worker threads (e.g. the timetable refresh); the event is handed to the loop.
+
+    With several API workers, the workers that are not the scheduler leader set relaying: they
+    drop their own events and deliver the leader's through relay() instead.
+    """
+
+    def __init__(self, queue_size=None):
+        """
+        Args:
+            queue_size (int): Events buffered per client before the oldest are dropped.
+        """
+        events_config = sys_config.load_sys_config("EVENTS") or {}
+        self.queue_size = queue_size or events_config.get("queue_size", 100)
+        self.heartbeat = events_config.get("heartbeat", 15)
+        self.subscriptions = set()
+        self._loop = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.relaying = False
+        ConfigManager.subscribe(self._on_config_changed)
+
+    def subscribe(self):
+        """
+        Registers a client. Must be called from the event loop.
+
+        Returns:
+            Subscription: The client's queue. Close it when the client goes away.
+        """
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, self.queue_size)
+        self.subscriptions.add(subscription)
+        logger.info(f"📡 Event client connected ({len(self.subscriptions)} connected).")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Removes a client.
+        """
+        if subscription in self.subscriptions:
+            self.subscriptions.discard(subscription)
+            logger.info(f"📡 Event client disconnected ({len(self.subscriptions)} connected).")
+
+    def publish(self, event, data=None):
+        """
+        Broadcasts an event to every connected client.
+
+        Args:
+            event (str): The event name.
+            data (dict): The JSON-serializable event payload.
+        """
+        if not self.subscriptions or self.relaying:
+            return
+        with self._lock:
+            self._sequence += 1
+            message = {"event": event, "id": self._sequence, "time": datetime.now().astimezone().isoformat(), "data": data or {}}
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._deliver(message)
+        elif self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, message)
+
+    def relay(self, message):
+        """
+        Delivers an event published by the scheduler leader's broadcaster, as is. Must be called from the event loop.
+
+        Args:
+            message (dict): The event, with its event name, id, time and data.
+        """
+        self._deliver(message)
+
+    def _deliver(self, message):
+        for subscription in list(self.subscriptions):
+            subscription._put(message)
+
+    def _on_config_changed(self, changed_keys):
+        self.publish("config_changed", {"keys": sorted(changed_keys)})
+
+
+# Shared broadcaster used by the scheduler, the device manager and the API
+event_broadcaster = EventBroadcaster()
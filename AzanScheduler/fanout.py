@@ -0,0 +1,73 @@
+import time
+import asyncio
+from tenacity import AsyncRetrying, stop_after_attempt, wait_fixed
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+
+class FanoutEngine:
+    """
+    Runs one coroutine per device with a concurrency cap, a per-device timeout
+    and a retry policy, and reports a structured result for every device.
+
+    The workers only set devices up, so each attempt is bounded by the short
+    setup_timeout. device_timeout bounds the playback that follows and is read
+    by the caller.
+    """
+
+    def __init__(self, concurrency=None, device_timeout=None, retries=None, retry_wait=None, setup_timeout=None):
+        fanout_config = sys_config.load_sys_config("FANOUT") or {}
+        self.concurrency = concurrency or fanout_config.get("concurrency", 16)
+        self.setup_timeout = setup_timeout or fanout_config.get("setup_timeout", 10)
+        self.device_timeout = device_timeout or fanout_config.get("device_timeout", 900)
+        self.retries = retries if retries is not None else fanout_config.get("retries", 1)
+        self.retry_wait = retry_wait if retry_wait is not None else fanout_config.get("retry_wait", 2)
+
+    async def _run_one(self, semaphore, identifier, worker):
+        """
+        Runs the worker for a single device and converts the outcome into a result dict.
+        """
+        result = {"identifier": identifier, "status": "success", "attempts": 0, "elapsed_ms": 0.0, "message": ""}
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                async for attempt in AsyncRetrying(
+                    stop=stop_after_attempt(self.retries + 1),
+                    wait=wait_fixed(self.retry_wait),
+                    reraise=True,
+                ):
+                    with attempt:
+                        result["attempts"] += 1
+                        await asyncio.wait_for(worker(identifier), self.setup_timeout)
+            except asyncio.TimeoutError:
+                result["status"] = "timeout"
+                result["message"] = f"Timed out after {self.setup_timeout} seconds."
+            except Exception as e:
+                result["status"] = "fail"
+                result["message"] = str(e)
+            result["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+
+        if result["status"] != "success":
+            logger.error(f"❌ Device {identifier} failed after {result['attempts']} attempt(s): {result['message']}")
+        return result
+
+    async def run(self, identifiers, worker):
+        """
+        Runs the worker for every device identifier.
+
+        Args:
+            identifiers (list): The device identifiers to fan out to.
+            worker (callable): An async callable taking an identifier and raising on failure.
+
+        Returns:
+            list: One result dict per identifier, in the same order.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return list(await asyncio.gather(*(self._run_one(semaphore, identifier, worker) for identifier in identifiers)))
@@ -0,0 +1,41 @@
+import sys
+from contextlib import contextmanager
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+def lock(lock_file, blocking=True):
+    """
+    Takes an exclusive lock on an open file, shared by every process using the same file.
+    The operating system releases it when the file is closed, even if the process crashes.
+
+    Args:
+        lock_file: The open lock file.
+        blocking (bool): Wait for the lock. On Windows the wait gives up after about 10 seconds.
+
+    Raises:
+        OSError: If the lock is held by someone else and blocking is False (or the wait gave up).
+    """
+    if sys.platform == "win32":
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+@contextmanager
+def locked(path):
+    """
+    Holds an exclusive lock on the file at path for the duration of the with block, waiting for it if needed.
+    """
+    with open(path, "a+") as lock_file:
+        lock(lock_file)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,171 @@
+import time
+import asyncio
+from datetime import datetime
+from AzanScheduler.config_manager import ConfigManager, SystemConfigManager
+from AzanScheduler.connection_pool import tcp_probe
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the configuration manager instances
+config = ConfigManager()
+sys_config = SystemConfigManager()
+
+
+class HealthMonitor:
+    """
+    Periodically probes every device configured in DEVICES with a TCP connect to one of its
+    advertised service ports and records reachability and round-trip time.
+
+    A device is "healthy" after a successful probe, "degraded" after fewer than
+    failure_threshold consecutive failures and "dead" after that many. Healthy devices can
+    be kept connected in the pool, and announcements can skip dead devices instead of
+    spending the discovery timeout on them.
+    """
+
+    def __init__(self, manager, interval=None, probe_timeout=None, failure_threshold=None, warm_pool=None, skip_dead=None):
+        """
+        Args:
+            manager (AppleManager): The manager whose backend, scanner and pool are used.
+            interval (float): Seconds between probe rounds.
+            probe_timeout (float): Seconds to wait for a device to answer a probe.
+            failure_threshold (int): Consecutive failed probes before a device is considered dead.
+            warm_pool (bool): Keep a pooled connection open to every healthy device.
+            skip_dead (bool): Let announcements skip devices considered dead.
+        """
+        self.manager = manager
+        health_config = sys_config.load_sys_config("HEALTH_MONITOR") or {}
+        self.enabled = str(health_config.get("enabled", "On")).lower() == "on"
+        self.interval = interval or health_config.get("interval", 60)
+        self.probe_timeout = probe_timeout or health_config.get("probe_timeout", 2)
+        self.failure_threshold = failure_threshold or health_config.get("failure_threshold", 3)
+        if warm_pool is None:
+            warm_pool = str(health_config.get("warm_pool", "On")).lower() == "on"
+        if skip_dead is None:
+            skip_dead = str(health_config.get("skip_dead", "On")).lower() == "on"
+        self.warm_pool = warm_pool
+        self.skip_dead = skip_dead
+        self.devices = {}  # identifier -> health dict
+        self._task = None
+        self._rechecks = set()
+
+    def _entry(self, identifier):
+        if identifier not in self.devices:
+            self.devices[identifier] = {
+                "identifier": identifier,
+                "name": None,
+                "address": None,
+                "state": "unknown",
+                "rtt_ms": None,
+                "consecutive_failures": 0,
+                "last_checked": None,
+                "last_seen": None,
+                "error": None,
+            }
+        return self.devices[identifier]
+
+    async def probe(self, identifier):
+        """
+        Probes one device and updates its health entry.
+
+        Returns:
+            dict: The health entry of the device.
+        """
+        entry = self._entry(identifier)
+        loop = asyncio.get_running_loop()
+        entry["last_checked"] = datetime.now().astimezone().isoformat()
+        try:
+            device = self.manager.pool.get_device(identifier) or self.manager.scanner.lookup(identifier)
+            if device is None:
+                device = await self.manager._discover_device(loop, identifier)
+            if device is None:
+                raise LookupError("not found on the network")
+            entry["name"], entry["address"] = device.name, str(device.address)
+
+            probe = getattr(self.manager.backend, "probe", None) or tcp_probe
+            started = time.monotonic()
+            await probe(device, self.probe_timeout)
+            entry["rtt_ms"] = round((time.monotonic() - started) * 1000, 1)
+        except Exception as e:
+            entry["consecutive_failures"] += 1
+            entry["error"] = str(e) or type(e).__name__
+            previous = entry["state"]
+            entry["state"] = "dead" if entry["consecutive_failures"] >= self.failure_threshold else "degraded"
+            if entry["state"] != previous:
+                logger.warning(f"⚠️ Device {entry['name'] or identifier} is {entry['state']}: {entry['error']}")
+            # A pooled session to a dead device is of no use, but one that is streaming is left
+            # to the pool, which reconnects it once the stream has ended
+            if entry["state"] == "dead" and not self.manager.pool.in_use(identifier):
+                self.manager.pool.discard(identifier)
+            return entry
+
+        if entry["state"] != "healthy":
+            logger.info(f"💚 Device {device.name} is reachable ({entry['rtt_ms']} ms).")
+        entry.update({"state": "healthy", "consecutive_failures": 0, "error": None, "last_seen": entry["last_checked"]})
+        if self.warm_pool and not self.manager.pool.is_connected(identifier):
+            try:
+                atv = await self.manager.pool.acquire(loop, device, identifier, keep_warm=True)
+                self.manager.pool.release(identifier, atv)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to warm the connection to {device.name}: {e}")
+        return entry
+
+    async def check_all(self):
+        """
+        Probes every configured device once, concurrently.
+
+        Returns:
+            list: The health entries of the configured devices.
+        """
+        identifiers = config.load_config("DEVICES") or []
+        # Forget devices that were removed from the configuration
+        self.devices = {identifier: entry for identifier, entry in self.devices.items() if identifier in identifiers}
+        return list(await asyncio.gather(*(self.probe(identifier) for identifier in identifiers)))
+
+    def recheck(self, identifier):
+        """
+        Probes a device again in the background, e.g. after an announcement skipped it.
+        """
+        task = asyncio.create_task(self.probe(identifier))
+        self._rechecks.add(task)
+        task.add_done_callback(self._rechecks.discard)
+
+    def is_dead(self, identifier):
+        """
+        Returns True if the device failed its last failure_threshold probes.
+        """
+        entry = self.devices.get(identifier)
+        return bool(entry) and entry["state"] == "dead"
+
+    def snapshot(self):
+        """
+        Returns the health entries of all monitored devices.
+        """
+        return [dict(entry) for entry in self.devices.values()]
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"❌ Device health check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """
+        Starts the background monitor if it is enabled.
+        """
+        if self.enabled and (self._task is None or self._task.done()):
+            logger.info(f"💚 Starting device health monitor every {self.interval}s.")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the background monitor.
+        """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,178 @@
+import gzip
+from fastapi.responses import JSONResponse
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.logging_config import get_logger
+
+# Optional speedups: without orjson responses use the json module, without brotli they are gzipped only
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+# Content types worth compressing. Audio is already compressed and event streams must not be buffered.
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+# Bodies at least this large are compressed in the blocking pool instead of on the event loop
+POOL_MINIMUM_SIZE = 256 * 1024
+
+
+def merge_vary(headers):
+    """
+    Adds Accept-Encoding to the Vary header of a response, keeping the fields it already lists.
+
+    Args:
+        headers (list): The raw (name, value) header pairs of the response.
+
+    Returns:
+        list: The header pairs with a single merged Vary header.
+    """
+    fields = []
+    merged = []
+    for name, value in headers:
+        if name.lower() == b"vary":
+            fields += [field.strip() for field in value.decode("latin-1").split(",") if field.strip()]
+        else:
+            merged.append((name, value))
+    if not any(field == "*" or field.lower() == "accept-encoding" for field in fields):
+        fields.append("Accept-Encoding")
+    merged.append((b"vary", ", ".join(fields).encode("latin-1")))
+    return merged
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson, several times faster than the json module on large payloads
+    such as timetables and device scans. The output is the same compact UTF-8 JSON.
+    """
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def response_settings():
+    """
+    Reads HTTP_RESPONSES from system.json and returns the default response class and the
+    CompressionMiddleware options, or None if compression is off.
+
+    Returns:
+        tuple: (response class, dict or None)
+    """
+    responses_config = sys_config.load_sys_config("HTTP_RESPONSES") or {}
+    response_class = JSONResponse
+    if str(responses_config.get("orjson", "On")).lower() == "on":
+        if orjson:
+            response_class = FastJSONResponse
+        else:
+            logger.warning("⚠️ orjson is not installed, API responses use the standard JSON encoder.")
+    compression = None
+    if str(responses_config.get("compression", "On")).lower() == "on":
+        compression = {
+            "minimum_size": responses_config.get("minimum_size", 1024),
+            "gzip_level": responses_config.get("gzip_level", 6),
+            "brotli_quality": responses_config.get("brotli_quality", 4),
+        }
+    return response_class, compression
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli (if installed and accepted by the client)
+    or gzip. Only single-chunk bodies of a compressible type and at least minimum_size bytes are
+    compressed; streamed responses (Server-Sent Events, media files) pass through untouched.
+    Every single-chunk response of a compressible type, compressed or not, gets Accept-Encoding
+    merged into its Vary header so caches keep the encodings apart.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        """
+        Args:
+            app: The ASGI application.
+            minimum_size (int): Smallest body in bytes worth compressing.
+            gzip_level (int): gzip compression level (1-9).
+            brotli_quality (int): brotli quality (0-11).
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoding(self, scope):
+        """
+        Returns the encoding to use for the request's Accept-Encoding header, or None.
+        """
+        accepted = set()
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accepted.update(part.split(";")[0].strip() for part in value.decode("latin-1").lower().split(","))
+        if brotli and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def compress(self, body, encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._encoding(scope)
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether the response is worth compressing
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            start_message, start = start, None
+            headers = {name.lower(): value for name, value in start_message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            body = message.get("body", b"")
+            if (message.get("more_body", False) or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start_message)
+                await send(message)
+                return
+            if encoding is None or len(body) < self.minimum_size:
+                await send({**start_message, "headers": merge_vary(start_message.get("headers", []))})
+                await send(message)
+                return
+            if len(body) >= POOL_MINIMUM_SIZE:
+                body = await blocking_pool.run(self.compress, body, encoding)
+            else:
+                body = self.compress(body, encoding)
+            response_headers = []
+            for name, value in start_message.get("headers", []):
+                if name.lower() == b"content-length":
+                    continue
+                if name.lower() == b"etag" and value.startswith(b'"'):
+                    # The compressed bytes differ from the identity ones
+                    value = b"W/" + value
+                response_headers.append((name, value))
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({**start_message, "headers": merge_vary(response_headers)})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,143 @@
+import os
+import json
+import asyncio
+from datetime import datetime
+from AzanScheduler import file_lock
+from AzanScheduler.config_manager import ConfigManager, SystemConfigManager
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+
+class LeaderElection:
+    """
+    Elects the one API worker process that runs the scheduler when the API runs in several
+    worker processes (WORKERS.count in system.json).
+
+    Every worker tries to take an exclusive, non-blocking lock on a local lock file; the one
+    holding it is the leader and publishes the URL of its control endpoint in a leader file.
+    The operating system releases the lock as soon as the leader process exits, even if it
+    crashes, and the other workers retry every failover_interval seconds, so one of them takes
+    over within that time. The scheduler journal keeps the new leader from replaying a prayer.
+    """
+
+    def __init__(self, workers=None, lock_path=None, failover_interval=None):
+        """
+        Args:
+            workers (int): Number of API worker processes. Election only runs with more than one.
+            lock_path (str): The lock file. Defaults to config/scheduler.lock.
+            failover_interval (float): Seconds between attempts to take over the lock.
+        """
+        workers_config = sys_config.load_sys_config("WORKERS") or {}
+        self.workers = workers or workers_config.get("count", 1)
+        self.enabled = self.workers > 1
+        self.failover_interval = failover_interval or workers_config.get("failover_interval", 1)
+        self.lock_path = lock_path or os.path.join(ConfigManager().config_dir_path, "scheduler.lock")
+        self.leader_path = f"{os.path.splitext(self.lock_path)[0]}_leader.json"
+        self.is_leader = False
+        self._lock_file = None
+        self._task = None
+
+    def _try_lock(self):
+        """
+        Takes the lock file without waiting.
+
+        Returns:
+            bool: True if this process now holds the lock.
+        """
+        lock_file = open(self.lock_path, "a+")
+        try:
+            file_lock.lock(lock_file, blocking=False)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release(self):
+        """
+        Removes the leader file and releases the lock.
+        """
+        leader = self.leader()
+        try:
+            if leader and leader.get("pid") == os.getpid():
+                os.remove(self.leader_path)
+        except OSError:
+            pass
+        if self._lock_file:
+            # Closing the file releases the lock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _publish(self, control_url):
+        """
+        Writes the leader's process id and control URL to the leader file.
+        """
+        temp_path = f"{self.leader_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"pid": os.getpid(), "control_url": control_url, "elected": datetime.now().astimezone().isoformat()}, f)
+        os.replace(temp_path, self.leader_path)
+
+    def leader(self):
+        """
+        Returns the current leader as published in the leader file, or None if there is none yet.
+
+        Returns:
+            dict: The leader's pid, control_url and election time.
+        """
+        try:
+            with open(self.leader_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    async def _campaign(self, on_elected):
+        while not self.is_leader:
+            if await blocking_pool.run(self._try_lock):
+                self.is_leader = True
+                logger.info(f"👑 Worker {os.getpid()} was elected scheduler leader.")
+                try:
+                    control_url = await on_elected()
+                    await blocking_pool.run(self._publish, control_url)
+                except Exception as e:
+                    logger.error(f"❌ Scheduler leader failed to start, stepping down: {e}")
+                    self.is_leader = False
+                    self._release()
+                    await asyncio.sleep(self.failover_interval)
+                continue
+            await asyncio.sleep(self.failover_interval)
+
+    def start(self, on_elected):
+        """
+        Starts campaigning for leadership if the API runs in several workers.
+
+        Args:
+            on_elected (callable): Coroutine function run once this worker is elected. It starts
+                the scheduler and returns the URL other workers forward scheduler calls to.
+        """
+        if self.enabled and (self._task is None or self._task.done()):
+            logger.info(f"🗳️ Worker {os.getpid()} is campaigning for scheduler leader.")
+            self._task = asyncio.create_task(self._campaign(on_elected))
+
+    async def stop(self):
+        """
+        Stops campaigning and, if this worker is the leader, steps down so another worker takes over.
+        """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            logger.info(f"👑 Worker {os.getpid()} is stepping down as scheduler leader.")
+            self.is_leader = False
+        self._release()
+
+
+# Shared election used by the API workers
+leader_election = LeaderElection()
@@ -10,11 +10,24 @@ log_folder = "logs"
 os.makedirs(log_folder, exist_ok=True)
 
 # Configure logging
-log_file = os.path.join(log_folder, "application.log")
 log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
 
+# Set by the first process that imports this module and inherited by every process it starts.
+# API worker processes (multi-worker mode) re-import this module before multiprocessing knows
+# they are children, so the variable is what tells them apart. They must not rename the main
+# process's open log, and sharing one rotating file between processes breaks its rollover, so
+# each worker writes its own file.
+LOG_OWNER_ENV = "AZAN_LOG_OWNER_PID"
+
+log_owner = os.environ.setdefault(LOG_OWNER_ENV, str(os.getpid()))
+is_main_process = log_owner == str(os.getpid())
+if is_main_process:
+    log_file = os.path.join(log_folder, "application.log")
+else:
+    log_file = os.path.join(log_folder, f"application_worker_{os.getpid()}.log")
+
 # Rotate the log file if it already exists
-if os.path.exists(log_file):
+if is_main_process and os.path.exists(log_file):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     rotated_log_file = os.path.join(log_folder, f"application_{timestamp}.log")
     os.rename(log_file, rotated_log_file)
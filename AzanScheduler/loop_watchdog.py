@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from AzanScheduler import metrics
+from AzanScheduler.config_manager import SystemConfigManager
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+# Stalls are labelled with the innermost frame from this package, which is the code to fix
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag and reports blocking calls made on the loop.
+
+    A task on the loop wakes up every interval and records how late it woke up. A watcher
+    thread checks that the task keeps beating; when the loop has been stuck for longer than
+    threshold, it captures the loop thread's stack while the blocking call is still running,
+    logs it and counts the stall by the blocking frame. The cost is one short wakeup per
+    interval on the loop and one in the watcher thread.
+    """
+
+    def __init__(self, interval=None, threshold=None, enabled=None, history=20):
+        """
+        Args:
+            interval (float): Seconds between lag measurements.
+            threshold (float): Seconds the loop may be stuck before its stack is captured.
+            enabled (bool): Run the watchdog when start() is called.
+            history (int): Recent stalls kept for inspection.
+        """
+        watchdog_config = sys_config.load_sys_config("LOOP_WATCHDOG") or {}
+        if enabled is None:
+            enabled = str(watchdog_config.get("enabled", "Off")).lower() == "on"
+        self.enabled = enabled
+        self.interval = interval or watchdog_config.get("interval", 0.1)
+        self.threshold = threshold or watchdog_config.get("threshold", 0.25)
+        self.stalls = deque(maxlen=history)
+        self._last_beat = 0.0
+        self._reported_beat = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            metrics.loop_lag.observe(lag)
+            if self._reported_beat is not None:
+                self._reported_beat = None
+                logger.warning(f"🐢 Event loop unblocked after {lag + self.interval:.2f}s.")
+
+    def _blocking_location(self, frame):
+        """
+        Returns "file:line function" for the innermost frame from this package, or the innermost frame.
+        """
+        innermost = frame
+        while frame is not None:
+            if frame.f_code.co_filename.startswith(PACKAGE_DIR):
+                innermost = frame
+                break
+            frame = frame.f_back
+        code = innermost.f_code
+        return f"{os.path.basename(code.co_filename)}:{innermost.f_lineno} {code.co_name}"
+
+    def _check(self):
+        """
+        Captures the loop thread's stack if the loop has been stuck for longer than threshold.
+        """
+        last_beat = self._last_beat
+        stuck = time.monotonic() - last_beat - self.interval
+        if stuck < self.threshold or self._reported_beat == last_beat:
+            return
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        self._reported_beat = last_beat
+        location = self._blocking_location(frame)
+        stack = "".join(traceback.format_stack(frame))
+        metrics.loop_stalls.inc(location)
+        self.stalls.append({"location": location, "stuck_seconds": round(stuck, 3), "stack": stack})
+        logger.warning(f"🐢 Event loop blocked for {stuck:.2f}s at {location}:\n{stack}")
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._check()
+            except Exception as e:
+                logger.error(f"❌ Loop watchdog check failed: {e}")
+
+    def start(self):
+        """
+        Starts the watchdog on the running loop if it is enabled.
+        """
+        if not self.enabled or (self._task and not self._task.done()):
+            return
+        logger.info(f"🐢 Starting event loop watchdog (interval {self.interval}s, threshold {self.threshold}s).")
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._reported_beat = None
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="azan-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """
+        Stops the watchdog.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Shared watchdog started with the API
+loop_watchdog = LoopWatchdog()
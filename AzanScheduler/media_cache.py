@@ -0,0 +1,197 @@
+import os
+import json
+import uuid
+import wave
+import hashlib
+import threading
+import miniaudio
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# The format pyatv streams to AirPlay receivers: 16-bit stereo PCM at 44.1 kHz.
+# Prepared files already match it, so nothing is decoded or resampled at play time.
+PREPARED_SAMPLE_RATE = 44100
+PREPARED_CHANNELS = 2
+PREPARED_SAMPLE_WIDTH = 2
+PREPARED_EXTENSION = ".wav"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    """
+    Content-addressed cache of audio files pre-transcoded to the format streamed to devices.
+
+    Preparing a file hashes its content, decodes it once to 16-bit stereo PCM at 44.1 kHz
+    and stores the result as <sha256>.wav in the cache folder. An index keyed by source path,
+    size and mtime lets resolve() find the prepared artifact with a single stat() call.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(os.getcwd(), 'media', '.prepared')
+        self.index_file_path = os.path.join(self.cache_dir, 'index.json')
+        self.index = self._load_index()
+        # Guards the index and its file: prepare() and prune() run in pool threads
+        self._index_lock = threading.RLock()
+
+    def _load_index(self):
+        try:
+            with open(self.index_file_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        """
+        Writes the index to a uniquely named temporary file and renames it into place.
+        """
+        temp_path = f"{self.index_file_path}.{uuid.uuid4().hex}.tmp"
+        with self._index_lock:
+            try:
+                with open(temp_path, "w") as f:
+                    json.dump(self.index, f, indent=4)
+                os.replace(temp_path, self.index_file_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def _lookup(self, source_path):
+        """
+        Returns the index entry for a source file if it is still current, otherwise None.
+        """
+        entry = self.index.get(os.path.abspath(source_path))
+        if not entry:
+            return None
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return None
+        if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+            return None
+        if not os.path.exists(entry["prepared"]):
+            return None
+        return entry
+
+    def _transcode(self, source_path, target_path):
+        """
+        Decodes the source file and writes it as a PCM WAV file in the prepared format.
+        """
+        temp_path = f"{target_path}.tmp"
+        frames = miniaudio.stream_file(
+            source_path,
+            output_format=miniaudio.SampleFormat.SIGNED16,
+            nchannels=PREPARED_CHANNELS,
+            sample_rate=PREPARED_SAMPLE_RATE,
+            frames_to_read=PREPARED_SAMPLE_RATE,
+        )
+        with wave.open(temp_path, "wb") as out_file:
+            out_file.setnchannels(PREPARED_CHANNELS)
+            out_file.setsampwidth(PREPARED_SAMPLE_WIDTH)
+            out_file.setframerate(PREPARED_SAMPLE_RATE)
+            for chunk in frames:
+                out_file.writeframes(chunk.tobytes())
+        os.replace(temp_path, target_path)
+
+    def prepare(self, source_path, content_hash=None):
+        """
+        Prepares a single audio file. Blocking: run it in a thread from async code.
+
+        Args:
+            source_path (str): The path of the audio file to prepare.
+            content_hash (str): The SHA-256 of the file if already known, e.g. computed during upload.
+
+        Returns:
+            str: The path of the prepared artifact, or None if the file could not be prepared.
+        """
+        entry = self._lookup(source_path)
+        if entry:
+            return entry["prepared"]
+        try:
+            stat = os.stat(source_path)
+            content_hash = content_hash or file_sha256(source_path)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prepared_path = os.path.join(self.cache_dir, f"{content_hash}{PREPARED_EXTENSION}")
+            if not os.path.exists(prepared_path):
+                logger.info(f"🎛️ Preparing audio file: {source_path}")
+                self._transcode(source_path, prepared_path)
+                logger.info(f"✅ Prepared audio file {os.path.basename(source_path)} as {os.path.basename(prepared_path)}")
+            with self._index_lock:
+                self.index[os.path.abspath(source_path)] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": content_hash,
+                    "prepared": prepared_path,
+                }
+                self._save_index()
+            return prepared_path
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to prepare audio file {source_path}, it will be streamed as is: {e}")
+            return None
+
+    def prepare_all(self, source_paths):
+        """
+        Prepares every existing file in the list and prunes artifacts no longer referenced.
+        Blocking: run it in a thread from async code.
+        """
+        for source_path in source_paths:
+            if os.path.exists(source_path):
+                self.prepare(source_path)
+        self.prune(source_paths)
+
+    def prune(self, source_paths, in_use=()):
+        """
+        Removes prepared artifacts and index entries that are not used by the given sources.
+
+        Args:
+            source_paths (list): The source files whose artifacts are kept.
+            in_use (iterable): Artifacts that are still being played and must stay on disk for now.
+        """
+        keep = {os.path.abspath(path) for path in source_paths}
+        with self._index_lock:
+            self.index = {source: entry for source, entry in self.index.items() if source in keep}
+            referenced = {entry["prepared"] for entry in self.index.values()} | set(in_use)
+            if not os.path.isdir(self.cache_dir):
+                return
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.endswith(PREPARED_EXTENSION) and path not in referenced:
+                    try:
+                        os.remove(path)
+                        logger.info(f"🧹 Removed unused prepared audio file: {name}")
+                    except OSError as e:
+                        logger.warning(f"⚠️ Failed to remove prepared audio file {name}: {e}")
+            self._save_index()
+
+    def prepared_path(self, source_path):
+        """
+        Returns the prepared artifact for a source file, or None if it has not been prepared.
+        """
+        entry = self._lookup(source_path)
+        return entry["prepared"] if entry else None
+
+    def resolve(self, source_path):
+        """
+        Returns the prepared artifact for a source file, falling back to the file itself.
+        Does no decoding or hashing, so it is safe to call at prayer time.
+        """
+        prepared_path = self.prepared_path(source_path)
+        if prepared_path:
+            return prepared_path
+        logger.warning(f"⚠️ No prepared audio for {source_path}. Streaming the original file.")
+        return source_path
+
+
+# Shared cache instance used by the scheduler and the config manager
+media_cache = MediaCache()
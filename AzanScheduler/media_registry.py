@@ -0,0 +1,198 @@
+import io
+import os
+import threading
+from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.media_cache import media_cache
+from AzanScheduler.audio_metadata import audio_metadata
+from AzanScheduler.media_server import media_store, media_file_path, AUDIO_FILE_KEYS
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the configuration manager instance
+config = ConfigManager()
+
+
+class _MappedReader(io.RawIOBase):
+    """
+    Seekable raw reader over a memory-mapped file. Each reader keeps its own position,
+    so several devices can stream the same mapping at once, and holds the mapping until it is closed.
+    """
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+        self._view = memoryview(mapping["mmap"])
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self._view) - self._pos)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            media_store.unhold(self._mapping)
+        super().close()
+
+
+class PreparedMedia:
+    """
+    A validated, ready-to-stream audio file for one config key.
+    """
+
+    def __init__(self, key, source_path, path, mapping, metadata=None):
+        self.key = key
+        self.source_path = source_path
+        self.path = path
+        self.mapping = mapping
+        self.metadata = metadata
+
+    @property
+    def duration(self):
+        """
+        The playback duration in seconds from the audio metadata index, or None if unknown.
+        """
+        return self.metadata["duration"] if self.metadata else None
+
+    def open(self):
+        """
+        Returns a new stream over the in-memory copy, or None if the file is not mapped.
+        """
+        if self.mapping is None or not media_store.hold(self.mapping):
+            return None
+        return io.BufferedReader(_MappedReader(self.mapping))
+
+    def __str__(self):
+        return self.path
+
+
+class MediaRegistry:
+    """
+    Resolves, validates, indexes and prepares the four configured audio files and memory-maps
+    their prepared artifacts once per config change, so the scheduler gets ready-to-stream handles
+    without filesystem work at prayer time.
+
+    Media taken with hold() outlives a config change: its mapping and artifact are only released
+    once the announcement playing it calls release().
+    """
+
+    def __init__(self):
+        self._entries = {}  # config key -> PreparedMedia
+        self._holds = {}  # artifact path -> number of announcements holding it
+        self._lock = threading.Lock()  # Orders holds against the swap of the entries in refresh()
+        self._refresh_lock = threading.Lock()  # Runs one refresh at a time, so one cannot prune what another prepared
+
+    def refresh(self):
+        """
+        Rebuilds the registry from the current config. Blocking: use refresh_async() from async code.
+        """
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        sources = {}
+        for key in AUDIO_FILE_KEYS:
+            file_name = config.load_config(key)
+            if not file_name:
+                logger.error(f"❌ No audio file configured for {key}.")
+                continue
+            source_path = media_file_path(file_name)
+            if not os.path.isfile(source_path) or os.path.getsize(source_path) == 0:
+                logger.error(f"❌ Audio file for {key} is missing or empty: {source_path}")
+                continue
+            sources[key] = source_path
+
+        for source_path in sources.values():
+            media_cache.prepare(source_path)
+        playable = {key: media_cache.prepared_path(source_path) or source_path for key, source_path in sources.items()}
+        # Only the prepared artifacts are mapped. They are content-addressed, so they are never overwritten,
+        # while a source file must stay replaceable by an upload (Windows cannot replace a mapped file).
+        mapped_paths = [path for key, path in playable.items() if path != sources[key]]
+        # The current entries stay mapped until they are swapped out, as they can still be handed out
+        media_store.refresh(mapped_paths + [entry.path for entry in self._entries.values()])
+
+        entries = {}
+        for key, source_path in sources.items():
+            path = playable[key]
+            mapping = media_store.mapping(path)
+            if mapping is None:
+                logger.warning(f"⚠️ {key} is not prepared or could not be held in memory, it will be streamed from disk.")
+            entries[key] = PreparedMedia(key, source_path, path, mapping, audio_metadata.index(source_path))
+        with self._lock:
+            self._entries = entries
+            # Replaced artifacts that an announcement still holds are released by its release() call
+            in_use = list(self._holds)
+            media_store.refresh(mapped_paths + in_use)
+        # Pruned after the old artifacts were unmapped, so they can also be removed on Windows
+        try:
+            media_cache.prune(list(sources.values()), in_use)
+        except Exception as e:
+            # Leftover artifacts are pruned by the next refresh; the registry itself is ready
+            logger.warning(f"⚠️ Failed to prune the prepared audio cache: {e}")
+        logger.info(f"🗂️ Media registry ready: {', '.join(f'{key}={os.path.basename(entry.path)}' for key, entry in entries.items())}")
+
+    async def refresh_async(self):
+        """
+        Rebuilds the registry in a worker thread.
+        """
+        await blocking_pool.run(self.refresh)
+
+    def get(self, key):
+        """
+        Returns the prepared media for a config key, or None if it is not available.
+        """
+        return self._entries.get(key)
+
+    def hold(self, key):
+        """
+        Returns the prepared media for a config key like get(), and keeps its mapping and artifact
+        available until release() even if the file is replaced meanwhile.
+        """
+        with self._lock:
+            media = self._entries.get(key)
+            if media:
+                self._holds[media.path] = self._holds.get(media.path, 0) + 1
+            return media
+
+    def release(self, media):
+        """
+        Lets go of media returned by hold(). A replaced artifact is unmapped once nothing holds it
+        anymore and its file is removed by the next refresh.
+        """
+        if not isinstance(media, PreparedMedia):
+            return
+        with self._lock:
+            self._holds[media.path] -= 1
+            if self._holds[media.path]:
+                return
+            del self._holds[media.path]
+            if media.path not in {entry.path for entry in self._entries.values()}:
+                media_store.release(media.path)
+
+
+# Shared registry used by the scheduler and the config manager
+media_registry = MediaRegistry()
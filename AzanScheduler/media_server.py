@@ -0,0 +1,362 @@
+import os
+import re
+import sys
+import mmap
+import socket
+import threading
+import mimetypes
+from urllib.parse import quote
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from AzanScheduler.config_manager import ConfigManager, SystemConfigManager
+from AzanScheduler.media_cache import media_cache, file_sha256, PREPARED_EXTENSION
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the configuration manager instances
+config = ConfigManager()
+sys_config = SystemConfigManager()
+
+# Config keys of the audio files played by the scheduler
+AUDIO_FILE_KEYS = ["REGULAR_AZAN_FILE", "FAJR_AZAN_FILE", "SHORT_AZAN_FILE", "DUAA_FILE"]
+
+# Prepared artifacts are named after the sha256 of their source
+PREPARED_NAME = re.compile(rf"[0-9a-f]{{64}}{re.escape(PREPARED_EXTENSION)}")
+
+media_dir = os.path.join(os.getcwd(), 'media')
+
+if hasattr(sys, '_MEIPASS'):
+    # Running in a PyInstaller bundle
+    default_media_dir = os.path.join(sys._MEIPASS, 'media')
+else:
+    default_media_dir = media_dir  # fallback to media_dir if not running in PyInstaller
+
+# Size of the slices copied out of a memory-mapped file per write
+STREAM_CHUNK_SIZE = 256 * 1024
+
+mimetypes.add_type("audio/mpeg", ".mp3")
+mimetypes.add_type("audio/wav", ".wav")
+
+
+def media_file_path(file_name):
+    """
+    Returns the path of a media file, falling back to the bundled media folder if it is missing.
+    """
+    file_path = os.path.join(media_dir, file_name)
+    if not os.path.exists(file_path):
+        file_path = os.path.join(default_media_dir, file_name)
+    return file_path
+
+
+def is_servable(file_path):
+    """
+    Returns True if a file may be served under /media/: one of the configured audio files or a
+    prepared artifact. The cache index, the metadata sidecars, uploads in flight and any other
+    file in the media folders are not.
+    """
+    if os.path.dirname(file_path) == os.path.realpath(media_cache.cache_dir):
+        return bool(PREPARED_NAME.fullmatch(os.path.basename(file_path)))
+    configured = (config.load_config(key) for key in AUDIO_FILE_KEYS)
+    return file_path in {os.path.realpath(media_file_path(file_name)) for file_name in configured if file_name}
+
+
+def resolve_media_path(relative_path):
+    """
+    Maps a path below /media/ to a servable file in the media folder, or the bundled media folder.
+
+    Returns:
+        str: The absolute file path, or None if it does not exist, escapes the media folders or
+        is not servable.
+    """
+    for base_dir in (media_dir, default_media_dir):
+        base_dir = os.path.realpath(base_dir)
+        file_path = os.path.realpath(os.path.join(base_dir, relative_path))
+        if os.path.commonpath([base_dir, file_path]) == base_dir and os.path.isfile(file_path):
+            return file_path if is_servable(file_path) else None
+    return None
+
+
+def parse_range(range_header, size):
+    """
+    Parses a single-range "bytes=" header.
+
+    Returns:
+        tuple: (start, end) with end exclusive, or None to serve the whole file.
+
+    Raises:
+        ValueError: If the range is malformed or not satisfiable.
+    """
+    units, _, ranges = range_header.partition("=")
+    if units.strip() != "bytes" or "," in ranges:
+        # Multiple ranges are not used by AirPlay receivers or browsers for audio
+        return None
+    start_text, _, end_text = ranges.strip().partition("-")
+    if start_text == "":
+        length = int(end_text)
+        if length <= 0:
+            raise ValueError("Empty suffix range")
+        start, end = max(0, size - length), size
+    else:
+        start = int(start_text)
+        end = min(int(end_text) + 1, size) if end_text else size
+    if start >= size or start >= end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class MediaStore:
+    """
+    Keeps the prepared artifacts of the configured audio files memory-mapped and computes
+    strong, content-based ETags for everything served under /media/.
+
+    Every reader of a mapping (device streams and HTTP responses) holds it, and a released
+    mapping is only closed once its last holder lets go of it.
+    """
+
+    def __init__(self):
+        self._mapped = {}  # path -> {"mmap", "size", "mtime_ns", "etag", "content_type", "holders", "released"}
+        self._etags = {}  # path -> (size, mtime_ns, etag)
+        self._lock = threading.Lock()  # Mappings are released from worker threads while the event loop reads them
+        # Read once, as stream_source() runs for every device when a prayer fires
+        server_config = sys_config.load_sys_config("MEDIA_SERVER") or {}
+        self.stream_mode = str(server_config.get("stream_mode", "file")).lower()
+        self.base_url = server_config.get("base_url")
+        self.api_port = sys_config.load_sys_config("API_PORT")
+
+    def etag_for(self, file_path, stat=None):
+        """
+        Returns a strong ETag derived from the file content hash.
+        """
+        stat = stat or os.stat(file_path)
+        cached = self._etags.get(file_path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        entry = media_cache.index.get(os.path.abspath(file_path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            content_hash = entry["sha256"]
+        else:
+            content_hash = file_sha256(file_path)
+        etag = f'"{content_hash}"'
+        self._etags[file_path] = (stat.st_size, stat.st_mtime_ns, etag)
+        return etag
+
+    def _map(self, file_path):
+        stat = os.stat(file_path)
+        if stat.st_size == 0:
+            return None
+        with open(file_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return {
+            "mmap": mapped,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "etag": self.etag_for(file_path, stat),
+            "content_type": mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+            "holders": 0,
+            "released": False,
+        }
+
+    def refresh(self, file_paths):
+        """
+        Memory-maps the given files and releases every mapping not in the list.
+        Blocking: run it in a thread from async code.
+        """
+        wanted = set()
+        for file_path in file_paths:
+            if not file_path or not os.path.isfile(file_path):
+                continue
+            file_path = os.path.realpath(file_path)
+            wanted.add(file_path)
+            current = self._mapped.get(file_path)
+            stat = os.stat(file_path)
+            if current and current["size"] == stat.st_size and current["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            self.release(file_path)
+            try:
+                mapped = self._map(file_path)
+                if mapped:
+                    with self._lock:
+                        self._mapped[file_path] = mapped
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Failed to memory-map media file {file_path}: {e}")
+        for file_path in list(self._mapped):
+            if file_path not in wanted:
+                self.release(file_path)
+        logger.info(f"🗂️ {len(self._mapped)} media file(s) memory-mapped for serving.")
+
+    def release(self, file_path):
+        """
+        Stops serving a file from memory, e.g. once it is no longer configured. The mapping is
+        closed right away if nobody holds it, otherwise when its last holder calls unhold().
+        """
+        with self._lock:
+            mapped = self._mapped.pop(os.path.realpath(file_path), None)
+            if mapped:
+                mapped["released"] = True
+                if mapped["holders"] == 0:
+                    mapped["mmap"].close()
+
+    def hold(self, mapped):
+        """
+        Keeps a mapping open until the matching unhold() call, even if it is released meanwhile.
+
+        Args:
+            mapped (dict): A mapping returned by mapping() or get().
+
+        Returns:
+            bool: False if the mapping was already closed and must not be read.
+        """
+        with self._lock:
+            if mapped["mmap"].closed:
+                return False
+            mapped["holders"] += 1
+            return True
+
+    def unhold(self, mapped):
+        """
+        Lets go of a mapping held with hold(), closing it if it was released and this was the last holder.
+        """
+        with self._lock:
+            mapped["holders"] -= 1
+            if mapped["holders"] == 0 and mapped["released"]:
+                mapped["mmap"].close()
+
+    def mapping(self, file_path):
+        """
+        Returns the mapping of a file without checking the file on disk.
+        """
+        return self._mapped.get(os.path.realpath(file_path))
+
+    def get(self, file_path):
+        """
+        Returns the mapping of a file if it is mapped and unchanged on disk.
+        """
+        mapped = self._mapped.get(file_path)
+        if not mapped:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if stat.st_size != mapped["size"] or stat.st_mtime_ns != mapped["mtime_ns"]:
+            return None
+        return mapped
+
+    def response(self, request: Request, file_path):
+        """
+        Builds the response for a media file: 304 on a matching If-None-Match, a slice of the
+        memory-mapped file for mapped files, and a FileResponse (sendfile/pathsend capable,
+        Range aware) for everything else.
+        """
+        mapped = self.get(file_path)
+        etag = mapped["etag"] if mapped else self.etag_for(file_path)
+        headers = {"etag": etag, "accept-ranges": "bytes", "cache-control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        if not mapped:
+            return FileResponse(file_path, headers=headers)
+
+        size = mapped["size"]
+        byte_range = None
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+        start, end = byte_range or (0, size)
+        status_code = 206 if byte_range else 200
+        headers["content-length"] = str(end - start)
+        if byte_range:
+            headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+        if request.method == "HEAD":
+            return Response(status_code=status_code, headers=headers, media_type=mapped["content_type"])
+        return StreamingResponse(
+            self._iter_slices(file_path, mapped, start, end), status_code=status_code, headers=headers, media_type=mapped["content_type"]
+        )
+
+    def _iter_slices(self, file_path, mapped, start, end):
+        if not self.hold(mapped):
+            # Released and closed before the response started; the file itself is unchanged
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                for offset in range(start, end, STREAM_CHUNK_SIZE):
+                    yield f.read(min(STREAM_CHUNK_SIZE, end - offset))
+            return
+        view = memoryview(mapped["mmap"])
+        try:
+            for offset in range(start, end, STREAM_CHUNK_SIZE):
+                yield bytes(view[offset:min(offset + STREAM_CHUNK_SIZE, end)])
+        finally:
+            view.release()
+            self.unhold(mapped)
+
+
+def local_address_for(device_address):
+    """
+    Returns the local IP address used to reach a device, so the URL handed to it is routable.
+    """
+    family = socket.AF_INET6 if ":" in str(device_address) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_DGRAM) as probe:
+        # connect() on a UDP socket only selects a route; nothing is sent
+        probe.connect((str(device_address), 7000))
+        return probe.getsockname()[0]
+
+
+def media_url(file_path, device_address):
+    """
+    Returns the URL of a media file on the built-in media server as seen from a device.
+
+    Returns:
+        str: The URL, or None if the file is not below one of the media folders.
+    """
+    file_path = os.path.realpath(file_path)
+    for base_dir in (media_dir, default_media_dir):
+        base_dir = os.path.realpath(base_dir)
+        if os.path.commonpath([base_dir, file_path]) == base_dir:
+            relative_path = os.path.relpath(file_path, base_dir).replace(os.sep, "/")
+            break
+    else:
+        return None
+
+    base_url = media_store.base_url
+    if not base_url:
+        host = local_address_for(device_address)
+        if ":" in host:
+            host = f"[{host}]"
+        base_url = f"http://{host}:{media_store.api_port}"
+    return f"{base_url.rstrip('/')}/media/{quote(relative_path)}"
+
+
+def stream_source(media, device_address):
+    """
+    Returns what to hand to stream_file for a media file: its media server URL when
+    MEDIA_SERVER.stream_mode is "http", a fresh in-memory stream for registry media,
+    or the local path.
+
+    Args:
+        media: A file path, or a PreparedMedia from the media registry.
+        device_address: The address of the device that will play the file.
+    """
+    if media_store.stream_mode == "http":
+        try:
+            url = media_url(str(media), device_address)
+            if url:
+                return url
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to build media URL for {media}, streaming the local file: {e}")
+    if hasattr(media, "open"):
+        return media.open() or str(media)
+    return media
+
+
+# Shared store used by the API and the scheduler
+media_store = MediaStore()
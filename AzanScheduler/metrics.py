@@ -0,0 +1,234 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+# Upper bounds (seconds) of the default histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Buckets for audio playback, which lasts minutes
+PLAYBACK_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 180.0, 300.0, 600.0, 900.0)
+
+# The prayer being fired in the current task, as (prayer name, fire skew in seconds, time.monotonic() at firing).
+# Set by the scheduler so the device code can report how late each device started after the prayer time.
+firing: contextvars.ContextVar = contextvars.ContextVar("firing", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count per label set.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}_total{_labels(self.label_names, label_values)} {_number(value)}"
+
+
+class Gauge:
+    """
+    A value read from a callback each time the metrics are rendered.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def samples(self):
+        yield f"{self.name} {_number(self.callback())}"
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets per label set, with their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Records one observation. Costs a bucket search and a few additions under an uncontended lock.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """
+        Observes the duration of the with block, also when it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series_items = sorted((label_values, list(series)) for label_values, series in self._series.items())
+        for label_values, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                bucket_labels = _labels(self.label_names, label_values, 'le="' + _number(bound) + '"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, label_values)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.label_names, label_values)} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Holds the application metrics and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, callback):
+        return self._register(Gauge(name, documentation, callback))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text format (version 0.0.4).
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request, labelled by method, route
+    template and status. The latency is measured up to the response headers, so long-lived
+    streams such as Server-Sent Events count their time to first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), str(status)
+            )
+
+        async def send_wrapper(message):
+            nonlocal recorded
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not recorded:
+                record(500)
+
+
+# Shared registry rendered by /metrics
+registry = MetricsRegistry()
+
+timetable_duration = registry.histogram(
+    "azan_timetable_seconds", "Time spent fetching, parsing and formatting a timetable, per source.", ("source", "stage")
+)
+config_loads = registry.counter("azan_config_loads", "Reads of configuration files from disk.", ("file",))
+fire_skew = registry.histogram(
+    "azan_fire_skew_seconds", "How late the scheduler woke up for a prayer, relative to the prayer time.", ("prayer",)
+)
+playback_start_delay = registry.histogram(
+    "azan_playback_start_delay_seconds", "Time from the prayer time until a device was told to start playing.", ("prayer", "device")
+)
+device_discovery = registry.histogram("azan_device_discovery_seconds", "Time to discover a device on the network.", ("device",))
+device_connect = registry.histogram("azan_device_connect_seconds", "Time to open a connection to a device.", ("device",))
+device_stream = registry.histogram(
+    "azan_device_stream_seconds", "Time a device spent playing a file, per outcome.", ("device", "status"), PLAYBACK_BUCKETS
+)
+http_request_duration = registry.histogram(
+    "azan_http_request_seconds", "API request latency up to the response headers.", ("method", "route", "status")
+)
+loop_lag = registry.histogram(
+    "azan_loop_lag_seconds", "How late the event loop watchdog woke up.", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+loop_stalls = registry.counter("azan_loop_stalls", "Event loop stalls longer than the watchdog threshold, by blocking frame.", ("location",))
@@ -0,0 +1,147 @@
+import json
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.prayer_times_fetcher import PrayerTimesFetcher
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Seconds an error answer is served before the timetable is read again
+ERROR_TTL = 60
+
+
+class PrayerTimesResponse:
+    """
+    A precomputed /api/prayer-times answer: the response content and its rendered JSON body,
+    its ETag and when it stops being valid.
+    """
+
+    def __init__(self, content, body, etag, expires):
+        self.content = content
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+class PrayerTimesCache:
+    """
+    Serves the "today" prayer times from memory. The payload only changes when a prayer time
+    passes (after the last one it switches to tomorrow's times), at midnight and when the timetable
+    settings change, so it is computed once per boundary instead of once per request.
+    """
+
+    def __init__(self, fetcher=None):
+        """
+        Args:
+            fetcher (PrayerTimesFetcher): The fetcher used to compute the payload. Its clock decides the boundaries.
+        """
+        self.fetcher = fetcher or PrayerTimesFetcher()
+        self._entry = None
+        self._generation = 0  # bumped by invalidate() so an in-flight computation is not cached
+        self._lock = asyncio.Lock()
+        self._task = None
+        ConfigManager.subscribe(self.invalidate)
+
+    def _next_boundary(self, payload, now):
+        """
+        Returns the earliest of the payload's prayer times still ahead and the next midnight.
+        """
+        tz_info = now.tzinfo
+        boundary = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        date_text = payload.get("date")
+        if not date_text:
+            return boundary
+        for value in payload.values():
+            try:
+                prayer_time = datetime.strptime(f"{date_text} {value}", "%Y-%m-%d %H:%M").replace(tzinfo=tz_info)
+            except (TypeError, ValueError):
+                continue
+            if now < prayer_time < boundary:
+                boundary = prayer_time
+        return boundary
+
+    def _compute(self):
+        """
+        Fetches today's prayer times and renders the response. Blocking: run it in a thread.
+        """
+        now = self.fetcher.clock.now(self.fetcher._get_timezone())
+        payload = self.fetcher.fetch_prayer_times("today")
+        if "error" in payload:
+            expires = now + timedelta(seconds=ERROR_TTL)
+        else:
+            expires = self._next_boundary(payload, now)
+        # Rendered like FastAPI's JSONResponse
+        content = {"status": "success", "data": payload}
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        logger.info(f"🗓️ Prayer times response computed, valid until {expires:%Y-%m-%d %H:%M:%S}.")
+        return PrayerTimesResponse(content, body, etag, expires)
+
+    def max_age(self, entry):
+        """
+        Returns the seconds a client may cache a response for.
+        """
+        now = self.fetcher.clock.now(entry.expires.tzinfo)
+        return max(0, int((entry.expires - now).total_seconds()))
+
+    async def get(self):
+        """
+        Returns the current response, computing it if there is none or the last one expired.
+
+        Returns:
+            PrayerTimesResponse: The precomputed response.
+        """
+        entry = self._entry
+        if entry and self.max_age(entry) > 0:
+            return entry
+        async with self._lock:
+            # Another request may have computed it while this one waited
+            entry = self._entry
+            if entry and self.max_age(entry) > 0:
+                return entry
+            generation = self._generation
+            entry = await blocking_pool.run(self._compute)
+            # The settings may have changed while it was computed; don't keep a stale answer
+            if generation == self._generation:
+                self._entry = entry
+            return entry
+
+    def invalidate(self, changed_keys=None):
+        """
+        Drops the current response, e.g. when the timetable settings changed, along with any
+        response still being computed from the old settings.
+        """
+        self._generation += 1
+        self._entry = None
+
+    async def _run(self):
+        while True:
+            try:
+                entry = await self.get()
+                delay = self.max_age(entry)
+            except Exception as e:
+                logger.error(f"❌ Failed to precompute prayer times: {e}")
+                delay = ERROR_TTL
+            # Recompute right after the boundary so no request has to wait for it
+            await self.fetcher.clock.sleep(delay + 1)
+
+    def start(self):
+        """
+        Starts precomputing the response at each boundary.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the background precomputation.
+        """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
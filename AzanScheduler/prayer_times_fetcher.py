@@ -6,9 +6,11 @@ import json
 from bs4 import BeautifulSoup
 import re
 from tenacity import retry, stop_after_attempt, wait_fixed
-import time
 from AzanScheduler.logging_config import get_logger
 from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.clock import system_clock
+from AzanScheduler.event_broadcaster import event_broadcaster
+from AzanScheduler import metrics
 
 
 # Get a logger for this module
@@ -20,6 +22,13 @@ config_dir = os.path.join(os.getcwd(), 'config')
 
 
 class PrayerTimesFetcher:
+    def __init__(self, clock=None):
+        """
+        Args:
+            clock (Clock): The clock that decides what "today" and "next" mean. Defaults to the wall clock.
+        """
+        self.clock = clock or system_clock
+
     def _get_timezone(self):
         """
         Dynamically fetches the timezone from the environment.
@@ -43,27 +52,29 @@ class PrayerTimesFetcher:
 
         logger.debug(f"Attempting to download {location.upper()} timetable.")
         try:
-            response = requests.get(sources_url[location], timeout=10)
-            response.raise_for_status()
-            if location.lower() == "icci":
-                data = response.json()
-            elif location.lower() == "naas":
-                soup = BeautifulSoup(response.text, "html.parser")
-                script_tags = soup.find_all("script")
-                calendar_data = None
-                for script in script_tags:
-                    if "calendar" in script.text:
-                        match = re.search(r'"calendar"\s*:\s*(\[\{.*?\}\])', script.text, re.DOTALL)
-                        if match:
-                            calendar_data = match.group(1)
-                        break
-                if not calendar_data:
-                    logger.error("❌ Calendar data not found in Naas webpage.")
+            with metrics.timetable_duration.time(location, "fetch"):
+                response = requests.get(sources_url[location], timeout=10)
+                response.raise_for_status()
+            with metrics.timetable_duration.time(location, "parse"):
+                if location.lower() == "icci":
+                    data = response.json()
+                elif location.lower() == "naas":
+                    soup = BeautifulSoup(response.text, "html.parser")
+                    script_tags = soup.find_all("script")
+                    calendar_data = None
+                    for script in script_tags:
+                        if "calendar" in script.text:
+                            match = re.search(r'"calendar"\s*:\s*(\[\{.*?\}\])', script.text, re.DOTALL)
+                            if match:
+                                calendar_data = match.group(1)
+                            break
+                    if not calendar_data:
+                        logger.error("❌ Calendar data not found in Naas webpage.")
+                        return False
+                    data = json.loads(calendar_data)
+                else:
+                    logger.error(f"Invalid location: {location}")
                     return False
-                data = json.loads(calendar_data)
-            else:
-                logger.error(f"Invalid location: {location}")
-                return False
 
             # Save the timetable data to the file
             with open(timetable_file, "w", encoding="utf-8") as file:
@@ -159,6 +170,7 @@ class PrayerTimesFetcher:
         # Dynamically construct the timetable file path
         timetable_file = os.path.join(config_dir, f"{location}_formatted_timetable.json")
 
+        metrics.config_loads.inc(f"{location}_formatted_timetable.json")
         try:
             with open(timetable_file, "r", encoding="utf-8") as f:
                 return json.load(f)
@@ -178,9 +190,11 @@ class PrayerTimesFetcher:
 
         # 2. Try format only if download succeeded
         if download_ok:
-            format_ok = self.format_timetable(location)
+            with metrics.timetable_duration.time(location, "format"):
+                format_ok = self.format_timetable(location)
             if format_ok:
                 logger.info(f"✅ Timetable for {location.upper()} successfully refreshed and formatted.")
+                event_broadcaster.publish("timetable_refresh", {"location": location, "status": "refreshed"})
                 return True
             else:
                 logger.error(f"❌ Failed to format timetable for {location.upper()}.")
@@ -192,10 +206,12 @@ class PrayerTimesFetcher:
         old_file = os.path.join(config_dir, f"{location}_formatted_timetable.json")
         if os.path.exists(old_file):
             logger.warning(f"⚠️ Using existing old timetable for {location.upper()}.")
+            event_broadcaster.publish("timetable_refresh", {"location": location, "status": "stale"})
             return True
 
         # 4. No old file → refresh failed completely
         logger.error(f"❌ No valid timetable available for {location.upper()}.")
+        event_broadcaster.publish("timetable_refresh", {"location": location, "status": "failed"})
         return False
 
     # Check if the timetable file is outdated
@@ -209,7 +225,7 @@ class PrayerTimesFetcher:
         try:
             # Get the file's last modification time
             file_mod_time = datetime.fromtimestamp(os.path.getmtime(timetable_file), tz=self._get_timezone())
-            today = datetime.now(self._get_timezone())
+            today = self.clock.now(self._get_timezone())
             last_day_of_previous_month = today.replace(day=1) - timedelta(days=1)
 
             # Check if the file was modified in the current month or on the last day of the previous month
@@ -225,11 +241,11 @@ class PrayerTimesFetcher:
         """
         Sleeps until midnight.
         """
-        now = datetime.now(self._get_timezone())
+        now = self.clock.now(self._get_timezone())
         midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
         seconds_until_midnight = (midnight - now).total_seconds()
         logger.info(f"Sleeping for {seconds_until_midnight} seconds until midnight.")
-        time.sleep(seconds_until_midnight)
+        self.clock.sleep_blocking(seconds_until_midnight)
 
     # Get prayer times for a specific day
     def _get_day_prayers(self, data, day, month, date_text, location):
@@ -338,7 +354,7 @@ class PrayerTimesFetcher:
         """
         Extracts the next prayer time from the provided timetable data.
         """
-        today_date = datetime.now(self._get_timezone())
+        today_date = self.clock.now(self._get_timezone())
         today_date_text = today_date.strftime("%Y-%m-%d")
         today_day = str(today_date.day)
         today_month = str(today_date.month)
@@ -382,7 +398,7 @@ class PrayerTimesFetcher:
         """
         Extracts the prayer time from the provided timetable data.
         """
-        today_date = datetime.now(self._get_timezone())
+        today_date = self.clock.now(self._get_timezone())
         today_date_text = today_date.strftime("%Y-%m-%d")
         today_day = str(today_date.day)
         today_month = str(today_date.month)
@@ -426,12 +442,44 @@ class PrayerTimesFetcher:
         """
         Checks if the current month is a new month compared to the timetable data.
         """
-        today_month = str(datetime.now(self._get_timezone()).month)
+        today_month = str(self.clock.now(self._get_timezone()).month)
         if today_month not in data:
             logger.info("It is a new month. Timetable needs to be refreshed.")
             return True
         return False
 
+    def find_following_prayer(self, after):
+        """
+        Finds the first enabled prayer after the given time in the timetable already on disk.
+        Unlike fetch_prayer_times it never refreshes the timetable or waits for one.
+
+        Args:
+            after (datetime): The time to search from, e.g. the prayer being armed.
+
+        Returns:
+            dict: The prayer and its time, or None if the timetable does not cover it.
+        """
+        location = config.load_config("DEFAULT_TIMETABLE")
+        if location.lower() == "default" or location not in config.load_config("SOURCES"):
+            data = config.load_default_timetable()
+        else:
+            data = self._reload_data(location)
+        if not data:
+            return None
+
+        day_prayers_times = data.get(str(after.month), {}).get(str(after.day))
+        if not day_prayers_times or len(day_prayers_times) < 6:
+            return None
+        following = self._find_next_prayer("next", after, day_prayers_times)
+        if following:
+            return following
+
+        next_day_date = after + timedelta(days=1)
+        next_day_prayers_times = data.get(str(next_day_date.month), {}).get(str(next_day_date.day))
+        if not next_day_prayers_times or len(next_day_prayers_times) < 6:
+            return None
+        return self._find_first_prayer(next_day_date, next_day_prayers_times)
+
     def fetch_prayer_times(self, type, timetable=None):
         """
         Fetches today's prayer times for the specified location.
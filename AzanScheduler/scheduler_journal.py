@@ -0,0 +1,172 @@
+import os
+import json
+import asyncio
+from datetime import datetime
+from AzanScheduler.config_manager import ConfigManager, SystemConfigManager
+from AzanScheduler.blocking_pool import blocking_pool
+from AzanScheduler.clock import system_clock
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+# Get the system configuration manager instance
+sys_config = SystemConfigManager()
+
+# Journal states of a prayer event
+SCHEDULED = "scheduled"
+FIRING = "firing"
+FIRED = "fired"
+MISSED = "missed"
+
+
+class SchedulerJournal:
+    """
+    Small persistent record of the prayer events the scheduler armed and fired, kept in
+    config/scheduler_journal.json so a restarted process knows what it already played.
+
+    An event is claimed (written as "firing") before its announcement starts, and a claimed
+    event is never claimed again, so a restart right at prayer time cannot play it twice.
+    State changes apply in memory at once; the file is written and synced in the blocking pool,
+    one write at a time, so a slow disk does not hold up the event loop.
+    """
+
+    def __init__(self, file_path=None, grace_period=None, max_entries=None, clock=None, persist=True):
+        """
+        Args:
+            file_path (str): The journal file. Defaults to config/scheduler_journal.json.
+            grace_period (float): Seconds after a prayer time within which a missed prayer is still played.
+            max_entries (int): Number of events kept in the journal.
+            clock (Clock): The clock used to timestamp updates. Defaults to the wall clock.
+            persist (bool): Read and write the journal file. Simulations keep the journal in memory only.
+        """
+        journal_config = sys_config.load_sys_config("SCHEDULER_JOURNAL") or {}
+        self.file_path = file_path or os.path.join(ConfigManager().config_dir_path, "scheduler_journal.json")
+        self.grace_period = grace_period if grace_period is not None else journal_config.get("grace_period", 300)
+        self.max_entries = max_entries or journal_config.get("max_entries", 200)
+        self.clock = clock or system_clock
+        self.persist = persist
+        self.events = self._load() if persist else {}
+        self._save_lock = asyncio.Lock()
+
+    def reload(self):
+        """
+        Reads the journal file again, e.g. when another process may have run the scheduler since it was loaded.
+        Blocking: run it in the blocking pool from async code.
+        """
+        if self.persist:
+            self.events = self._load()
+
+    @staticmethod
+    def event_id(prayer_name, prayer_time):
+        return f"{prayer_name}@{prayer_time.isoformat()}"
+
+    def _load(self):
+        try:
+            with open(self.file_path, "r") as f:
+                return json.load(f).get("events", {})
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.error(f"❌ Scheduler journal is corrupt, starting a new one: {e}")
+            return {}
+
+    def _write(self, events):
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"events": events}, f, indent=4)
+            f.flush()
+            # The claim must be on disk before playback starts
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.file_path)
+
+    async def _save(self):
+        # Keep only the most recent events
+        if len(self.events) > self.max_entries:
+            newest = sorted(self.events.items(), key=lambda item: item[1]["prayer_time"])[-self.max_entries:]
+            self.events = dict(newest)
+        if not self.persist:
+            return
+        # Entries are replaced, never changed, so a shallow copy is a consistent snapshot.
+        # Writes run in call order, so an older snapshot never overwrites a newer one.
+        events = dict(self.events)
+        async with self._save_lock:
+            await blocking_pool.run(self._write, events)
+
+    async def _set_state(self, prayer_name, prayer_time, state):
+        self.events[self.event_id(prayer_name, prayer_time)] = {
+            "prayer": prayer_name,
+            "prayer_time": prayer_time.isoformat(),
+            "state": state,
+            "updated": self.clock.now().astimezone().isoformat(),
+        }
+        await self._save()
+
+    def state(self, prayer_name, prayer_time):
+        """
+        Returns the journal state of an event, or None if it was never recorded.
+        """
+        entry = self.events.get(self.event_id(prayer_name, prayer_time))
+        return entry["state"] if entry else None
+
+    async def schedule(self, prayer_name, prayer_time):
+        """
+        Records that the scheduler armed an event, unless it was already recorded.
+        """
+        if self.state(prayer_name, prayer_time) is None:
+            await self._set_state(prayer_name, prayer_time, SCHEDULED)
+
+    async def unschedule(self, prayer_name, prayer_time):
+        """
+        Forgets an armed event that is no longer the next one, e.g. after a timing change.
+        """
+        if self.state(prayer_name, prayer_time) == SCHEDULED:
+            del self.events[self.event_id(prayer_name, prayer_time)]
+            await self._save()
+
+    async def claim(self, prayer_name, prayer_time):
+        """
+        Marks an event as firing before its announcement starts.
+
+        Returns:
+            bool: True if the caller may play it, False if it was already claimed or fired.
+        """
+        if self.state(prayer_name, prayer_time) in (FIRING, FIRED):
+            return False
+        await self._set_state(prayer_name, prayer_time, FIRING)
+        return True
+
+    async def complete(self, prayer_name, prayer_time):
+        """
+        Marks an event as fired once its announcement finished.
+        """
+        await self._set_state(prayer_name, prayer_time, FIRED)
+
+    async def miss(self, prayer_name, prayer_time):
+        """
+        Marks an event as missed.
+        """
+        await self._set_state(prayer_name, prayer_time, MISSED)
+
+    def overdue(self, now):
+        """
+        Splits the armed events whose time has passed into the one still worth playing and the missed ones.
+
+        Args:
+            now (datetime): The current, timezone-aware time.
+
+        Returns:
+            tuple: (prayer name, prayer time) of the latest event within the grace period or None,
+            and the list of (prayer name, prayer time) of the other overdue events.
+        """
+        overdue = sorted(
+            (datetime.fromisoformat(entry["prayer_time"]), entry["prayer"])
+            for entry in self.events.values()
+            if entry["state"] == SCHEDULED and datetime.fromisoformat(entry["prayer_time"]) <= now
+        )
+        catch_up = None
+        if overdue and (now - overdue[-1][0]).total_seconds() <= self.grace_period:
+            prayer_time, prayer_name = overdue.pop()
+            catch_up = (prayer_name, prayer_time)
+        return catch_up, [(prayer_name, prayer_time) for prayer_time, prayer_name in overdue]
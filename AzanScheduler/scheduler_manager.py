@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from AzanScheduler.azan_scheduler import AzanScheduler
+from AzanScheduler.event_broadcaster import event_broadcaster
 
 
 # Get a logger for this module
@@ -16,11 +17,12 @@ async def scheduler_status():
     Returns the status of the Azan scheduler.
 
     Returns:
-        dict: A dictionary containing the status and whether the scheduler is active.
+        dict: A dictionary containing the status, whether the scheduler is active and the
+        plan of the announcement in progress, if any.
     """
     if scheduler_task and not scheduler_task.done():
         logger.info("Scheduler is active.")
-        return {"status": "success", "data": {"active": True}}
+        return {"status": "success", "data": {"active": True, "announcement": scheduler.announcement}}
     else:
         logger.info("Scheduler is not active.")
         return {"status": "success", "data": {"active": False}}
@@ -42,6 +44,7 @@ async def start_scheduler():
         logger.info("Creating a new scheduler task...")
         scheduler_task = asyncio.create_task(scheduler.run())
         logger.info("✅ Azan scheduler started successfully.")
+        event_broadcaster.publish("scheduler_started")
         return {"status": "success", "message": "Azan scheduler started successfully."}
     except Exception as e:
         logger.error(f"❌ Failed to start scheduler: {e}")
@@ -63,9 +66,11 @@ async def stop_scheduler():
         scheduler_task.cancel()
         await scheduler_task  # Wait for the task to be canceled
         logger.info("Azan scheduler stopped successfully.")
+        event_broadcaster.publish("scheduler_stopped")
         return {"status": "success", "message": "Azan scheduler stopped successfully."}
     except asyncio.CancelledError:
         logger.info("Scheduler task was canceled.")
+        event_broadcaster.publish("scheduler_stopped")
         return {"status": "success", "message": "Azan scheduler stopped successfully."}
     except Exception as e:
         logger.error(f"❌ Failed to stop scheduler: {e}")
@@ -0,0 +1,45 @@
+import os
+import socket
+from AzanScheduler.logging_config import get_logger
+
+
+# Get a logger for this module
+logger = get_logger(__name__)
+
+
+def notify(message):
+    """
+    Sends a state change to systemd with the sd_notify protocol, e.g. "READY=1" or "WATCHDOG=1".
+    Does nothing when the process was not started by systemd with Type=notify.
+
+    Args:
+        message (str): Newline-separated assignments, e.g. "READY=1\\nSTATUS=Running".
+    Returns:
+        bool: True if the message was sent.
+    """
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address or not hasattr(socket, "AF_UNIX"):
+        return False
+    if address.startswith("@"):
+        # Abstract namespace socket
+        address = "\0" + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(message.encode("utf-8"))
+        return True
+    except OSError as e:
+        logger.warning(f"⚠️ Failed to notify systemd ({message.splitlines()[0]}): {e}")
+        return False
+
+
+def watchdog_interval():
+    """
+    Returns the seconds between the watchdog keepalives systemd expects (half of WatchdogSec),
+    or None if the watchdog is not enabled for this process.
+    """
+    usec = os.environ.get("WATCHDOG_USEC")
+    pid = os.environ.get("WATCHDOG_PID")
+    if not usec or (pid and int(pid) != os.getpid()):
+        return None
+    return int(usec) / 1_000_000 / 2
@@ -0,0 +1,73 @@
+"""
+Measures /api/scheduler-status latency while a slow timetable refresh is in progress,
+with the refresh running in the blocking pool (default) or on the event loop (--inline,
+the behaviour before blocking work was moved off the loop).
+
+Usage:
+    python benchmarks/bench_api_latency.py --refresh-seconds 2 --rate 200
+    python benchmarks/bench_api_latency.py --inline
+"""
+import sys
+import os
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+import httpx
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import api  # noqa: E402
+from AzanScheduler.blocking_pool import blocking_pool  # noqa: E402
+
+
+async def run(args):
+    real_fetch = api.prayer_fetcher.fetch_prayer_times
+
+    def slow_fetch(type, timetable=None):
+        # Stands in for a timetable download on a slow network
+        time.sleep(args.refresh_seconds)
+        return real_fetch(type, timetable)
+
+    async def inline(func, *func_args, **kwargs):
+        return func(*func_args, **kwargs)
+
+    latencies = []
+    transport = httpx.ASGITransport(app=api.app)
+    with patch.object(api.prayer_fetcher, "fetch_prayer_times", slow_fetch), \
+            patch.object(blocking_pool, "run", inline if args.inline else blocking_pool.run):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            api.prayer_times_cache.invalidate()
+            # Requests are sent at a fixed rate and timed from when they were due, so time spent
+            # waiting for a blocked event loop counts towards their latency
+            count = int(args.rate * (args.refresh_seconds + 0.5))
+            started = time.perf_counter()
+
+            async def status_request(due):
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                response = await client.get("/api/scheduler-status")
+                latencies.append((time.perf_counter() - due) * 1000)
+                response.raise_for_status()
+
+            requests = [asyncio.create_task(status_request(started + index / args.rate)) for index in range(count)]
+            await asyncio.sleep(0.1)
+            refresh = asyncio.create_task(client.get("/api/prayer-times"))
+            await asyncio.gather(*requests)
+            wall = time.perf_counter() - started
+            await refresh
+
+    latencies.sort()
+    mode = "inline" if args.inline else "blocking pool"
+    print(f"mode={mode} refresh={args.refresh_seconds}s requests={len(latencies)} rate={args.rate}/s wall={wall:.2f}s")
+    print(f"/api/scheduler-status ms: p50={statistics.median(latencies):.1f} "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f} max={latencies[-1]:.1f}")
+    print(f"blocking pool: {blocking_pool.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refresh-seconds", type=float, default=2.0)
+    parser.add_argument("--rate", type=float, default=200, help="/api/scheduler-status requests per second")
+    parser.add_argument("--inline", action="store_true", help="Run blocking work on the event loop")
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(parser.parse_args()))
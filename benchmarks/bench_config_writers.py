@@ -0,0 +1,69 @@
+"""
+Runs concurrent clients that each add devices to DEVICES through /api/get-config and
+/api/update-config (read, append, write) against a copy of the config folder. With If-Match
+(default) a client whose version is stale gets a 409 and retries; with --blind it writes
+unconditionally, as before config versions. Reports throughput, conflicts and lost updates.
+
+Usage:
+    python benchmarks/bench_config_writers.py --writers 8 --updates 25
+    python benchmarks/bench_config_writers.py --writers 8 --updates 25 --blind
+"""
+import sys
+import os
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import httpx
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+async def writer(client, name, args, counts):
+    for index in range(args.updates):
+        device = f"{name}-{index:03d}"
+        while True:
+            current = (await client.post("/api/get-config", json={"list": ["DEVICES"]})).json()
+            devices = current["data"].get("DEVICES", []) + [device]
+            headers = {} if args.blind else {"If-Match": f'"{current["version"]}"'}
+            response = await client.post("/api/update-config", json={"updates": {"DEVICES": devices}}, headers=headers)
+            if response.status_code == 409:
+                counts["conflicts"] += 1
+                continue
+            response.raise_for_status()
+            counts["writes"] += 1
+            break
+
+
+async def run(args):
+    from AzanScheduler import api
+    api.config.save_config({**api.config.load_config(), "DEVICES": []})
+    counts = {"writes": 0, "conflicts": 0}
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(writer(client, f"w{number}", args, counts) for number in range(args.writers)))
+        wall = time.perf_counter() - started
+    expected = args.writers * args.updates
+    kept = len(api.config.load_config("DEVICES"))
+    mode = "blind" if args.blind else "If-Match"
+    print(f"mode={mode} writers={args.writers} updates/writer={args.updates} wall={wall:.2f}s")
+    print(f"writes={counts['writes']} ({counts['writes'] / wall:.0f}/s) conflicts={counts['conflicts']} "
+          f"devices kept={kept}/{expected} lost={expected - kept}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=25, help="Devices added by each writer")
+    parser.add_argument("--blind", action="store_true", help="Update without If-Match")
+    arguments = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as workdir:
+        # The config manager works on config/ in the current directory
+        shutil.copytree(os.path.join(ROOT, "config"), os.path.join(workdir, "config"))
+        os.symlink(os.path.join(ROOT, "media"), os.path.join(workdir, "media"))
+        os.chdir(workdir)
+        asyncio.run(run(arguments))
@@ -0,0 +1,53 @@
+"""
+Benchmarks an announcement to a large fleet of simulated devices.
+
+Usage:
+    python benchmarks/bench_fanout.py --devices 200 --concurrency 32
+"""
+import sys
+import os
+import time
+import asyncio
+import argparse
+import statistics
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.apple_manager import AppleManager  # noqa: E402
+from AzanScheduler.device_simulator import DeviceSimulator  # noqa: E402
+
+
+async def run(args):
+    simulator = DeviceSimulator(
+        devices=args.devices,
+        discovery_delay=args.discovery_delay,
+        connect_latency=args.connect_latency,
+        command_latency=args.command_latency,
+        stream_duration=args.stream_duration,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    manager = AppleManager(backend=simulator)
+    manager.fanout.concurrency = args.concurrency
+    manager.fanout.retry_wait = 0
+    started = time.perf_counter()
+    results = await manager.announce("azan.mp3", simulator.identifiers, 50, synchronized=False)
+    wall = time.perf_counter() - started
+    await manager.pool.close()
+
+    elapsed = sorted(r["elapsed_ms"] for r in results)
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    print(f"devices={args.devices} concurrency={args.concurrency} wall={wall:.2f}s succeeded={succeeded} "
+          f"scans={simulator.scans} connects={simulator.connects} injected_failures={simulator.failures}")
+    print(f"per-device elapsed ms: p50={statistics.median(elapsed):.1f} p99={elapsed[int(len(elapsed) * 0.99) - 1]:.1f} max={elapsed[-1]:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--discovery-delay", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.02)
+    parser.add_argument("--command-latency", type=float, default=0.005)
+    parser.add_argument("--stream-duration", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
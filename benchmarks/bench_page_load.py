@@ -0,0 +1,94 @@
+"""
+Compares the UI page load as separate requests (get-config, prayer-times, scheduler-status and
+scan-devices, sent concurrently like a browser does) with one /api/batch request, reporting the
+latency, the HTTP round trips and the number of config and timetable file reads per page load.
+
+With a warm prayer times cache both page loads read config.json once: /api/prayer-times is
+served precomputed, so only get-config reads the file. There the batch saves round trips and
+latency. --cold recomputes the prayer times on every page load, as after a prayer boundary or
+a config change, which is where the batch's shared config snapshot saves file reads.
+
+Usage:
+    python benchmarks/bench_page_load.py --rounds 200
+    python benchmarks/bench_page_load.py --rounds 200 --cold
+"""
+import sys
+import os
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+import httpx
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import api, metrics  # noqa: E402
+
+CONFIG_KEYS = ["TIMEZONE", "DEFAULT_TIMETABLE", "AZAN_SWITCHES", "DEVICES", "SHORT_AZAN_SWITCHES"]
+
+
+async def separate(client):
+    responses = await asyncio.gather(
+        client.post("/api/get-config", json={"list": CONFIG_KEYS}),
+        client.get("/api/prayer-times"),
+        client.get("/api/scheduler-status"),
+        client.get("/api/scan-devices"),
+    )
+    for response in responses:
+        response.raise_for_status()
+
+
+async def batch(client):
+    response = await client.post("/api/batch", json={"queries": [
+        {"query": "get-config", "params": {"list": CONFIG_KEYS}},
+        {"query": "prayer-times"},
+        {"query": "scheduler-status"},
+        {"query": "scan-devices"},
+    ]})
+    response.raise_for_status()
+
+
+async def measure(client, page_load, args, requests):
+    latencies = []
+    reads = 0
+    requests.clear()
+    for _ in range(args.rounds):
+        if args.cold:
+            # As after a prayer boundary or a config change
+            api.prayer_times_cache.invalidate()
+        before = metrics.config_loads.total()
+        started = time.perf_counter()
+        await page_load(client)
+        latencies.append((time.perf_counter() - started) * 1000)
+        reads += metrics.config_loads.total() - before
+    latencies.sort()
+    print(f"{page_load.__name__:>8}: p50={statistics.median(latencies):.2f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.2f}ms round trips/page={len(requests) / args.rounds:.1f} "
+          f"file reads/page={reads / args.rounds:.1f}")
+
+
+async def run(args):
+    async def cached_scan(refresh=False):
+        # Stands in for the device scanner's cached results
+        return []
+
+    requests = []
+
+    async def count_request(request):
+        requests.append(request.url.path)
+
+    transport = httpx.ASGITransport(app=api.app)
+    with patch.object(api.apple_manager, "scan_for_devices", cached_scan):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", event_hooks={"request": [count_request]}) as client:
+            await batch(client)
+            print(f"rounds={args.rounds} prayer times cache={'cold' if args.cold else 'warm'}")
+            await measure(client, separate, args, requests)
+            await measure(client, batch, args, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--cold", action="store_true", help="Recompute the prayer times on every page load")
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,79 @@
+"""
+Measures serializing and compressing the largest API payloads: a year of the default timetable,
+a device scan and an /api/batch page load answer. Compares the standard JSONResponse with the
+orjson-based FastJSONResponse and reports the identity, gzip and (if installed) brotli sizes.
+
+Usage:
+    python benchmarks/bench_responses.py --devices 200 --repeat 50
+"""
+import sys
+import os
+import time
+import logging
+import argparse
+import statistics
+from fastapi.responses import JSONResponse
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.config_manager import ConfigManager  # noqa: E402
+from AzanScheduler.apple_manager import AppleManager  # noqa: E402
+from AzanScheduler.device_simulator import DeviceSimulator  # noqa: E402
+from AzanScheduler.prayer_times_fetcher import PrayerTimesFetcher  # noqa: E402
+from AzanScheduler.http_encoding import FastJSONResponse, CompressionMiddleware, orjson, brotli  # noqa: E402
+
+
+def payloads(args):
+    config = ConfigManager()
+    devices = [AppleManager._device_info(device) for device in DeviceSimulator(devices=args.devices).devices.values()]
+    scan = {"status": "success", "data": {"status": "success", "devices": devices, "age_seconds": 3.2}}
+    batch = {"status": "success", "data": {
+        "get-config": {"status": "success", "data": config.load_config()},
+        "prayer-times": {"status": "success", "data": PrayerTimesFetcher().fetch_prayer_times("today")},
+        "scheduler-status": {"status": "success", "data": {"active": True, "announcement": None}},
+        "scan-devices": scan["data"],
+    }}
+    return {
+        "year timetable": {"status": "success", "data": config.load_default_timetable()},
+        f"device scan ({args.devices})": scan,
+        "batch page load": batch,
+    }
+
+
+def timed(func, repeat):
+    """
+    Returns the result of func and its median run time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(times)
+
+
+def run(args):
+    middleware = CompressionMiddleware(None, gzip_level=args.gzip_level, brotli_quality=args.brotli_quality)
+    print(f"orjson={'yes' if orjson else 'no'} brotli={'yes' if brotli else 'no'} "
+          f"gzip_level={args.gzip_level} brotli_quality={args.brotli_quality} repeat={args.repeat}")
+    for name, payload in payloads(args).items():
+        body, json_ms = timed(lambda: JSONResponse(payload).body, args.repeat)
+        line = f"{name:>20}: json={json_ms:.2f}ms"
+        if orjson:
+            fast_body, fast_ms = timed(lambda: FastJSONResponse(payload).body, args.repeat)
+            assert fast_body == body
+            line += f" orjson={fast_ms:.2f}ms ({json_ms / fast_ms:.1f}x)"
+        gzipped, gzip_ms = timed(lambda: middleware.compress(body, "gzip"), args.repeat)
+        line += f" | {len(body) / 1024:.1f}KiB gzip={len(gzipped) / 1024:.1f}KiB in {gzip_ms:.2f}ms"
+        if brotli:
+            compressed, br_ms = timed(lambda: middleware.compress(body, "br"), args.repeat)
+            line += f" br={len(compressed) / 1024:.1f}KiB in {br_ms:.2f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=4)
+    logging.disable(logging.CRITICAL)
+    run(parser.parse_args())
@@ -0,0 +1,67 @@
+"""
+Benchmarks the scheduler -> announce pipeline (_play_azan with Azan and Duaa)
+against simulated devices.
+
+Usage:
+    python benchmarks/bench_scheduler_pipeline.py --devices 20 --rounds 5
+"""
+import sys
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import azan_scheduler  # noqa: E402
+from AzanScheduler.apple_manager import AppleManager  # noqa: E402
+from AzanScheduler.device_simulator import DeviceSimulator  # noqa: E402
+
+
+async def run(args):
+    simulator = DeviceSimulator(
+        devices=args.devices,
+        discovery_delay=args.discovery_delay,
+        connect_latency=args.connect_latency,
+        stream_duration=args.stream_duration,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    scheduler = azan_scheduler.AzanScheduler()
+    scheduler.manager = AppleManager(backend=simulator)
+    real_load_config = azan_scheduler.config.load_config
+
+    def load_config(key=None):
+        # Announce on the simulated fleet with Azan and Duaa enabled for Dhuhr
+        overrides = {
+            "DEVICES": simulator.identifiers,
+            "AZAN_SWITCHES": {"Dhuhr": "On"},
+            "SHORT_AZAN_SWITCHES": {"Dhuhr": "Off"},
+            "DUAA_SWITCHES": {"Dhuhr": "On"},
+            "ISHA_GAMA_SWITCH": "Off",
+        }
+        return overrides[key] if key in overrides else real_load_config(key)
+
+    durations = []
+    with patch.object(azan_scheduler.config, "load_config", side_effect=load_config):
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            await scheduler._play_azan("Dhuhr")
+            durations.append(time.perf_counter() - started)
+    await scheduler.manager.pool.close()
+
+    print(f"devices={args.devices} rounds={args.rounds} scans={simulator.scans} connects={simulator.connects} "
+          f"playbacks={len(simulator.playbacks)} injected_failures={simulator.failures}")
+    print(f"_play_azan seconds: first={durations[0]:.3f} median={statistics.median(durations):.3f} max={max(durations):.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--discovery-delay", type=float, default=0.5)
+    parser.add_argument("--connect-latency", type=float, default=0.1)
+    parser.add_argument("--stream-duration", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
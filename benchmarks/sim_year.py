@@ -0,0 +1,135 @@
+"""
+Replays the scheduler over a whole year on a virtual clock against simulated devices,
+crossing DST changes and month and year rollovers in seconds. Prints every firing, checks
+each one happened exactly at its prayer time and reports the CPU time spent.
+
+The simulation keeps the scheduler journal in memory and reads config.json and the bundled
+timetable once, as those file reads and the journal fsync took most of its time.
+
+Usage:
+    python benchmarks/sim_year.py --start 2025-01-01 --days 366 --devices 3
+    python benchmarks/sim_year.py --quiet
+
+Exits with status 1 if a prayer was missed, played twice or played at the wrong time.
+"""
+import sys
+import os
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from dateutil import tz
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.azan_scheduler import AzanScheduler  # noqa: E402
+from AzanScheduler.apple_manager import AppleManager  # noqa: E402
+from AzanScheduler.clock import VirtualClock  # noqa: E402
+from AzanScheduler.config_manager import ConfigManager  # noqa: E402
+from AzanScheduler.device_simulator import DeviceSimulator  # noqa: E402
+from AzanScheduler.scheduler_journal import SchedulerJournal  # noqa: E402
+
+
+def expected_firings(timetable, switches, isha_gama, tz_info, start, end):
+    """
+    Returns the (prayer, UTC time) pairs the scheduler should fire between start and end.
+    """
+    expected = set()
+    day = start.date()
+    while day <= end.date():
+        for prayer, time_str in timetable.get(str(day.month), {}).get(str(day.day), {}).items():
+            if switches.get(prayer, "Off") == "Off" or (prayer.lower() == "isha" and isha_gama == "On"):
+                continue
+            hour, minute = map(int, time_str.split(":"))
+            prayer_time = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz_info)
+            if start < prayer_time < end:
+                expected.add((prayer, prayer_time.astimezone(timezone.utc)))
+        day += timedelta(days=1)
+    return expected
+
+
+async def run(args):
+    real_load_config = ConfigManager.load_config
+    timezone_name = args.timezone or real_load_config(ConfigManager(), "TIMEZONE")
+    tz_info = tz.gettz(timezone_name)
+    start = datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=tz_info)
+    end = start + timedelta(days=args.days)
+
+    simulator = DeviceSimulator.instant(devices=args.devices, seed=args.seed)
+    # Announce on the simulated fleet, from the bundled timetable, in the simulated timezone
+    sim_config = {**real_load_config(ConfigManager()),
+                  "DEVICES": simulator.identifiers, "DEFAULT_TIMETABLE": "Default", "TIMEZONE": timezone_name}
+    timetable = ConfigManager().load_default_timetable()
+
+    def load_config(self, key=None):
+        return sim_config.get(key) if key else sim_config
+
+    clock = VirtualClock(start)
+    firings = []
+    with patch.object(ConfigManager, "load_config", load_config), \
+            patch.object(ConfigManager, "load_default_timetable", lambda self: timetable):
+        scheduler = AzanScheduler(clock=clock)
+        scheduler.manager = AppleManager(backend=simulator)
+        scheduler.journal = SchedulerJournal(clock=clock, persist=False)
+        fire = scheduler._fire
+
+        async def record_fire(prayer_name, prayer_time):
+            firings.append((prayer_name, prayer_time, clock.now(timezone.utc)))
+            await fire(prayer_name, prayer_time)
+
+        scheduler._fire = record_fire
+        expected = expected_firings(timetable, sim_config.get("AZAN_SWITCHES") or {},
+                                    sim_config.get("ISHA_GAMA_SWITCH"), tz_info, start, end)
+
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        task = asyncio.create_task(scheduler._schedule_next_prayer())
+        await clock.until(end)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        cpu_seconds, wall_seconds = time.process_time() - cpu_started, time.perf_counter() - wall_started
+        await scheduler.manager.pool.close()
+
+    firings = [firing for firing in firings if firing[1] < end]
+    fired = Counter((prayer_name, prayer_time.astimezone(timezone.utc)) for prayer_name, prayer_time, _ in firings)
+    late = []
+    offset = None
+    for prayer_name, prayer_time, fired_at in firings:
+        drift = (fired_at - prayer_time).total_seconds()
+        if abs(drift) >= 1:
+            late.append((prayer_name, prayer_time, drift))
+        if not args.quiet:
+            if offset is not None and prayer_time.utcoffset() != offset:
+                print(f"--- UTC offset changes to {prayer_time:%z} ---")
+            print(f"{prayer_time:%Y-%m-%d %H:%M %z}  {prayer_name:<8} fired at "
+                  f"{fired_at.astimezone(prayer_time.tzinfo):%H:%M:%S} ({drift:+.0f}s)")
+        offset = prayer_time.utcoffset()
+
+    missing = expected - set(fired)
+    unexpected = set(fired) - expected
+    repeated = [key for key, count in fired.items() if count > 1]
+    offsets = {prayer_time.utcoffset() for _, prayer_time, _ in firings}
+    print(f"\nsimulated {start:%Y-%m-%d} .. {end:%Y-%m-%d} ({timezone_name}), devices={args.devices}")
+    print(f"firings={len(firings)} expected={len(expected)} missing={len(missing)} unexpected={len(unexpected)} "
+          f"repeated={len(repeated)} off_time={len(late)} utc_offsets={len(offsets)} playbacks={len(simulator.playbacks)}")
+    print(f"cpu={cpu_seconds:.2f}s wall={wall_seconds:.2f}s ({cpu_seconds / max(len(firings), 1) * 1000:.2f} ms CPU per firing)")
+    for prayer_name, prayer_time in sorted(missing, key=lambda item: item[1])[:10]:
+        print(f"MISSING {prayer_name} at {prayer_time.astimezone(tz_info)}")
+    for prayer_name, prayer_time, drift in late[:10]:
+        print(f"OFF TIME {prayer_name} at {prayer_time} by {drift:+.0f}s")
+    return 1 if missing or unexpected or repeated or late else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2025-01-01", help="First simulated day (YYYY-MM-DD), from local midnight")
+    parser.add_argument("--days", type=int, default=366)
+    parser.add_argument("--timezone", help="Defaults to TIMEZONE in config.json")
+    parser.add_argument("--devices", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application logs")
+    arguments = parser.parse_args()
+    if not arguments.verbose:
+        logging.disable(logging.CRITICAL)
+    sys.exit(asyncio.run(run(arguments)))
@@ -1,8 +1,9 @@
 import sys
 import os
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from AzanScheduler.api import app, ConfigManagerGetRequest, ConfigManagerUpdateRequest
+from AzanScheduler.api import app, config, ConfigManagerGetRequest, ConfigManagerUpdateRequest
 
 client = TestClient(app)
 
@@ -43,3 +44,125 @@ def test_update_audio():
     data = {"fileType": "mp3"}
     response = client.post("/api/update-audio", files=files, data=data)
     assert response.status_code in (200, 400, 500)
+
+
+def test_update_audio_too_large():
+    with patch.object(config, "upload_limits", return_value=(4, 16)):
+        files = {"file": ("test.mp3", b"fakecontent", "audio/mpeg")}
+        response = client.post("/api/update-audio", files=files, data={"fileType": "REGULAR_AZAN_FILE"})
+    assert response.status_code == 413
+
+
+def test_scan_devices_stream():
+    async def fake_stream(timeout=None):
+        yield {"name": "Living Room", "identifier": "id1"}
+
+    with patch("AzanScheduler.api.apple_manager.stream_devices", new=fake_stream):
+        response = client.get("/api/scan-devices/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[0].startswith("event: device\ndata: ")
+    assert '"Living Room"' in events[0]
+    assert events[-1].startswith("event: summary")
+    assert '"count": 1' in events[-1]
+
+
+def test_prayer_times_conditional_request():
+    response = client.get("/api/prayer-times")
+    assert response.status_code == 200
+    assert response.headers["cache-control"].startswith("max-age=")
+    cached = client.get("/api/prayer-times", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_events_websocket():
+    from AzanScheduler.api import event_broadcaster
+    with client.websocket_connect("/api/events/ws") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["event"] == "snapshot"
+        assert "active" in snapshot["data"]
+        event_broadcaster.publish("scheduler_started")
+        assert websocket.receive_json()["event"] == "scheduler_started"
+
+
+def test_batch_reads_config_once():
+    from AzanScheduler import metrics
+    from AzanScheduler.api import prayer_times_cache
+
+    async def fake_scan(refresh=False):
+        return [{"name": "Living Room", "identifier": "id1"}]
+
+    prayer_times_cache.invalidate()
+    loads = metrics.config_loads.value("config.json")
+    with patch("AzanScheduler.api.apple_manager.scan_for_devices", new=fake_scan):
+        response = client.post("/api/batch", json={"queries": [
+            {"query": "get-config", "params": {"list": ["TIMEZONE"]}},
+            {"query": "prayer-times"},
+            {"query": "scheduler-status"},
+            {"query": "scan-devices", "id": "devices"},
+            {"query": "unknown"},
+        ]})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert "TIMEZONE" in data["get-config"]["data"]
+    assert data["prayer-times"]["status"] == "success"
+    assert "active" in data["scheduler-status"]["data"]
+    assert data["devices"]["data"][0]["name"] == "Living Room"
+    assert data["unknown"]["status"] == "error"
+    assert metrics.config_loads.value("config.json") == loads + 1
+
+
+def test_update_config_with_stale_version_conflicts():
+    current = {"AUDIO_VOLUME": 40.0, "CONFIG_VERSION": 7}
+    with patch.object(config, "load_config", lambda key=None: dict(current) if key is None else current.get(key)), \
+            patch.object(config, "save_config", lambda new: current.update(new)):
+        response = client.post("/api/get-config", json={"list": ["AUDIO_VOLUME"]})
+        assert response.json()["version"] == 7
+        assert response.headers["etag"] == '"7"'
+        updated = client.post("/api/update-config", json={"updates": {"AUDIO_VOLUME": 50.0}}, headers={"If-Match": '"7"'})
+        assert updated.status_code == 200
+        assert updated.json()["version"] == 8
+        assert updated.headers["etag"] == '"8"'
+        assert list(updated.json()["update_status"]) == ["AUDIO_VOLUME"]
+        stale = client.post("/api/update-config", json={"updates": {"AUDIO_VOLUME": 60.0}}, headers={"If-Match": '"7"'})
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["version"] == 8
+    assert current["AUDIO_VOLUME"] == 50.0
+
+
+def test_follower_forwards_scheduler_calls_to_leader():
+    from unittest.mock import MagicMock
+    from AzanScheduler.api import leader_election
+    leader_response = MagicMock(status_code=200)
+    leader_response.json.return_value = {"status": "success", "data": {"active": True}}
+    with patch.object(leader_election, "enabled", True), \
+            patch.object(leader_election, "leader", return_value={"control_url": "http://127.0.0.1:9"}), \
+            patch("AzanScheduler.api.requests.request", return_value=leader_response) as forwarded:
+        response = client.get("/api/scheduler-status")
+        assert response.json() == {"status": "success", "data": {"active": True}}
+        assert forwarded.call_args[0] == ("GET", "http://127.0.0.1:9/api/scheduler-status")
+        # A forwarded call reaching a worker that is not the leader is not forwarded again
+        assert client.get("/api/scheduler-status", headers={"x-azan-forwarded": "1"}).status_code == 503
+
+
+def test_follower_forwards_config_updates_and_metrics_to_leader():
+    from unittest.mock import MagicMock
+    from AzanScheduler.api import leader_election
+    leader_response = MagicMock(status_code=200, content=b"azan_config_loads_total 1\n", headers={"content-type": "text/plain"})
+    leader_response.json.return_value = {"status": "success", "update_status": {}, "version": 9}
+    with patch.object(leader_election, "enabled", True), \
+            patch.object(leader_election, "leader", return_value={"control_url": "http://127.0.0.1:9"}), \
+            patch.object(config, "update_env_keys") as local_update, \
+            patch("AzanScheduler.api.requests.request", return_value=leader_response) as forwarded:
+        response = client.post("/api/update-config", json={"updates": {"AUDIO_VOLUME": 60.0}}, headers={"If-Match": '"8"'})
+        assert response.json()["version"] == 9
+        assert response.headers["etag"] == '"9"'
+        assert forwarded.call_args[0] == ("POST", "http://127.0.0.1:9/api/update-config")
+        assert forwarded.call_args[1]["json"] == {"updates": {"AUDIO_VOLUME": 60.0}}
+        assert forwarded.call_args[1]["headers"] == {"if-match": '"8"', "x-azan-forwarded": "1"}
+        local_update.assert_not_called()
+        metrics = client.get("/metrics")
+        assert metrics.text == "azan_config_loads_total 1\n"
+        assert forwarded.call_args[0] == ("GET", "http://127.0.0.1:9/metrics")
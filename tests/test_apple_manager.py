@@ -1,9 +1,11 @@
 import sys
 import os
+import asyncio
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from AzanScheduler.apple_manager import AppleManager
+from AzanScheduler.device_simulator import DeviceSimulator, SimulatedAudio
 
 
 @pytest.mark.asyncio
@@ -26,23 +28,67 @@ async def test_discover_device_returns_device():
 
 
 @pytest.mark.asyncio
-async def test_play_file_handles_exception():
+async def test_prepare_device_raises_and_forgets_the_device_when_connect_fails():
     manager = AppleManager()
     device = MagicMock()
     device.name = "Test"
     device.address = "1.2.3.4"
+    manager._resolve_device = AsyncMock(return_value=device)
+    manager.scanner.forget = MagicMock()
     with patch("pyatv.connect", new=AsyncMock(side_effect=Exception("fail"))):
-        await manager._play_file(MagicMock(), device, "file.mp3", 50)
+        with pytest.raises(Exception, match="fail"):
+            await manager._prepare_device(MagicMock(), "id", 50)
+    manager.scanner.forget.assert_called_once_with("id")
+    assert not manager.pool.is_connected("id")
 
 
 @pytest.mark.asyncio
 async def test_announce_calls_discover_and_play():
     manager = AppleManager()
-    manager._discover_device = AsyncMock(return_value=MagicMock())
-    manager._play_file = AsyncMock()
-    await manager.announce("file.mp3", ["id1", "id2"], 50)
-    assert manager._discover_device.await_count == 2
-    assert manager._play_file.await_count <= 2
+    device = MagicMock()
+    device.name = "Test"
+    device.address = "1.2.3.4"
+    device.all_identifiers = ["id1", "id2"]
+    atv = MagicMock()
+    atv.audio.set_volume = AsyncMock()
+    atv.stream.stream_file = AsyncMock()
+    with patch("pyatv.scan", new=AsyncMock(return_value=[device])) as mock_scan, \
+            patch("pyatv.connect", new=AsyncMock(return_value=atv)):
+        await manager.announce("file.mp3", ["id1", "id2"], 50, synchronized=False)
+    # Both devices are discovered by a single scan
+    mock_scan.assert_awaited_once()
+    assert mock_scan.await_args.kwargs["identifier"] == {"id1", "id2"}
+    assert atv.stream.stream_file.await_count == 2
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_devices_beyond_the_concurrency_cap_start_with_the_first_ones():
+    simulator = DeviceSimulator.instant(devices=6, connect_latency=0.01, stream_duration=0.5)
+    manager = AppleManager(backend=simulator)
+    manager.fanout.concurrency = 2
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    results = await manager.announce("azan.mp3", simulator.identifiers, 50, synchronized=False)
+    # Streaming in waves of two would take three full streams
+    assert loop.time() - started < 1.0
+    assert [result["status"] for result in results] == ["success"] * 6
+    starts = [playback["started"] for playback in simulator.playbacks]
+    assert max(starts) - min(starts) < 0.1
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_prepare_all_discovers_missing_devices_with_one_scan():
+    simulator = DeviceSimulator.instant(devices=20)
+    manager = AppleManager(backend=simulator)
+    results, ready = await manager._prepare_all(asyncio.get_running_loop(), simulator.identifiers, 50)
+    assert [result["status"] for result in results] == ["success"] * 20
+    assert set(ready) == set(simulator.identifiers)
+    assert simulator.scans == 1
+    for identifier, (_, atv) in ready.items():
+        manager.pool.release(identifier, atv)
+    await manager.pool.close()
 
 
 @pytest.mark.asyncio
@@ -60,3 +106,82 @@ async def test_scan_for_devices_returns_success():
     with patch("pyatv.scan", new=AsyncMock(return_value=[fake_atv])):
         result = await manager.scan_for_devices()
         assert result["status"] == "success"
+
+
+@pytest.mark.asyncio
+async def test_announce_synchronized_reports_offsets():
+    manager = AppleManager()
+    manager.sync_margin = 0.0
+    manager.sync_offsets = {"id2": 20}
+    device = MagicMock()
+    device.name = "Test"
+    device.address = "1.2.3.4"
+    device.all_identifiers = ["id1", "id2"]
+    manager._discover_devices = AsyncMock(return_value={"id1": device, "id2": device})
+    atv = MagicMock()
+    atv.audio.set_volume = AsyncMock()
+    atv.stream.stream_file = AsyncMock()
+    with patch("pyatv.connect", new=AsyncMock(return_value=atv)):
+        results = await manager.announce("file.mp3", ["id1", "id2"], 50, synchronized=True)
+    report = {result["identifier"]: result for result in results}
+    assert set(report) == {"id1", "id2"}
+    assert report["id2"]["manual_offset_ms"] == 20
+    assert report["id2"]["lead_ms"] >= 20
+    assert "issue_skew_ms" in report["id1"]
+    assert atv.stream.stream_file.await_count == 2
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_hung_synchronized_stream_times_out_and_is_discarded():
+    simulator = DeviceSimulator.instant(devices=2, stream_duration=60)
+    manager = AppleManager(backend=simulator)
+    manager.sync_margin = 0.0
+    manager.fanout.device_timeout = 0.1
+    results = await asyncio.wait_for(manager.announce("azan.mp3", simulator.identifiers, 50, synchronized=True), 5)
+    assert [result["status"] for result in results] == ["timeout"] * 2
+    assert not any(manager.pool.is_connected(identifier) for identifier in simulator.identifiers)
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_hung_device_setup_only_delays_streams_by_the_setup_timeout():
+    simulator = DeviceSimulator.instant(devices=2, stream_duration=0)
+    manager = AppleManager(backend=simulator)
+    manager.fanout.setup_timeout = 0.1
+    manager.fanout.retries = 0
+    hung = simulator.identifiers[1]
+    set_volume = SimulatedAudio.set_volume
+
+    async def hang_on_one_device(audio, level):
+        if audio.device.config.identifier == hung:
+            await asyncio.sleep(60)
+        await set_volume(audio, level)
+
+    with patch.object(SimulatedAudio, "set_volume", hang_on_one_device):
+        results = await asyncio.wait_for(manager.announce("azan.mp3", simulator.identifiers, 50, synchronized=False), 5)
+    assert [result["status"] for result in results] == ["success", "timeout"]
+    assert [playback["identifier"] for playback in simulator.playbacks] == simulator.identifiers[:1]
+    await manager.pool.close()
+
+@pytest.mark.asyncio
+async def test_cancelled_stream_discards_the_session():
+    simulator = DeviceSimulator.instant(devices=1, stream_duration=60)
+    manager = AppleManager(backend=simulator)
+    identifier = simulator.identifiers[0]
+    task = asyncio.create_task(manager.announce("azan.mp3", [identifier], 50, synchronized=True))
+    while not simulator.playbacks:
+        await asyncio.sleep(0.01)
+    assert manager.pool.is_connected(identifier)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert manager.pool.get_device(identifier) is None
+    await manager.pool.close()
+
+
+def test_record_latency_smooths_samples():
+    manager = AppleManager()
+    manager._record_latency("id", 0.1)
+    manager._record_latency("id", 0.2)
+    assert 0.1 < manager.start_latencies["id"] < 0.2
@@ -0,0 +1,96 @@
+import sys
+import os
+import json
+import wave
+import struct
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.audio_metadata import AudioMetadataIndex, read_audio_metadata, METADATA_SUFFIX
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+MP3_HEADER = b"\xff\xfb\x90\x00"
+MP3_FRAME_LENGTH = 417
+
+
+def _write_mp3(path, frames, xing_frames=None, id3=True):
+    data = b""
+    if id3:
+        data += b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    first = bytearray(MP3_HEADER + b"\x00" * (MP3_FRAME_LENGTH - 4))
+    if xing_frames is not None:
+        first[36:48] = b"Xing" + struct.pack(">II", 1, xing_frames)
+    data += bytes(first) + (MP3_HEADER + b"\x00" * (MP3_FRAME_LENGTH - 4)) * (frames - 1)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _write_adts(path, frames, frame_length=200):
+    header = bytes([0xFF, 0xF1, 0x50, 0x80 | (frame_length >> 11), (frame_length >> 3) & 0xFF, ((frame_length & 7) << 5) | 0x1F, 0xFC])
+    with open(path, "wb") as f:
+        f.write((header + b"\x00" * (frame_length - 7)) * frames)
+
+
+def test_cbr_mp3_duration(tmp_path):
+    path = str(tmp_path / "azan.mp3")
+    _write_mp3(path, 100)
+    metadata = read_audio_metadata(path)
+    assert metadata["format"] == "mp3"
+    assert metadata["bitrate"] == 128000
+    assert metadata["sample_rate"] == 44100
+    assert metadata["channels"] == 2
+    assert abs(metadata["duration"] - 100 * MP3_FRAME_LENGTH * 8 / 128000) < 1e-6
+
+
+def test_vbr_mp3_uses_xing_frame_count(tmp_path):
+    path = str(tmp_path / "duaa.mp3")
+    _write_mp3(path, 10, xing_frames=500, id3=False)
+    metadata = read_audio_metadata(path)
+    assert abs(metadata["duration"] - 500 * 1152 / 44100) < 1e-6
+
+
+def test_adts_aac_duration(tmp_path):
+    path = str(tmp_path / "azan.aac")
+    _write_adts(path, 430)
+    metadata = read_audio_metadata(path)
+    assert metadata["format"] == "aac"
+    assert metadata["sample_rate"] == 44100
+    assert metadata["channels"] == 2
+    assert abs(metadata["duration"] - 430 * 1024 / 44100) < 1e-6
+
+
+def test_wav_duration(tmp_path):
+    path = str(tmp_path / "azan.wav")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\x00\x00" * 16000)
+    metadata = read_audio_metadata(path)
+    assert metadata["duration"] == 2.0
+    assert metadata["bitrate"] == 128000
+
+
+def test_index_persists_next_to_file_and_reuses_it(tmp_path):
+    path = str(tmp_path / "azan.mp3")
+    _write_mp3(path, 100)
+    index = AudioMetadataIndex()
+    metadata = index.index(path)
+    with open(path + METADATA_SUFFIX) as f:
+        assert json.load(f) == metadata
+
+    # A fresh index reads the persisted file instead of parsing the audio again
+    with open(path + METADATA_SUFFIX, "w") as f:
+        json.dump({**metadata, "duration": 42.0}, f)
+    assert AudioMetadataIndex().duration(path) == 42.0
+
+    # Changing the file invalidates the persisted entry
+    _write_mp3(path, 200)
+    assert AudioMetadataIndex().duration(path) > metadata["duration"]
+
+
+def test_index_unrecognised_file(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    with open(path, "wb") as f:
+        f.write(b"not audio at all")
+    index = AudioMetadataIndex()
+    assert index.index(path) is None
+    assert index.duration(str(tmp_path / "missing.mp3")) is None
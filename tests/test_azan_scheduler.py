@@ -1,9 +1,14 @@
 import sys
 import os
+import asyncio
 import pytest
-from unittest.mock import patch, AsyncMock
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from AzanScheduler.azan_scheduler import AzanScheduler
+from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.scheduler_journal import SchedulerJournal
 
 
 def test_azan_scheduler_init():
@@ -33,3 +38,141 @@ async def test_play_azan_calls_announce():
         with patch("os.path.exists", return_value=True):
             await scheduler._play_azan("fajr")
     scheduler.manager.announce.assert_called()
+
+
+def _media(duration):
+    return SimpleNamespace(duration=duration, metadata={"duration": duration})
+
+
+def _next_prayer_in(seconds, name="dhuhr"):
+    prayer_time = datetime.now().astimezone() + timedelta(seconds=seconds)
+    return {"prayer": name, "prayer_time": prayer_time.strftime("%Y-%m-%d %H:%M:%S %z")}
+
+
+def test_plan_keeps_duaa_when_it_fits():
+    scheduler = AzanScheduler()
+    duaa = _media(60)
+    assert scheduler._plan_announcement("fajr", _media(180), duaa, _next_prayer_in(3600)) is duaa
+    assert scheduler.announcement["prayer"] == "fajr"
+    assert scheduler.announcement["expected_end"] is not None
+
+
+def test_plan_skips_duaa_that_collides_with_following_prayer():
+    scheduler = AzanScheduler()
+    assert scheduler._plan_announcement("fajr", _media(180), _media(600), _next_prayer_in(300)) is None
+
+
+def test_plan_without_durations_keeps_duaa():
+    scheduler = AzanScheduler()
+    duaa = _media(None)
+    assert scheduler._plan_announcement("fajr", _media(None), duaa, _next_prayer_in(60)) is duaa
+    assert scheduler.announcement["expected_end"] is None
+
+
+def test_plan_without_registry_entries_skips_the_check():
+    scheduler = AzanScheduler()
+    with patch("AzanScheduler.audio_metadata.AudioMetadataIndex.index") as mock_index:
+        assert scheduler._plan_announcement("fajr", "media/azan.mp3", "media/duaa.mp3", _next_prayer_in(60)) == "media/duaa.mp3"
+    # Files resolved at play time are not read on the event loop
+    mock_index.assert_not_called()
+    assert scheduler.announcement["expected_end"] is None
+
+
+@pytest.mark.asyncio
+async def test_play_azan_plans_duaa_from_the_prayer_looked_up_when_armed():
+    scheduler = AzanScheduler()
+    scheduler.manager.announce = AsyncMock(return_value=[])
+    scheduler.fetcher.fetch_prayer_times = MagicMock()
+    scheduler.fetcher.find_following_prayer = MagicMock()
+    scheduler._media = lambda key: _media(600 if key == "DUAA_FILE" else 180)
+    scheduler.following_prayer = _next_prayer_in(300)
+    with patch("AzanScheduler.azan_scheduler.config.load_config") as mock_load:
+        mock_load.side_effect = lambda key=None: {
+            "DEVICES": ["dev1"],
+            "AZAN_SWITCHES": {"fajr": "On"},
+            "SHORT_AZAN_SWITCHES": {"fajr": "Off"},
+            "DUAA_SWITCHES": {"fajr": "On"},
+            "ISHA_GAMA_SWITCH": "Off",
+            "AUDIO_VOLUME": 50
+        }[key]
+        await scheduler._play_azan("fajr")
+    # The Duaa would overlap the following prayer, which was known without a timetable lookup
+    assert scheduler.manager.announce.await_count == 1
+    scheduler.fetcher.fetch_prayer_times.assert_not_called()
+    scheduler.fetcher.find_following_prayer.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_timing_change_replans_without_restart(tmp_path):
+    scheduler = AzanScheduler()
+    scheduler.journal = SchedulerJournal(str(tmp_path / "journal.json"))
+    scheduler.fetcher.fetch_prayer_times = MagicMock(return_value=_next_prayer_in(3600))
+    task = asyncio.create_task(scheduler._schedule_next_prayer())
+    await asyncio.sleep(0.05)
+    scheduler._on_config_changed({"AUDIO_VOLUME"})
+    await asyncio.sleep(0.05)
+    assert scheduler.fetcher.fetch_prayer_times.call_count == 1
+    scheduler._on_config_changed({"AZAN_SWITCHES", "AUDIO_VOLUME"})
+    await asyncio.sleep(0.05)
+    assert scheduler.fetcher.fetch_prayer_times.call_count == 2
+    assert not task.done()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_timing_change_does_not_interrupt_playback(tmp_path):
+    scheduler = AzanScheduler()
+    scheduler.journal = SchedulerJournal(str(tmp_path / "journal.json"))
+    scheduler.fetcher.fetch_prayer_times = MagicMock(side_effect=[_next_prayer_in(1), _next_prayer_in(3600)])
+    finished = asyncio.Event()
+
+    async def slow_play(prayer_name):
+        scheduler._on_config_changed({"TIMEZONE"})
+        await asyncio.sleep(0.05)
+        finished.set()
+
+    scheduler._play_azan = slow_play
+    task = asyncio.create_task(scheduler._schedule_next_prayer())
+    await asyncio.wait_for(finished.wait(), 5)
+    await asyncio.sleep(0.05)
+    assert scheduler.fetcher.fetch_prayer_times.call_count == 2
+    assert not task.done()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_catch_up_plays_prayer_missed_within_grace(tmp_path):
+    scheduler = AzanScheduler()
+    scheduler.journal = SchedulerJournal(str(tmp_path / "journal.json"), grace_period=300)
+    now = datetime.now().astimezone().replace(microsecond=0)
+    await scheduler.journal.schedule("Fajr", now - timedelta(hours=6))
+    await scheduler.journal.schedule("Dhuhr", now - timedelta(seconds=60))
+    scheduler._play_azan = AsyncMock()
+    await scheduler._catch_up()
+    scheduler._play_azan.assert_awaited_once_with("Dhuhr")
+    assert scheduler.journal.state("Fajr", now - timedelta(hours=6)) == "missed"
+    assert scheduler.journal.state("Dhuhr", now - timedelta(seconds=60)) == "fired"
+
+    # A second start does not play it again
+    restarted = AzanScheduler()
+    restarted.journal = SchedulerJournal(str(tmp_path / "journal.json"), grace_period=300)
+    restarted._play_azan = AsyncMock()
+    await restarted._catch_up()
+    await restarted._fire("Dhuhr", now - timedelta(seconds=60))
+    restarted._play_azan.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_config_subscription_lasts_only_while_running(tmp_path):
+    scheduler = AzanScheduler()
+    assert scheduler._on_config_changed not in ConfigManager._subscribers
+    scheduler.journal = SchedulerJournal(str(tmp_path / "journal.json"))
+    scheduler.fetcher.fetch_prayer_times = MagicMock(return_value=_next_prayer_in(3600))
+    with patch("AzanScheduler.azan_scheduler.media_registry.refresh_async", new=AsyncMock()):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        assert scheduler._on_config_changed in ConfigManager._subscribers
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    assert scheduler._on_config_changed not in ConfigManager._subscribers
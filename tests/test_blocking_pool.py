@@ -0,0 +1,39 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.blocking_pool import BlockingPool
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_off_the_event_loop():
+    pool = BlockingPool(max_workers=2, max_queue=2)
+    assert await pool.run(lambda a, b=0: (a + b, threading.current_thread().name), 1, b=2) == (3, "azan-blocking_0")
+    assert pool.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_is_bounded():
+    pool = BlockingPool(max_workers=1, max_queue=1)
+    results = await asyncio.gather(*(pool.run(time.sleep, 0.02) for _ in range(5)))
+    stats = pool.stats()
+    assert results == [None] * 5
+    assert stats["peak_queued"] == 1
+    assert stats["submitted"] == stats["completed"] == 5
+    assert stats["active"] == stats["queued"] == 0
+    assert stats["max_wait_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted_and_raised():
+    pool = BlockingPool(max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await pool.run(fail)
+    assert pool.stats()["failed"] == 1
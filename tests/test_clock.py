@@ -0,0 +1,84 @@
+import sys
+import os
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from dateutil import tz
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.azan_scheduler import AzanScheduler
+from AzanScheduler.clock import VirtualClock
+from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.scheduler_journal import SchedulerJournal
+
+DUBLIN = tz.gettz("Europe/Dublin")
+
+
+def test_virtual_clock_reads_in_any_timezone():
+    clock = VirtualClock(datetime(2025, 3, 30, 0, 30, tzinfo=DUBLIN))
+    assert clock.now(timezone.utc) == datetime(2025, 3, 30, 0, 30, tzinfo=timezone.utc)
+    clock.sleep_blocking(3600)
+    # 01:00 GMT jumps to 02:00 IST
+    assert clock.now(DUBLIN).hour == 2
+    assert clock.now(DUBLIN).utcoffset() == timedelta(hours=1)
+
+
+def test_virtual_clock_needs_aware_start():
+    with pytest.raises(ValueError):
+        VirtualClock(datetime(2025, 1, 1))
+
+
+@pytest.mark.asyncio
+async def test_virtual_clock_wait_for():
+    clock = VirtualClock(datetime(2025, 1, 1, tzinfo=timezone.utc))
+    event = asyncio.Event()
+    with pytest.raises(asyncio.TimeoutError):
+        await clock.wait_for(event, 90)
+    assert clock.now(timezone.utc) == datetime(2025, 1, 1, 0, 1, 30, tzinfo=timezone.utc)
+    event.set()
+    await clock.wait_for(event, 90)
+    assert clock.now(timezone.utc) == datetime(2025, 1, 1, 0, 1, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_virtual_clock_until():
+    clock = VirtualClock(datetime(2025, 1, 1, tzinfo=timezone.utc))
+    waiter = asyncio.create_task(clock.until(datetime(2025, 1, 2, tzinfo=timezone.utc)))
+    await clock.sleep(3600)
+    assert not waiter.done()
+    await clock.sleep(86400)
+    await asyncio.wait_for(waiter, 1)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_fires_on_time_across_dst_and_month_change(tmp_path):
+    start = datetime(2025, 3, 29, tzinfo=DUBLIN)
+    end = datetime(2025, 4, 2, tzinfo=DUBLIN)
+    clock = VirtualClock(start)
+    real_load_config = ConfigManager.load_config
+
+    def load_config(self, key=None):
+        overrides = {"DEFAULT_TIMETABLE": "Default", "TIMEZONE": "Europe/Dublin", "ISHA_GAMA_SWITCH": "Off",
+                     "AZAN_SWITCHES": {"Fajr": "On", "Dhuhr": "On"}}
+        return overrides[key] if key in overrides else real_load_config(self, key)
+
+    with patch.object(ConfigManager, "load_config", load_config):
+        scheduler = AzanScheduler(clock=clock)
+        scheduler.journal = SchedulerJournal(str(tmp_path / "journal.json"), clock=clock)
+        fired = []
+
+        async def play(prayer_name):
+            fired.append((prayer_name, clock.now(DUBLIN)))
+
+        scheduler._play_azan = play
+        task = asyncio.create_task(scheduler._schedule_next_prayer())
+        await asyncio.wait_for(clock.until(end), 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        timetable = ConfigManager().load_default_timetable()
+    fired = [(prayer_name, moment) for prayer_name, moment in fired if moment < end]
+    assert [prayer_name for prayer_name, _ in fired] == ["Fajr", "Dhuhr"] * 4
+    for prayer_name, moment in fired:
+        assert moment.strftime("%H:%M") == timetable[str(moment.month)][str(moment.day)][prayer_name]
+        assert moment.second == 0
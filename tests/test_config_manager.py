@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 import pytest
 from unittest.mock import patch, mock_open
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -21,9 +22,10 @@ def test_config_manager_load_and_save_config():
         mgr.config_file_path = "dummy.json"
         assert mgr.load_config("key") == "value"
         assert mgr.load_config() == {"key": "value"}
-    with patch("builtins.open", mock_open()) as m:
+    with patch("builtins.open", mock_open()) as m, patch("os.replace") as replace:
         mgr.save_config({"a": 1})
         m().write.assert_called()
+        assert replace.call_args[0][1] == "dummy.json"
 
 
 def test_validate_url():
@@ -76,7 +78,7 @@ def test_get_config_values():
 async def test_update_env_keys_invalid_key():
     mgr = ConfigManager()
     with patch.object(mgr, "_is_validate_key", return_value=False):
-        result = await mgr.update_env_keys({"bad": 1})
+        result, _ = await mgr.update_env_keys({"bad": 1})
         assert result["status"] == "fail"
 
 
@@ -86,3 +88,177 @@ async def test_update_media_file_invalid_key():
     with patch.object(mgr, "_is_validate_key", return_value=False):
         result = await mgr.update_media_file("file.mp3", "BAD_KEY", b"bytes")
         assert result["status"] == "fail"
+
+
+class _ChunkedUpload:
+    """Async reader handing out a payload in small chunks, like an UploadFile."""
+
+    def __init__(self, data):
+        self.data = data
+        self.reads = 0
+
+    async def read(self, size):
+        chunk, self.data = self.data[:size], self.data[size:]
+        self.reads += 1
+        return chunk
+
+
+@pytest.fixture
+def upload_manager(tmp_path, monkeypatch):
+    mgr = ConfigManager()
+    mgr.media_folder = str(tmp_path)
+    saved = {}
+    monkeypatch.setattr(mgr, "load_config", lambda key=None: {})
+    monkeypatch.setattr(mgr, "save_config", lambda config: saved.update(config))
+    monkeypatch.setattr(mgr, "upload_limits", lambda: (1024, 16))
+    from AzanScheduler.media_cache import media_cache
+    from AzanScheduler.media_registry import media_registry
+    monkeypatch.setattr(media_cache, "prepare", lambda path, content_hash=None: None)
+    monkeypatch.setattr(media_registry, "refresh", lambda: None)
+    return mgr, saved
+
+
+@pytest.mark.asyncio
+async def test_update_media_file_streams_and_hashes(upload_manager, tmp_path):
+    import hashlib
+    mgr, saved = upload_manager
+    payload = b"a" * 100
+    upload = _ChunkedUpload(payload)
+    result = await mgr.update_media_file("new azan.mp3", "REGULAR_AZAN_FILE", upload)
+    assert result["status"] == "success"
+    assert result["sha256"] == hashlib.sha256(payload).hexdigest()
+    assert result["size"] == 100
+    assert upload.reads > 1
+    assert (tmp_path / "new_azan.mp3").read_bytes() == payload
+    assert saved["REGULAR_AZAN_FILE"] == "new_azan.mp3"
+
+
+@pytest.mark.asyncio
+async def test_update_media_file_rejects_oversized_upload(upload_manager, tmp_path):
+    from AzanScheduler.config_manager import MediaFileTooLarge
+    mgr, saved = upload_manager
+    (tmp_path / "azan.mp3").write_bytes(b"old")
+    with pytest.raises(MediaFileTooLarge):
+        await mgr.update_media_file("azan.mp3", "REGULAR_AZAN_FILE", _ChunkedUpload(b"a" * 2048))
+    assert (tmp_path / "azan.mp3").read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["azan.mp3"]
+    assert saved == {}
+
+
+@pytest.mark.asyncio
+async def test_update_media_file_keeps_old_file_readable(upload_manager, tmp_path):
+    mgr, _ = upload_manager
+    (tmp_path / "azan.mp3").write_bytes(b"old content")
+    with open(tmp_path / "azan.mp3", "rb") as playing:
+        await mgr.update_media_file("azan.mp3", "REGULAR_AZAN_FILE", b"new content")
+        assert playing.read() == b"old content"
+    assert (tmp_path / "azan.mp3").read_bytes() == b"new content"
+
+
+@pytest.mark.asyncio
+async def test_update_env_keys_notifies_changed_keys_once(monkeypatch):
+    mgr = ConfigManager()
+    current = {"AUDIO_VOLUME": 40.0, "ISHA_GAMA_SWITCH": "Off"}
+    monkeypatch.setattr(mgr, "load_config", lambda key=None: dict(current))
+    monkeypatch.setattr(mgr, "save_config", lambda config: current.update(config))
+    calls = []
+    ConfigManager.subscribe(calls.append)
+    try:
+        await mgr.update_env_keys({"AUDIO_VOLUME": 55.0, "ISHA_GAMA_SWITCH": "Off"})
+    finally:
+        ConfigManager.unsubscribe(calls.append)
+    assert calls == [{"AUDIO_VOLUME"}]
+
+
+@pytest.mark.asyncio
+async def test_update_env_keys_bumps_version_and_rejects_stale_version(monkeypatch):
+    import asyncio
+    from AzanScheduler.config_manager import ConfigVersionConflict
+    mgr = ConfigManager()
+    current = {"AUDIO_VOLUME": 40.0, "DEVICES": [], "CONFIG_VERSION": 3}
+    monkeypatch.setattr(mgr, "load_config", lambda key=None: json.loads(json.dumps(current)))
+    monkeypatch.setattr(mgr, "save_config", lambda config: current.update(config))
+    status, version = await mgr.update_env_keys({"AUDIO_VOLUME": 55.0}, expected_version=3)
+    assert version == current["CONFIG_VERSION"] == 4
+    assert list(status) == ["AUDIO_VOLUME"]
+    with pytest.raises(ConfigVersionConflict) as conflict:
+        await mgr.update_env_keys({"AUDIO_VOLUME": 60.0}, expected_version=3)
+    assert conflict.value.current == 4
+    assert current["AUDIO_VOLUME"] == 55.0
+    # Concurrent unconditional updates are serialized, so every one gets its own version
+    results = await asyncio.gather(*(mgr.update_env_keys({"AUDIO_VOLUME": float(volume)}) for volume in range(10)))
+    assert sorted(version for _, version in results) == list(range(5, 15))
+
+
+def test_save_config_replaces_file_atomically(tmp_path):
+    mgr = ConfigManager()
+    mgr.config_file_path = str(tmp_path / "config.json")
+    mgr.save_config({"a": 1})
+    mgr.save_config({"a": 2})
+    assert mgr.load_config() == {"a": 2}
+    assert os.listdir(tmp_path) == ["config.json"]
+
+
+@pytest.mark.asyncio
+async def test_watch_notifies_changes_made_by_another_process(tmp_path):
+    import asyncio
+    mgr = ConfigManager()
+    mgr.config_file_path = str(tmp_path / "config.json")
+    mgr.save_config({"TIMEZONE": "UTC", "AUDIO_VOLUME": 50.0, "CONFIG_VERSION": 1})
+    calls = []
+    ConfigManager.subscribe(calls.append)
+    watcher = asyncio.create_task(mgr.watch(0.01))
+    try:
+        await asyncio.sleep(0.05)
+        # Another worker saves a new version
+        ConfigManager.save_config(mgr, {"TIMEZONE": "Africa/Cairo", "AUDIO_VOLUME": 50.0, "CONFIG_VERSION": 2})
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        watcher.cancel()
+        ConfigManager.unsubscribe(calls.append)
+    assert calls == [{"TIMEZONE"}]
+
+
+@pytest.mark.asyncio
+async def test_update_env_keys_saves_the_batch_once(monkeypatch):
+    mgr = ConfigManager()
+    current = {"AUDIO_VOLUME": 40.0, "ISHA_GAMA_SWITCH": "Off", "CONFIG_VERSION": 3}
+    saves = []
+    monkeypatch.setattr(mgr, "load_config", lambda key=None: json.loads(json.dumps(current)))
+    monkeypatch.setattr(mgr, "save_config", lambda config: saves.append(dict(config)) or current.update(config))
+    status, version = await mgr.update_env_keys({"AUDIO_VOLUME": 55.0, "ISHA_GAMA_SWITCH": "On", "TIMEZONE": "Not/AZone"})
+    assert saves == [{"AUDIO_VOLUME": 55.0, "ISHA_GAMA_SWITCH": "On", "CONFIG_VERSION": 4}]
+    assert set(status) == {"AUDIO_VOLUME", "ISHA_GAMA_SWITCH", "TIMEZONE"}
+    assert status["TIMEZONE"]["status"] == "fail"
+    assert version == 4
+    # An unknown key rejects the whole batch without writing, and still reports the version
+    status, version = await mgr.update_env_keys({"AUDIO_VOLUME": 60.0, "bad": 1})
+    assert status["status"] == "fail"
+    assert version == 4
+    assert len(saves) == 1
+
+
+def _bump_config_version(config_dir, times):
+    mgr = ConfigManager()
+    mgr.config_file_path = os.path.join(config_dir, "config.json")
+    mgr.lock_file_path = os.path.join(config_dir, "config.lock")
+    for _ in range(times):
+        mgr._set_config_key("AUDIO_VOLUME", 50.0)
+
+
+def test_updates_from_several_processes_are_serialized(tmp_path):
+    import multiprocessing
+    mgr = ConfigManager()
+    mgr.config_file_path = str(tmp_path / "config.json")
+    mgr.save_config({"AUDIO_VOLUME": 40.0})
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_bump_config_version, args=(str(tmp_path), 25)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    # Every update saw the previous one, so none was lost
+    assert mgr.load_config("CONFIG_VERSION") == 100
@@ -0,0 +1,142 @@
+import sys
+import os
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.connection_pool import ConnectionPool
+from AzanScheduler.apple_manager import AppleManager
+
+
+def make_device(identifier="id1"):
+    device = MagicMock()
+    device.name = "Test"
+    device.address = "1.2.3.4"
+    device.identifier = identifier
+    return device
+
+
+@pytest.mark.asyncio
+async def test_acquire_reuses_session():
+    pool = ConnectionPool(heartbeat_interval=60)
+    with patch("pyatv.connect", new=AsyncMock(return_value=MagicMock())) as mock_connect:
+        first = await pool.acquire(MagicMock(), make_device())
+        second = await pool.acquire(MagicMock(), make_device())
+    assert first is second
+    assert mock_connect.await_count == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_discard_closes_session():
+    pool = ConnectionPool(heartbeat_interval=60)
+    atv = MagicMock()
+    with patch("pyatv.connect", new=AsyncMock(return_value=atv)):
+        await pool.acquire(MagicMock(), make_device())
+    pool.discard("id1")
+    atv.close.assert_called_once()
+    assert pool.get_device("id1") is None
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_lost_reconnects_in_background():
+    pool = ConnectionPool(heartbeat_interval=60)
+    with patch("pyatv.connect", new=AsyncMock(side_effect=[MagicMock(), MagicMock()])) as mock_connect:
+        first = await pool.acquire(MagicMock(), make_device())
+        pool._on_connection_lost("id1", Exception("gone"))
+        await asyncio.gather(*pool._reconnect_tasks.values())
+        second = await pool.acquire(MagicMock(), make_device())
+    assert first is not second
+    assert mock_connect.await_count == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_azan_and_duaa_share_one_session():
+    manager = AppleManager()
+    manager._discover_device = AsyncMock(return_value=make_device())
+    atv = MagicMock()
+    atv.audio.set_volume = AsyncMock()
+    atv.stream.stream_file = AsyncMock()
+    with patch("pyatv.connect", new=AsyncMock(return_value=atv)) as mock_connect:
+        await manager.announce("azan.mp3", ["id1"], 50)
+        await manager.announce("duaa.mp3", ["id1"], 50)
+    assert mock_connect.await_count == 1
+    assert manager._discover_device.await_count == 1
+    assert atv.stream.stream_file.await_count == 2
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_reconnects_sessions_whose_device_stopped_answering():
+    backend = MagicMock()
+    backend.connect = AsyncMock(side_effect=[MagicMock(), MagicMock()])
+    backend.probe = AsyncMock(side_effect=OSError("unreachable"))
+    pool = ConnectionPool(heartbeat_interval=60, backend=backend)
+    first = await pool.acquire(MagicMock(), make_device())
+    pool.release("id1", first)
+    await pool._check_sessions()
+    await asyncio.gather(*pool._reconnect_tasks.values())
+    second = await pool.acquire(MagicMock(), make_device())
+    assert backend.probe.await_count == 1
+    assert first is not second
+    assert backend.connect.await_count == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_timeout_spares_sessions_kept_warm():
+    backend = MagicMock()
+    backend.connect = AsyncMock(side_effect=[MagicMock(), MagicMock()])
+    backend.probe = AsyncMock()
+    pool = ConnectionPool(heartbeat_interval=60, idle_timeout=0.01, backend=backend)
+    pool.release("warm", await pool.acquire(MagicMock(), make_device("warm"), keep_warm=True))
+    pool.release("idle", await pool.acquire(MagicMock(), make_device("idle")))
+    await asyncio.sleep(0.02)
+    await pool._check_sessions()
+    assert pool.is_connected("warm")
+    assert pool.get_device("idle") is None
+    assert backend.probe.await_count == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_during_a_stream_defers_the_reconnect():
+    streaming = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def stream_file(source):
+        streaming.set()
+        await finish.wait()
+
+    atv = MagicMock()
+    atv.stream.stream_file = AsyncMock(side_effect=stream_file)
+    backend = MagicMock()
+    backend.connect = AsyncMock(side_effect=[atv, MagicMock()])
+    backend.probe = AsyncMock(side_effect=OSError("unreachable"))
+    manager = AppleManager(backend=backend)
+    manager.pool = pool = ConnectionPool(heartbeat_interval=60, idle_timeout=0.01, backend=backend)
+
+    manager._resolve_device = AsyncMock(return_value=make_device())
+
+    device, prepared = await manager._prepare_device(MagicMock(), "id1", None)
+    result = {"identifier": "id1", "status": "success", "elapsed_ms": 0}
+    playing = asyncio.create_task(manager._stream_prepared("id1", device, prepared, "azan.mp3", result))
+    await streaming.wait()
+    await asyncio.sleep(0.02)
+    await pool._check_sessions()
+    await asyncio.gather(*pool._reconnect_tasks.values())
+    # Neither the failed probe nor the idle timeout touches the session while it streams
+    atv.close.assert_not_called()
+    assert pool.in_use("id1")
+    assert backend.connect.await_count == 1
+
+    finish.set()
+    await playing
+    assert result["status"] == "success"
+    await asyncio.gather(*pool._reconnect_tasks.values())
+    atv.close.assert_called_once()
+    assert backend.connect.await_count == 2
+    assert not pool.in_use("id1")
+    await pool.close()
@@ -0,0 +1,78 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.apple_manager import AppleManager
+from AzanScheduler.device_scanner import DeviceScanner
+from AzanScheduler.device_simulator import DeviceSimulator
+
+
+@pytest.mark.asyncio
+async def test_concurrent_scans_are_coalesced():
+    simulator = DeviceSimulator.instant(discovery_delay=0.05)
+    scanner = DeviceScanner(backend=simulator, cache_ttl=30, interval=0)
+    results = await asyncio.gather(*(scanner.scan() for _ in range(5)))
+    assert simulator.scans == 1
+    assert all(len(devices) == 3 for devices in results)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_served_until_refresh():
+    simulator = DeviceSimulator.instant(discovery_delay=0.05)
+    scanner = DeviceScanner(backend=simulator, cache_ttl=30, interval=0)
+    await scanner.scan()
+    await scanner.scan()
+    assert simulator.scans == 1
+    await scanner.scan(refresh=True)
+    assert simulator.scans == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_scan():
+    simulator = DeviceSimulator.instant(discovery_delay=0.05)
+    scanner = DeviceScanner(backend=simulator, cache_ttl=30, interval=0)
+    first = asyncio.create_task(scanner.scan())
+    second = asyncio.create_task(scanner.scan())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert len(await second) == 3
+
+
+@pytest.mark.asyncio
+async def test_background_scanner_and_lookup():
+    simulator = DeviceSimulator.instant(discovery_delay=0.05)
+    scanner = DeviceScanner(backend=simulator, cache_ttl=30, interval=60)
+    scanner.start()
+    await asyncio.sleep(0.1)
+    await scanner.stop()
+    assert simulator.scans == 1
+    identifier = simulator.identifiers[0]
+    assert scanner.lookup(identifier).identifier == identifier
+    scanner.forget(identifier)
+    assert scanner.lookup(identifier) is None
+
+
+@pytest.mark.asyncio
+async def test_announcement_resolves_devices_from_scan():
+    simulator = DeviceSimulator.instant(discovery_delay=0.05)
+    manager = AppleManager(backend=simulator)
+    await manager.scan_for_devices()
+    results = await manager.announce("azan.mp3", simulator.identifiers, 50)
+    assert [result["status"] for result in results] == ["success"] * 3
+    assert simulator.scans == 1
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_devices_before_scan_completes():
+    simulator = DeviceSimulator.instant(devices=4, discovery_delay=0.2)
+    scanner = DeviceScanner(backend=simulator, cache_ttl=30, interval=0)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    arrivals = []
+    async for device in scanner.stream():
+        arrivals.append((loop.time() - started, device.identifier))
+    assert [identifier for _, identifier in arrivals] == simulator.identifiers
+    assert arrivals[0][0] < 0.15
+    assert scanner.lookup(simulator.identifiers[-1]) is not None
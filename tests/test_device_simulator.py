@@ -0,0 +1,41 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.apple_manager import AppleManager
+from AzanScheduler.device_simulator import DeviceSimulator
+
+
+@pytest.mark.asyncio
+async def test_scan_returns_all_devices():
+    simulator = DeviceSimulator.instant()
+    devices = await simulator.scan(asyncio.get_running_loop())
+    assert [d.identifier for d in devices] == simulator.identifiers
+
+
+@pytest.mark.asyncio
+async def test_scan_by_unknown_identifier():
+    simulator = DeviceSimulator.instant(accept_unknown=False)
+    assert await simulator.scan(asyncio.get_running_loop(), identifier="missing") == []
+
+
+@pytest.mark.asyncio
+async def test_connect_failure_rate():
+    simulator = DeviceSimulator.instant(failure_rate=1.0)
+    device = simulator.devices["sim-0000"]
+    with pytest.raises(ConnectionError):
+        await simulator.connect(device, asyncio.get_running_loop())
+
+
+@pytest.mark.asyncio
+async def test_announce_and_scan_against_simulator():
+    simulator = DeviceSimulator.instant()
+    manager = AppleManager(backend=simulator)
+    results = await manager.announce("azan.mp3", simulator.identifiers, 50, synchronized=False)
+    assert all(r["status"] == "success" for r in results)
+    assert len(simulator.playbacks) == 3
+    scan = await manager.scan_for_devices()
+    assert scan["status"] == "success"
+    assert scan["devices"][0]["services"][0]["protocol"] == "RAOP"
+    await manager.pool.close()
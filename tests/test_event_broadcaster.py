@@ -0,0 +1,69 @@
+import sys
+import os
+import asyncio
+import threading
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.event_broadcaster import EventBroadcaster
+
+
+@pytest.fixture
+def broadcaster():
+    broadcaster = EventBroadcaster(queue_size=3)
+    yield broadcaster
+    ConfigManager.unsubscribe(broadcaster._on_config_changed)
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_every_client(broadcaster):
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    broadcaster.publish("prayer_armed", {"prayer": "Fajr"})
+    for subscription in (first, second):
+        message = await subscription.get()
+        assert message["event"] == "prayer_armed"
+        assert message["data"] == {"prayer": "Fajr"}
+        assert message["id"] == 1
+    first.close()
+    broadcaster.publish("scheduler_stopped")
+    assert first.queue.empty()
+    assert (await second.get())["event"] == "scheduler_stopped"
+
+
+@pytest.mark.asyncio
+async def test_slow_client_drops_oldest_events(broadcaster):
+    slow = broadcaster.subscribe()
+    for index in range(5):
+        broadcaster.publish("playback_started", {"index": index})
+    assert await slow.get() == {"event": "overflow", "data": {"dropped": 2}}
+    assert [(await slow.get())["data"]["index"] for _ in range(3)] == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_publish_from_worker_thread(broadcaster):
+    subscription = broadcaster.subscribe()
+    thread = threading.Thread(target=broadcaster.publish, args=("timetable_refresh", {"status": "refreshed"}))
+    thread.start()
+    thread.join()
+    message = await asyncio.wait_for(subscription.get(), 1)
+    assert message["data"] == {"status": "refreshed"}
+
+
+@pytest.mark.asyncio
+async def test_config_changes_are_broadcast(broadcaster):
+    subscription = broadcaster.subscribe()
+    ConfigManager()._notify({"TIMEZONE", "AUDIO_VOLUME"})
+    message = await subscription.get()
+    assert message["event"] == "config_changed"
+    assert message["data"] == {"keys": ["AUDIO_VOLUME", "TIMEZONE"]}
+
+
+@pytest.mark.asyncio
+async def test_relaying_drops_own_events_and_delivers_leader_events(broadcaster):
+    subscription = broadcaster.subscribe()
+    broadcaster.relaying = True
+    broadcaster.publish("config_changed", {"keys": ["TIMEZONE"]})
+    leader_event = {"event": "prayer_armed", "id": 41, "time": "2026-01-01T05:00:00+00:00", "data": {"prayer": "Fajr"}}
+    broadcaster.relay(leader_event)
+    assert await subscription.get() == leader_event
+    assert subscription.queue.empty()
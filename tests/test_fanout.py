@@ -0,0 +1,63 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.fanout import FanoutEngine
+
+
+@pytest.mark.asyncio
+async def test_run_respects_concurrency_cap():
+    engine = FanoutEngine(concurrency=3, device_timeout=5, retries=0, retry_wait=0)
+    active = 0
+    peak = 0
+
+    async def worker(identifier):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    results = await engine.run([f"dev{i}" for i in range(10)], worker)
+    assert peak == 3
+    assert [r["identifier"] for r in results] == [f"dev{i}" for i in range(10)]
+    assert all(r["status"] == "success" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_run_reports_timeout():
+    engine = FanoutEngine(concurrency=2, setup_timeout=0.01, retries=0, retry_wait=0)
+
+    async def worker(identifier):
+        await asyncio.sleep(1)
+
+    results = await engine.run(["dev1"], worker)
+    assert results[0]["status"] == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_run_retries_failures():
+    engine = FanoutEngine(concurrency=2, device_timeout=5, retries=2, retry_wait=0)
+    calls = []
+
+    async def worker(identifier):
+        calls.append(identifier)
+        if len(calls) < 3:
+            raise RuntimeError("flaky")
+
+    results = await engine.run(["dev1"], worker)
+    assert results[0]["status"] == "success"
+    assert results[0]["attempts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_run_reports_failure_message():
+    engine = FanoutEngine(concurrency=2, device_timeout=5, retries=0, retry_wait=0)
+
+    async def worker(identifier):
+        raise LookupError("not found")
+
+    results = await engine.run(["dev1"], worker)
+    assert results[0]["status"] == "fail"
+    assert results[0]["message"] == "not found"
@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import pytest
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import health_monitor as health_module
+from AzanScheduler.apple_manager import AppleManager
+from AzanScheduler.connection_pool import tcp_probe
+from AzanScheduler.device_simulator import DeviceSimulator
+from AzanScheduler.health_monitor import HealthMonitor
+
+
+def make_manager(simulator):
+    manager = AppleManager(backend=simulator)
+    manager.health = HealthMonitor(manager, failure_threshold=2, warm_pool=True, skip_dead=True)
+    return simulator, manager
+
+
+@pytest.mark.asyncio
+async def test_check_all_records_health_and_warms_pool(monkeypatch):
+    simulator, manager = make_manager(DeviceSimulator.instant())
+    monkeypatch.setattr(health_module.config, "load_config", lambda key=None: simulator.identifiers)
+    entries = await manager.health.check_all()
+    assert [entry["state"] for entry in entries] == ["healthy"] * 3
+    assert all(entry["rtt_ms"] is not None for entry in entries)
+    assert all(manager.pool.is_connected(identifier) for identifier in simulator.identifiers)
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_device_becomes_dead_after_threshold():
+    simulator, manager = make_manager(DeviceSimulator.instant())
+    identifier = simulator.identifiers[0]
+    simulator.offline.add(identifier)
+    assert (await manager.health.probe(identifier))["state"] == "degraded"
+    assert not manager.health.is_dead(identifier)
+    assert (await manager.health.probe(identifier))["state"] == "dead"
+    assert manager.health.is_dead(identifier)
+    simulator.offline.clear()
+    assert (await manager.health.probe(identifier))["state"] == "healthy"
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_keeps_sessions_that_are_not_dead_or_in_use():
+    simulator, manager = make_manager(DeviceSimulator.instant())
+    identifier = simulator.identifiers[0]
+    await manager.health.probe(identifier)
+    simulator.offline.add(identifier)
+    assert (await manager.health.probe(identifier))["state"] == "degraded"
+    assert manager.pool.is_connected(identifier)
+    atv = await manager.pool.acquire(asyncio.get_running_loop(), manager.pool.get_device(identifier), identifier)
+    assert (await manager.health.probe(identifier))["state"] == "dead"
+    assert manager.pool.is_connected(identifier)
+    manager.pool.release(identifier, atv)
+    await manager.health.probe(identifier)
+    assert manager.pool.get_device(identifier) is None
+    await manager.pool.close()
+
+@pytest.mark.asyncio
+async def test_announce_skips_dead_devices():
+    simulator, manager = make_manager(DeviceSimulator.instant())
+    dead = simulator.identifiers[1]
+    simulator.offline.add(dead)
+    for _ in range(2):
+        await manager.health.probe(dead)
+    results = await manager.announce("azan.mp3", simulator.identifiers, 50)
+    statuses = {result["identifier"]: result["status"] for result in results}
+    assert statuses[dead] == "skipped"
+    assert [statuses[identifier] for identifier in simulator.identifiers if identifier != dead] == ["success", "success"]
+    assert dead not in {playback["identifier"] for playback in simulator.playbacks}
+    await asyncio.sleep(0)
+    await manager.pool.close()
+
+
+@pytest.mark.asyncio
+async def test_tcp_probe_measures_round_trip():
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    device = SimpleNamespace(address="127.0.0.1", services=[SimpleNamespace(port=port)])
+    await tcp_probe(device, 1)
+    server.close()
+    await server.wait_closed()
+    with pytest.raises(OSError):
+        await tcp_probe(device, 1)
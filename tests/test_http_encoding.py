@@ -0,0 +1,85 @@
+import sys
+import os
+import gzip
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.http_encoding import FastJSONResponse, CompressionMiddleware
+
+PAYLOAD = {"status": "success", "data": [{"date": f"2025-01-{day:02d}", "Fajr": "06:45", "name": "Café"} for day in range(1, 29)]}
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/large")
+async def large():
+    return PAYLOAD
+
+
+@app.get("/small")
+async def small():
+    return {"status": "success"}
+
+
+@app.get("/tagged")
+async def tagged():
+    return Response(json.dumps(PAYLOAD), media_type="application/json", headers={"etag": '"abc"'})
+
+
+@app.get("/varied")
+async def varied():
+    return Response(json.dumps(PAYLOAD), media_type="application/json", headers={"vary": "Origin"})
+
+
+@app.get("/stream")
+async def stream():
+    async def chunks():
+        yield "data: 1\n\n" * 100
+        yield "data: 2\n\n" * 100
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+client = TestClient(app)
+
+
+def test_fast_json_matches_standard_json():
+    assert FastJSONResponse(PAYLOAD).body == JSONResponse(PAYLOAD).body
+
+
+def test_large_json_is_gzipped():
+    response = client.get("/large", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == PAYLOAD
+    raw = client.get("/large", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert len(gzip.compress(raw.content)) < len(raw.content)
+
+
+def test_small_and_streamed_responses_are_not_compressed():
+    assert "content-encoding" not in client.get("/small", headers={"accept-encoding": "gzip"}).headers
+    response = client.get("/stream", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text.endswith("data: 2\n\n")
+
+
+def test_vary_is_merged_on_every_negotiated_response():
+    assert client.get("/varied", headers={"accept-encoding": "gzip"}).headers["vary"] == "Origin, Accept-Encoding"
+    assert client.get("/varied", headers={"accept-encoding": "identity"}).headers["vary"] == "Origin, Accept-Encoding"
+    assert client.get("/small", headers={"accept-encoding": "gzip"}).headers["vary"] == "Accept-Encoding"
+    assert "vary" not in client.get("/stream", headers={"accept-encoding": "gzip"}).headers
+
+
+def test_etag_of_compressed_response_is_weak():
+    response = client.get("/tagged", headers={"accept-encoding": "gzip"})
+    assert response.headers["etag"] == 'W/"abc"'
+
+
+def test_brotli_is_preferred_when_installed():
+    pytest.importorskip("brotli")
+    response = client.get("/large", headers={"accept-encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
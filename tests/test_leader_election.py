@@ -0,0 +1,72 @@
+import sys
+import os
+import asyncio
+import subprocess
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.leader_election import LeaderElection
+
+
+async def wait_for_leader(election, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if election.is_leader:
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+@pytest.mark.asyncio
+async def test_one_leader_and_failover_on_step_down(tmp_path):
+    lock_path = str(tmp_path / "scheduler.lock")
+    first = LeaderElection(workers=2, lock_path=lock_path, failover_interval=0.02)
+    second = LeaderElection(workers=2, lock_path=lock_path, failover_interval=0.02)
+    elected = []
+
+    def on_elected(name):
+        async def callback():
+            elected.append(name)
+            return f"http://127.0.0.1/{name}"
+        return callback
+
+    first.start(on_elected("first"))
+    assert await wait_for_leader(first)
+    second.start(on_elected("second"))
+    await asyncio.sleep(0.1)
+    assert not second.is_leader
+    assert second.leader()["control_url"] == "http://127.0.0.1/first"
+
+    await first.stop()
+    assert await wait_for_leader(second)
+    assert elected == ["first", "second"]
+    await second.stop()
+    assert second.leader() is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses fcntl in the child process")
+async def test_takes_over_when_leader_process_dies(tmp_path):
+    lock_path = str(tmp_path / "scheduler.lock")
+    leader = subprocess.Popen([
+        sys.executable, "-c",
+        f"import fcntl, time; f = open({lock_path!r}, 'a+'); fcntl.flock(f, fcntl.LOCK_EX); print('locked', flush=True); time.sleep(60)",
+    ], stdout=subprocess.PIPE)
+    try:
+        assert leader.stdout.readline().strip() == b"locked"
+        election = LeaderElection(workers=2, lock_path=lock_path, failover_interval=0.02)
+
+        async def on_elected():
+            return "http://127.0.0.1:1"
+
+        election.start(on_elected)
+        await asyncio.sleep(0.1)
+        assert not election.is_leader
+        leader.kill()
+        assert await wait_for_leader(election)
+        await election.stop()
+    finally:
+        leader.kill()
+        leader.wait()
+
+
+def test_single_worker_does_not_elect(tmp_path):
+    assert not LeaderElection(workers=1, lock_path=str(tmp_path / "scheduler.lock")).enabled
@@ -23,3 +23,23 @@ def test_configure_logger_adds_handlers(monkeypatch):
     monkeypatch.setattr("AzanScheduler.logging_config.console_logging", False)
     configure_logger()
     assert any(isinstance(h, logging.Handler) for h in root_logger.handlers)
+
+
+def _child_log_file(queue):
+    from AzanScheduler import logging_config
+    queue.put((logging_config.is_main_process, logging_config.log_file))
+
+
+def test_spawned_child_logs_to_its_own_file_without_rotating_the_main_log():
+    import multiprocessing
+    from AzanScheduler import logging_config
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    child = context.Process(target=_child_log_file, args=(queue,))
+    child.start()
+    is_main, log_file = queue.get(timeout=60)
+    child.join(60)
+    assert not is_main
+    assert log_file == os.path.join(logging_config.log_folder, f"application_worker_{child.pid}.log")
+    # The main process's log was not renamed away by the child
+    assert os.path.exists(logging_config.log_file)
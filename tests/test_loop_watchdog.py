@@ -0,0 +1,38 @@
+import sys
+import os
+import time
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import metrics
+from AzanScheduler.loop_watchdog import LoopWatchdog
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_reports_blocking_call_with_its_stack():
+    watchdog = LoopWatchdog(interval=0.02, threshold=0.1, enabled=True)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.4)
+        await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+    assert len(watchdog.stalls) == 1
+    stall = watchdog.stalls[0]
+    assert "block_the_loop" in stall["stack"]
+    assert stall["stuck_seconds"] >= 0.1
+    assert metrics.loop_stalls.value(stall["location"]) >= 1
+    assert metrics.loop_lag.count() > 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_watchdog_does_not_start():
+    watchdog = LoopWatchdog(interval=0.02, threshold=0.1, enabled=False)
+    watchdog.start()
+    assert watchdog._task is None and watchdog._thread is None
+    await watchdog.stop()
@@ -0,0 +1,84 @@
+import sys
+import os
+import wave
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import media_cache
+from AzanScheduler.media_cache import MediaCache, file_sha256
+
+
+def write_source(path, frames=2205):
+    # A short mono 22.05 kHz WAV file, so preparing it has to convert channels and rate
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(22050)
+        f.writeframes(b"\x01\x00" * frames)
+
+
+def test_prepare_transcodes_to_stream_format(tmp_path):
+    source = tmp_path / "azan.wav"
+    write_source(source)
+    cache = MediaCache(str(tmp_path / "cache"))
+    prepared = cache.prepare(str(source))
+    assert os.path.basename(prepared) == f"{file_sha256(str(source))}.wav"
+    with wave.open(prepared, "rb") as f:
+        assert f.getnchannels() == 2
+        assert f.getframerate() == 44100
+        assert f.getsampwidth() == 2
+
+
+def test_resolve_uses_index_and_falls_back(tmp_path):
+    source = tmp_path / "azan.wav"
+    write_source(source)
+    cache = MediaCache(str(tmp_path / "cache"))
+    assert cache.resolve(str(source)) == str(source)
+    prepared = cache.prepare(str(source))
+    assert MediaCache(str(tmp_path / "cache")).resolve(str(source)) == prepared
+    write_source(source, frames=4410)
+    os.utime(source, ns=(0, 0))
+    assert cache.resolve(str(source)) == str(source)
+
+
+def test_prepare_invalid_file_returns_none(tmp_path):
+    source = tmp_path / "bad.mp3"
+    source.write_bytes(b"not audio")
+    cache = MediaCache(str(tmp_path / "cache"))
+    assert cache.prepare(str(source)) is None
+
+
+def test_prune_removes_unreferenced_artifacts(tmp_path):
+    first = tmp_path / "first.wav"
+    second = tmp_path / "second.wav"
+    write_source(first)
+    write_source(second, frames=4410)
+    cache = MediaCache(str(tmp_path / "cache"))
+    cache.prepare_all([str(first), str(second)])
+    assert len([n for n in os.listdir(cache.cache_dir) if n.endswith(".wav")]) == 2
+    cache.prepare_all([str(first)])
+    assert len([n for n in os.listdir(cache.cache_dir) if n.endswith(".wav")]) == 1
+
+
+def test_concurrent_prepares_keep_every_index_entry(tmp_path, monkeypatch):
+    dump = json.dump
+
+    def slow_dump(*args, **kwargs):
+        # Widen the window between writing the temporary file and renaming it
+        time.sleep(0.01)
+        dump(*args, **kwargs)
+
+    monkeypatch.setattr(media_cache.json, "dump", slow_dump)
+    sources = []
+    for i in range(8):
+        source = tmp_path / f"azan{i}.wav"
+        write_source(source, frames=2205 + i)
+        sources.append(str(source))
+    cache = MediaCache(str(tmp_path / "cache"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        prepared = list(executor.map(cache.prepare, sources))
+    assert None not in prepared
+    with open(cache.index_file_path) as f:
+        assert set(json.load(f)) == {os.path.abspath(source) for source in sources}
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")]
@@ -0,0 +1,147 @@
+import sys
+import os
+import io
+import wave
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import media_registry as registry_module
+from AzanScheduler.media_cache import MediaCache
+from AzanScheduler.media_registry import MediaRegistry
+from AzanScheduler.media_server import media_store
+
+
+@pytest.fixture
+def media_folder(tmp_path, monkeypatch):
+    with wave.open(str(tmp_path / "azan.wav"), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(44100)
+        f.writeframes(b"\x01\x00\x02\x00" * 4410)
+    files = {"REGULAR_AZAN_FILE": "azan.wav", "FAJR_AZAN_FILE": "azan.wav", "SHORT_AZAN_FILE": "missing.mp3", "DUAA_FILE": None}
+    monkeypatch.setattr(registry_module.config, "load_config", lambda key=None: files.get(key))
+    monkeypatch.setattr(registry_module, "media_file_path", lambda name: str(tmp_path / name))
+    monkeypatch.setattr(registry_module, "media_cache", MediaCache(str(tmp_path / "cache")))
+    yield tmp_path
+    media_store.refresh([])
+
+
+def test_refresh_builds_ready_to_stream_entries(media_folder):
+    registry = MediaRegistry()
+    registry.refresh()
+    media = registry.get("REGULAR_AZAN_FILE")
+    assert media is not None
+    assert media.path.startswith(str(media_folder / "cache"))
+    with open(media.path, "rb") as f:
+        expected = f.read()
+    stream = media.open()
+    assert isinstance(stream, io.BufferedIOBase)
+    assert stream.read() == expected
+    stream.seek(0)
+    assert stream.read(4) == expected[:4]
+    stream.close()
+
+
+def test_refresh_skips_missing_files(media_folder):
+    registry = MediaRegistry()
+    registry.refresh()
+    assert registry.get("SHORT_AZAN_FILE") is None
+    assert registry.get("DUAA_FILE") is None
+
+
+def test_streams_are_independent(media_folder):
+    registry = MediaRegistry()
+    registry.refresh()
+    media = registry.get("FAJR_AZAN_FILE")
+    first, second = media.open(), media.open()
+    first.read(100)
+    assert second.tell() == 0
+    first.close()
+    second.close()
+
+
+def test_open_stream_survives_release_of_its_mapping(media_folder):
+    registry = MediaRegistry()
+    registry.refresh()
+    media = registry.get("REGULAR_AZAN_FILE")
+    with open(media.path, "rb") as f:
+        expected = f.read()
+    stream = media.open()
+    media_store.release(media.path)
+    assert not media.mapping["mmap"].closed
+    assert stream.read() == expected
+    stream.close()
+    assert media.mapping["mmap"].closed
+
+def test_only_prepared_artifacts_are_mapped(media_folder):
+    registry = MediaRegistry()
+    registry.refresh()
+    media = registry.get("REGULAR_AZAN_FILE")
+    assert media_store.mapping(media.path) is not None
+    assert media_store.mapping(media.source_path) is None
+    # Re-uploading the configured file replaces it, which fails on Windows while it is mapped
+    replacement = media_folder / "azan.wav.upload"
+    replacement.write_bytes((media_folder / "azan.wav").read_bytes())
+    os.replace(replacement, media_folder / "azan.wav")
+
+
+def test_held_media_survives_a_swap_between_resolve_and_open(media_folder):
+    registry = MediaRegistry()
+    registry.refresh()
+    media = registry.hold("REGULAR_AZAN_FILE")
+    with open(media.path, "rb") as f:
+        expected = f.read()
+    # An upload replaces the configured file while the announcement is still queued
+    with wave.open(str(media_folder / "azan.wav"), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(44100)
+        f.writeframes(b"\x03\x00\x04\x00" * 8820)
+    registry.refresh()
+    assert registry.get("REGULAR_AZAN_FILE").path != media.path
+    stream = media.open()
+    assert stream.read() == expected
+    stream.close()
+    assert os.path.exists(media.path)
+    registry.release(media)
+    assert media.mapping["mmap"].closed
+    registry.refresh()
+    assert not os.path.exists(media.path)
+
+
+def test_concurrent_refreshes_run_one_at_a_time(media_folder, monkeypatch):
+    import threading
+    import time
+    registry = MediaRegistry()
+    cache = registry_module.media_cache
+    active = []
+    overlaps = []
+    prepare = cache.prepare
+
+    def slow_prepare(source_path, content_hash=None):
+        active.append(source_path)
+        overlaps.append(len(active))
+        time.sleep(0.01)
+        try:
+            return prepare(source_path, content_hash)
+        finally:
+            active.remove(source_path)
+
+    monkeypatch.setattr(cache, "prepare", slow_prepare)
+    threads = [threading.Thread(target=registry.refresh) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(overlaps) == 1
+    assert os.path.exists(registry.get("REGULAR_AZAN_FILE").path)
+
+
+def test_prune_failure_does_not_fail_the_refresh(media_folder, monkeypatch):
+    registry = MediaRegistry()
+
+    def failing_prune(source_paths, in_use=()):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(registry_module.media_cache, "prune", failing_prune)
+    registry.refresh()
+    assert registry.get("REGULAR_AZAN_FILE") is not None
@@ -0,0 +1,91 @@
+import sys
+import os
+import pytest
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import media_server
+from AzanScheduler.media_server import parse_range, media_store
+from AzanScheduler.api import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def media_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_server, "media_dir", str(tmp_path))
+    monkeypatch.setattr(media_server, "default_media_dir", str(tmp_path))
+    monkeypatch.setattr(media_server.media_cache, "cache_dir", str(tmp_path / ".prepared"))
+    monkeypatch.setattr(media_server.config, "load_config", lambda key=None: "azan.mp3" if key == "REGULAR_AZAN_FILE" else None)
+    (tmp_path / "azan.mp3").write_bytes(bytes(range(256)) * 4)
+    yield tmp_path
+    media_store.refresh([])
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 10)
+    assert parse_range("bytes=90-", 100) == (90, 100)
+    assert parse_range("bytes=-10", 100) == (90, 100)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=200-300", 100)
+
+
+@pytest.mark.parametrize("mapped", [False, True])
+def test_media_range_and_etag(media_folder, mapped):
+    if mapped:
+        media_store.refresh([str(media_folder / "azan.mp3")])
+    response = client.get("/media/azan.mp3", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(10, 20))
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+    response = client.get("/media/azan.mp3", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_media_head_and_full_body_from_memory(media_folder):
+    media_store.refresh([str(media_folder / "azan.mp3")])
+    assert client.head("/media/azan.mp3").headers["content-length"] == "1024"
+    assert client.get("/media/azan.mp3").content == bytes(range(256)) * 4
+
+
+def test_released_mapping_stays_open_until_its_last_holder_lets_go(media_folder):
+    path = str(media_folder / "azan.mp3")
+    media_store.refresh([path])
+    mapped = media_store.mapping(path)
+    response = media_store._iter_slices(path, mapped, 0, 1024)
+    first = next(response)
+    media_store.refresh([])
+    assert not mapped["mmap"].closed
+    assert first + b"".join(response) == bytes(range(256)) * 4
+    assert mapped["mmap"].closed
+    # A response that starts after the mapping was closed reads the file instead
+    assert not media_store.hold(mapped)
+    assert b"".join(media_store._iter_slices(path, mapped, 10, 20)) == bytes(range(10, 20))
+
+def test_media_rejects_missing_and_traversal(media_folder):
+    assert client.get("/media/missing.mp3").status_code == 404
+    assert client.get("/media/..%2Fsecret.txt").status_code == 404
+
+
+def test_media_serves_only_configured_files_and_prepared_artifacts(media_folder):
+    prepared = media_folder / ".prepared"
+    prepared.mkdir()
+    artifact = f"{'a' * 64}.wav"
+    for name in [artifact, "index.json"]:
+        (prepared / name).write_bytes(b"data")
+    for name in ["azan.mp3.meta.json", "duaa.mp3", "duaa.mp3.upload"]:
+        (media_folder / name).write_bytes(b"data")
+    assert client.get("/media/azan.mp3").status_code == 200
+    assert client.get(f"/media/.prepared/{artifact}").status_code == 200
+    for path in [".prepared/index.json", "azan.mp3.meta.json", "duaa.mp3", "duaa.mp3.upload"]:
+        assert client.get(f"/media/{path}").status_code == 404
+
+
+def test_stream_source_http_mode(media_folder, monkeypatch):
+    monkeypatch.setattr(media_server.media_store, "stream_mode", "http")
+    monkeypatch.setattr(media_server.media_store, "base_url", "http://10.0.0.2:8000")
+    source = media_server.stream_source(str(media_folder / "azan.mp3"), "10.0.0.5")
+    assert source == "http://10.0.0.2:8000/media/azan.mp3"
+    assert media_server.stream_source("/elsewhere/file.mp3", "10.0.0.5") == "/elsewhere/file.mp3"
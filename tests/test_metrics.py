@@ -0,0 +1,47 @@
+import sys
+import os
+import pytest
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.metrics import MetricsRegistry, http_request_duration
+from AzanScheduler.api import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test durations.", ("source",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "icci")
+    histogram.observe(0.5, "icci")
+    histogram.observe(5, "icci")
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{source="icci",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{source="icci",le="1.0"} 2' in text
+    assert 'test_seconds_bucket{source="icci",le="+Inf"} 3' in text
+    assert 'test_seconds_count{source="icci"} 3' in text
+    assert histogram.count("icci") == 3
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_loads", "Test loads.", ("file",))
+    counter.inc("config.json")
+    counter.inc("config.json")
+    registry.gauge("test_clients", "Test clients.", lambda: 3)
+    text = registry.render()
+    assert 'test_loads_total{file="config.json"} 2' in text
+    assert "test_clients 3" in text
+    with pytest.raises(ValueError):
+        registry.counter("test_loads", "Duplicate.")
+
+
+def test_middleware_labels_requests_by_route():
+    client = TestClient(app)
+    before = http_request_duration.count("GET", "/api/blocking-pool", "200")
+    assert client.get("/api/blocking-pool").status_code == 200
+    assert http_request_duration.count("GET", "/api/blocking-pool", "200") == before + 1
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'azan_http_request_seconds_count{method="GET",route="/api/blocking-pool",status="200"}' in response.text
+    assert "azan_blocking_pool_queued 0" in response.text
@@ -0,0 +1,78 @@
+import sys
+import os
+import json
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from dateutil import tz
+from unittest.mock import MagicMock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.clock import VirtualClock
+from AzanScheduler.config_manager import ConfigManager
+from AzanScheduler.prayer_times_cache import PrayerTimesCache
+
+DUBLIN = tz.gettz("Europe/Dublin")
+TODAY = {"Fajr": "05:33", "Sunrise": "07:12", "Dhuhr": "12:40", "Asr": "15:25", "Maghrib": "18:04", "Isha": "19:37", "date": "2025-03-01"}
+TOMORROW = {**TODAY, "Fajr": "05:31", "date": "2025-03-02"}
+
+
+@pytest.fixture
+def cache():
+    clock = VirtualClock(datetime(2025, 3, 1, 13, 0, tzinfo=DUBLIN))
+    fetcher = SimpleNamespace(clock=clock, _get_timezone=lambda: DUBLIN, fetch_prayer_times=MagicMock(return_value=TODAY))
+    cache = PrayerTimesCache(fetcher)
+    yield cache
+    ConfigManager.unsubscribe(cache.invalidate)
+
+
+@pytest.mark.asyncio
+async def test_response_is_served_from_memory_until_next_prayer(cache):
+    entry = await cache.get()
+    assert json.loads(entry.body) == {"status": "success", "data": TODAY}
+    assert entry.expires == datetime(2025, 3, 1, 15, 25, tzinfo=DUBLIN)
+    assert cache.max_age(entry) == 2 * 3600 + 25 * 60
+    assert await cache.get() is entry
+    assert cache.fetcher.fetch_prayer_times.call_count == 1
+
+    cache.fetcher.clock.sleep_blocking(cache.max_age(entry))
+    assert (await cache.get()).etag == entry.etag
+    assert cache.fetcher.fetch_prayer_times.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_after_last_prayer_response_lasts_until_midnight(cache):
+    cache.fetcher.clock.sleep_blocking(7 * 3600)
+    cache.fetcher.fetch_prayer_times.return_value = TOMORROW
+    entry = await cache.get()
+    assert entry.expires == datetime(2025, 3, 2, 0, 0, tzinfo=DUBLIN)
+    assert json.loads(entry.body)["data"]["date"] == "2025-03-02"
+
+
+@pytest.mark.asyncio
+async def test_config_change_invalidates_response(cache):
+    entry = await cache.get()
+    ConfigManager()._notify({"DEFAULT_TIMETABLE"})
+    cache.fetcher.fetch_prayer_times.return_value = {**TODAY, "Asr": "15:30"}
+    assert (await cache.get()).etag != entry.etag
+
+
+@pytest.mark.asyncio
+async def test_config_change_during_a_computation_is_not_lost(cache):
+    def fetch_during_change(day):
+        # The settings change while the old timetable is being read
+        ConfigManager()._notify({"DEFAULT_TIMETABLE"})
+        cache.fetcher.fetch_prayer_times.side_effect = None
+        return TODAY
+
+    cache.fetcher.fetch_prayer_times.side_effect = fetch_during_change
+    stale = await cache.get()
+    cache.fetcher.fetch_prayer_times.return_value = {**TODAY, "Asr": "15:30"}
+    assert (await cache.get()).etag != stale.etag
+    assert cache.fetcher.fetch_prayer_times.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_are_retried_after_a_minute(cache):
+    cache.fetcher.fetch_prayer_times.return_value = {"error": "Failed to load default timetable."}
+    entry = await cache.get()
+    assert cache.max_age(entry) == 60
@@ -1,5 +1,6 @@
 import sys
 import os
+from datetime import datetime, timezone
 from unittest.mock import patch
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from AzanScheduler.prayer_times_fetcher import PrayerTimesFetcher
@@ -52,3 +53,33 @@ def test_fetch_prayer_times_invalid_type():
             with patch.object(fetcher, "_reload_data", return_value={"1": {}}):
                 result = fetcher.fetch_prayer_times("badtype")
                 assert "error" in result
+
+
+def test_find_following_prayer_never_refreshes_the_timetable():
+    fetcher = PrayerTimesFetcher()
+    timetable = {
+        "1": {"31": {"Fajr": "06:00", "Sunrise": "08:00", "Dhuhr": "12:30", "Asr": "14:00", "Maghrib": "16:30", "Isha": "18:00"}},
+        "2": {"1": {"Fajr": "05:59", "Sunrise": "07:59", "Dhuhr": "12:30", "Asr": "14:01", "Maghrib": "16:32", "Isha": "18:02"}},
+    }
+
+    def load_config_side_effect(key=None):
+        return {
+            "DEFAULT_TIMETABLE": "icci",
+            "SOURCES": {"icci": "url"},
+            "TIMEZONE": "UTC",
+            "ISHA_GAMA_SWITCH": "Off",
+            "AZAN_SWITCHES": {"Fajr": "On", "Dhuhr": "On", "Isha": "On"},
+        }[key]
+
+    with patch("AzanScheduler.prayer_times_fetcher.config.load_config", side_effect=load_config_side_effect), \
+            patch.object(fetcher, "_reload_data", return_value=timetable), \
+            patch.object(fetcher, "_refresh_timetable") as mock_refresh, \
+            patch.object(fetcher, "_wait_until_midnight") as mock_wait:
+        after_dhuhr = fetcher.find_following_prayer(datetime(2025, 1, 31, 12, 30, tzinfo=timezone.utc))
+        after_isha = fetcher.find_following_prayer(datetime(2025, 1, 31, 18, 0, tzinfo=timezone.utc))
+        uncovered = fetcher.find_following_prayer(datetime(2025, 2, 1, 18, 2, tzinfo=timezone.utc))
+    assert after_dhuhr == {"prayer": "Isha", "prayer_time": "2025-01-31 18:00:00 +0000"}
+    assert after_isha == {"prayer": "Fajr", "prayer_time": "2025-02-01 05:59:00 +0000"}
+    assert uncovered is None
+    mock_refresh.assert_not_called()
+    mock_wait.assert_not_called()
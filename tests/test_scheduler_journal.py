@@ -0,0 +1,78 @@
+import sys
+import os
+import pytest
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler.scheduler_journal import SchedulerJournal
+
+
+@pytest.mark.asyncio
+async def test_claim_is_persisted_and_exclusive(tmp_path):
+    path = str(tmp_path / "journal.json")
+    prayer_time = datetime.now().astimezone().replace(microsecond=0)
+    journal = SchedulerJournal(path)
+    await journal.schedule("Asr", prayer_time)
+    assert await journal.claim("Asr", prayer_time)
+    # A restarted process reads the claim from disk
+    assert not await SchedulerJournal(path).claim("Asr", prayer_time)
+    await journal.complete("Asr", prayer_time)
+    assert SchedulerJournal(path).state("Asr", prayer_time) == "fired"
+
+
+@pytest.mark.asyncio
+async def test_overdue_splits_catch_up_and_missed(tmp_path):
+    now = datetime.now().astimezone().replace(microsecond=0)
+    journal = SchedulerJournal(str(tmp_path / "journal.json"), grace_period=120)
+    await journal.schedule("Fajr", now - timedelta(minutes=30))
+    await journal.schedule("Dhuhr", now - timedelta(seconds=30))
+    await journal.schedule("Asr", now + timedelta(hours=1))
+    catch_up, missed = journal.overdue(now)
+    assert catch_up == ("Dhuhr", now - timedelta(seconds=30))
+    assert missed == [("Fajr", now - timedelta(minutes=30))]
+
+
+@pytest.mark.asyncio
+async def test_nothing_to_catch_up_outside_grace(tmp_path):
+    now = datetime.now().astimezone().replace(microsecond=0)
+    journal = SchedulerJournal(str(tmp_path / "journal.json"), grace_period=60)
+    await journal.schedule("Maghrib", now - timedelta(minutes=5))
+    catch_up, missed = journal.overdue(now)
+    assert catch_up is None
+    assert missed == [("Maghrib", now - timedelta(minutes=5))]
+
+
+@pytest.mark.asyncio
+async def test_unschedule_and_pruning(tmp_path):
+    now = datetime.now().astimezone().replace(microsecond=0)
+    journal = SchedulerJournal(str(tmp_path / "journal.json"), max_entries=3)
+    for day in range(5):
+        await journal.schedule("Isha", now + timedelta(days=day))
+    assert len(journal.events) == 3
+    await journal.unschedule("Isha", now + timedelta(days=4))
+    assert journal.state("Isha", now + timedelta(days=4)) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_leave_the_latest_state_on_disk(tmp_path):
+    import asyncio
+    path = str(tmp_path / "journal.json")
+    now = datetime.now().astimezone().replace(microsecond=0)
+    journal = SchedulerJournal(path)
+    prayer_times = [now + timedelta(minutes=minute) for minute in range(20)]
+    await asyncio.gather(*(journal.schedule("Asr", prayer_time) for prayer_time in prayer_times))
+    await asyncio.gather(*(journal.claim("Asr", prayer_time) for prayer_time in prayer_times[:10]))
+    on_disk = SchedulerJournal(path)
+    assert [on_disk.state("Asr", prayer_time) for prayer_time in prayer_times] == ["firing"] * 10 + ["scheduled"] * 10
+
+
+@pytest.mark.asyncio
+async def test_journal_without_persist_never_touches_the_file(tmp_path):
+    path = tmp_path / "journal.json"
+    prayer_time = datetime.now().astimezone().replace(microsecond=0)
+    journal = SchedulerJournal(str(path), persist=False)
+    await journal.schedule("Asr", prayer_time)
+    assert await journal.claim("Asr", prayer_time)
+    assert not await journal.claim("Asr", prayer_time)
+    journal.reload()
+    assert journal.state("Asr", prayer_time) == "firing"
+    assert not path.exists()
@@ -0,0 +1,92 @@
+import sys
+import os
+import socket
+import signal
+import subprocess
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AzanScheduler import systemd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+unix_only = pytest.mark.skipif(sys.platform == "win32", reason="sd_notify uses Unix sockets")
+
+
+@pytest.fixture
+def notify_socket(tmp_path, monkeypatch):
+    path = str(tmp_path / "notify.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.settimeout(30)
+    monkeypatch.setenv("NOTIFY_SOCKET", path)
+    yield sock
+    sock.close()
+
+
+@unix_only
+def test_notify_sends_datagram(notify_socket):
+    assert systemd.notify("READY=1\nSTATUS=Serving")
+    assert notify_socket.recv(1024) == b"READY=1\nSTATUS=Serving"
+
+
+def test_notify_without_systemd(monkeypatch):
+    monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+    assert not systemd.notify("READY=1")
+
+
+@unix_only
+def test_notify_missing_socket(tmp_path, monkeypatch):
+    monkeypatch.setenv("NOTIFY_SOCKET", str(tmp_path / "missing.sock"))
+    assert not systemd.notify("READY=1")
+
+
+def test_watchdog_interval(monkeypatch):
+    monkeypatch.delenv("WATCHDOG_USEC", raising=False)
+    assert systemd.watchdog_interval() is None
+    monkeypatch.setenv("WATCHDOG_USEC", "20000000")
+    monkeypatch.setenv("WATCHDOG_PID", str(os.getpid()))
+    assert systemd.watchdog_interval() == 10
+    # Meant for another process
+    monkeypatch.setenv("WATCHDOG_PID", str(os.getpid() + 1))
+    assert systemd.watchdog_interval() is None
+
+
+@unix_only
+def test_daemon_ready_and_graceful_stop(notify_socket):
+    env = dict(os.environ, PYTHONPATH=ROOT, WATCHDOG_USEC="1000000")
+    env.pop("WATCHDOG_PID", None)
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "AzanScheduler.azan_daemon", "--host", "127.0.0.1", "--port", "0"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        assert notify_socket.recv(1024).startswith(b"READY=1\nSTATUS=Serving the API on 127.0.0.1:")
+        assert notify_socket.recv(1024) == b"WATCHDOG=1"
+        daemon.send_signal(signal.SIGTERM)
+        messages = []
+        while b"STOPPING=1" not in messages:
+            messages.append(notify_socket.recv(1024))
+        assert daemon.wait(timeout=15) == 0
+    finally:
+        if daemon.poll() is None:
+            daemon.kill()
+
+
+@pytest.mark.asyncio
+async def test_daemon_shutdown_is_bounded_by_one_deadline():
+    import time
+    import asyncio
+    from unittest.mock import MagicMock, patch
+    from AzanScheduler import azan_daemon
+    server = MagicMock(force_exit=False)
+    hanging_server = asyncio.create_task(asyncio.sleep(10))
+
+    async def hanging_stop():
+        await asyncio.sleep(10)
+
+    started = time.monotonic()
+    with patch.object(azan_daemon, "stop_scheduler", hanging_stop):
+        assert not await azan_daemon._shutdown(server, hanging_server, 0.2, started)
+    assert time.monotonic() - started < 1
+    assert server.should_exit and server.force_exit
+    assert hanging_server.cancelled()